@@ -153,11 +153,30 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Report uploads are spooled here and ingested by the process_ingestion_jobs worker
+INGESTION_SPOOL_DIR = Path.joinpath(BASE_DIR, 'spool', 'ingestion')
+
+# Rendered report deliverables, one file per report and content version (reports.artifacts)
+REPORT_ARTIFACT_DIR = Path.joinpath(BASE_DIR, 'spool', 'artifacts')
+
+# Rendered report fragments are keyed by the report's cache_version, the timeout only evicts superseded versions
+REPORT_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Signatures kept per process by the LRU read-through cache (signatures.cache)
+SIGNATURE_CACHE_SIZE = 5000
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUDITLOG_INCLUDE_ALL_MODELS=True
+AUDITLOG_EXCLUDE_TRACKING_MODELS = (
+    'reports.burpsuitepayload',
+    'reports.reportstatuscounter',
+    'signatures.signaturecve',
+    'signatures.signaturereference',
+    'signatures.signaturerevision',
+)
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
@@ -45,6 +45,19 @@ DATABASES = {
     }
 }
 
+# Shared by the gunicorn workers and the ingestion worker, the table is created by entrypoint.sh (createcachetable)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'scg_cache',
+        'OPTIONS': {
+            # Report fragments and group pages are several keys per report and version; the default of 300
+            # would cull them within a few page views
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
 STATIC_ROOT = '/app/staticfiles'
 STATICFILES_DIRS = [
     Path.joinpath(BASE_DIR, 'static'),
@@ -7,6 +7,22 @@ python manage.py collectstatic --no-input --settings=core.settings.production
 echo '\n======> Applying migrations...'
 python manage.py makemigrations --settings=core.settings.production
 python manage.py migrate --settings=core.settings.production
+python manage.py createcachetable --settings=core.settings.production
+
+echo '\n======> Backfilling finding fingerprints...'
+python manage.py backfill_finding_fingerprints --settings=core.settings.production
+
+echo '\n======> Building missing status counters...'
+python manage.py rebuild_status_counters --missing --settings=core.settings.production
+
+echo '\n======> Indexing missing signature links...'
+python manage.py index_signature_links --missing --settings=core.settings.production
+
+echo '\n======> Indexing missing signature search vectors...'
+python manage.py rebuild_signature_search --missing --settings=core.settings.production
+
+echo '\n======> Starting ingestion worker...'
+python manage.py process_ingestion_jobs --settings=core.settings.production &
 
 echo '\n======> Running server...'
 gunicorn --env DJANGO_SETTINGS_MODULE=core.settings.production core.wsgi:application --bind 0.0.0.0:8000 --workers 1
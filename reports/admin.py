@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import NessusReport, BurpSuiteReport
+from .models import NessusReport, BurpSuiteReport, IngestionJob
 
 
 @admin.register(NessusReport)
@@ -19,4 +19,10 @@ class NessusReportAdmin(admin.ModelAdmin):
     
 @admin.register(BurpSuiteReport)
 class BurpSuiteReportAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+    pass
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'report_type', 'name', 'customer', 'status', 'rows_processed', 'created_at', 'finished_at')
+    list_filter = ('report_type', 'status')
+    readonly_fields = ('job_id', 'report_id', 'file_path', 'file_size', 'rows_processed', 'bytes_processed', 'errors', 'warnings', 'started_at', 'finished_at')
@@ -0,0 +1,208 @@
+import logging
+import os
+from django.conf import settings
+from django.db import models
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import escape
+from signatures.models import NessusSignature, BurpSuiteSignature
+from signatures.cache import get_signatures
+from signatures.versions import signatures_version
+from .counters import ensure_status_counts, status_counts
+from .ingestion import chunked
+from .models import ReportArtifact, NessusReport, NessusVulnerability, BurpSuiteReport, BurpSuiteVulnerability, RISK_FACTOR_ORDER
+
+logger = logging.getLogger(__name__)
+
+RENDER_CHUNK_SIZE = 2000
+
+
+def content_version(report):
+    """Version of what a deliverable shows: the report's findings and statuses plus the signature text"""
+    return f"{report.cache_version}-{signatures_version()}"
+
+
+def version_parts(version):
+    """(cache_version, signatures version) of a content version or artifact file name, None if it is not one"""
+    try:
+        return tuple(int(part) for part in version.split('-'))
+    except ValueError:
+        return None
+
+
+def superseded(version, current):
+    """Whether `version` is older than `current` in both the report's content and the signatures"""
+    version, current = version_parts(version), version_parts(current)
+    if not version or not current or len(version) != len(current):
+        return False
+    return version != current and all(old <= new for old, new in zip(version, current))
+
+
+def artifact_path(report_id, version):
+    return os.path.join(settings.REPORT_ARTIFACT_DIR, str(report_id), f'{version}.html')
+
+
+def request_artifact(report, report_type, user):
+    """Queue the rendering of the report's current content version, unless it is already queued, running or on disk"""
+    version = content_version(report)
+    artifact = (
+        ReportArtifact.objects
+        .filter(report_id=report.pk, content_version=version, status__in=['queued', 'running', 'completed'])
+        .order_by('-created_at')
+        .first()
+    )
+    if artifact and (artifact.status != 'completed' or os.path.exists(artifact.file_path)):
+        return artifact
+    return ReportArtifact.objects.create(
+        report_type=report_type,
+        report_id=report.pk,
+        content_version=version,
+        file_path=artifact_path(report.pk, version),
+        created_by=user,
+    )
+
+
+def finding_row(*cells):
+    return '<tr>' + ''.join(f'<td>{escape(cell)}</td>' for cell in cells) + '</tr>\n'
+
+
+def nessus_sections(report):
+    """
+    HTML of a Nessus report's findings in one pass ordered by (risk factor, signature, vulnerability). Target rows are
+    read slim with values_list().iterator(); each chunk reads its signatures once through the signature cache, so memory is bounded
+    by the chunk size whatever the report size.
+    """
+    statuses = dict(NessusVulnerability.STATUS_CHOICES)
+    rank = models.Case(
+        *(models.When(signature__risk_factor=risk_factor, then=models.Value(index)) for index, risk_factor in enumerate(RISK_FACTOR_ORDER)),
+        default=models.Value(len(RISK_FACTOR_ORDER))
+    )
+    rows = (
+        report.vulnerabilities.annotate(rank=rank)
+        .order_by('rank', 'signature_id', 'id')
+        .values_list('signature_id', 'target_affected', 'operating_system', 'status')
+        .iterator(chunk_size=RENDER_CHUNK_SIZE)
+    )
+
+    current_risk_factor, current_signature = None, None
+    for chunk in chunked(rows, RENDER_CHUNK_SIZE):
+        signatures = get_signatures(NessusSignature, {row[0] for row in chunk} - {current_signature})
+        for signature_id, target_affected, operating_system, status in chunk:
+            if signature_id != current_signature:
+                if current_signature is not None:
+                    yield '</tbody></table></section>\n'
+                signature = signatures[signature_id]
+                if signature.risk_factor != current_risk_factor:
+                    current_risk_factor = signature.risk_factor
+                    yield f'<h2 class="risk-factor risk-factor-{escape(current_risk_factor)}">{escape(current_risk_factor)}</h2>\n'
+                current_signature = signature_id
+                yield render_to_string('reports/artifacts/nessus_signature.html', {'signature': signature})
+            yield finding_row(target_affected, operating_system, statuses.get(status, status))
+    if current_signature is not None:
+        yield '</tbody></table></section>\n'
+
+
+def burpsuite_sections(report):
+    """HTML of a BurpSuite report's instances grouped by issue type, streamed like nessus_sections()"""
+    statuses = dict(BurpSuiteVulnerability.STATUS_CHOICES)
+    rows = (
+        report.vulnerabilities
+        .order_by('signature_id', 'id')
+        .values_list('signature_id', 'host', 'path', 'location', 'severity', 'confidence', 'status')
+        .iterator(chunk_size=RENDER_CHUNK_SIZE)
+    )
+
+    current_signature = None
+    for chunk in chunked(rows, RENDER_CHUNK_SIZE):
+        signatures = get_signatures(BurpSuiteSignature, {row[0] for row in chunk} - {current_signature})
+        for signature_id, host, path, location, severity, confidence, status in chunk:
+            if signature_id != current_signature:
+                if current_signature is not None:
+                    yield '</tbody></table></section>\n'
+                current_signature = signature_id
+                yield render_to_string('reports/artifacts/burpsuite_signature.html', {'signature': signatures[signature_id]})
+            yield finding_row(host, path, location, severity, confidence, statuses.get(status, status))
+    if current_signature is not None:
+        yield '</tbody></table></section>\n'
+
+
+RENDERERS = {
+    'nessus': (NessusReport, NessusVulnerability, nessus_sections),
+    'burpsuite': (BurpSuiteReport, BurpSuiteVulnerability, burpsuite_sections),
+}
+
+
+def render_artifact(artifact):
+    """Write the self-contained HTML deliverable to a temporary file and move it into place; returns rows rendered"""
+    model, vulnerability_model, sections = RENDERERS[artifact.report_type]
+    report = model.objects.select_related('customer', 'service').get(pk=artifact.report_id)
+    ensure_status_counts(report)
+    counts = status_counts([report.pk])
+    statuses = [(label, counts[value]) for value, label in vulnerability_model.STATUS_CHOICES if counts.get(value)]
+
+    os.makedirs(os.path.dirname(artifact.file_path), exist_ok=True)
+    temporary_path = f'{artifact.file_path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as out:
+        out.write(render_to_string('reports/artifacts/deliverable_head.html', {
+            'report': report,
+            'report_type': artifact.get_report_type_display(),
+            'statuses': statuses,
+            'total': sum(counts.values()),
+            'generated_at': timezone.now(),
+        }))
+        for html in sections(report):
+            out.write(html)
+        out.write(render_to_string('reports/artifacts/deliverable_foot.html'))
+    os.replace(temporary_path, artifact.file_path)
+
+    # The findings or signatures changed while rendering, the file may mix both versions
+    report.refresh_from_db(fields=['cache_version'])
+    if content_version(report) != artifact.content_version:
+        os.remove(artifact.file_path)
+        raise ValueError("The report changed while its deliverable was rendered, download it again")
+
+    # Older content versions of the report are never served again; a newer file rendered meanwhile by another worker is kept
+    directory = os.path.dirname(artifact.file_path)
+    for name in os.listdir(directory):
+        version, extension = os.path.splitext(name)
+        if extension == '.html' and superseded(version, artifact.content_version):
+            os.remove(os.path.join(directory, name))
+    return sum(counts.values())
+
+
+def claim_next_artifact():
+    """Move the oldest queued artifact to running, the conditional UPDATE makes the claim safe across workers"""
+    for artifact in ReportArtifact.objects.filter(status='queued').order_by('created_at')[:10]:
+        started_at = timezone.now()
+        if ReportArtifact.objects.filter(pk=artifact.pk, status='queued').update(status='running', started_at=started_at):
+            artifact.status, artifact.started_at = 'running', started_at
+            return artifact
+    return None
+
+
+def run_artifact_job(artifact):
+    try:
+        artifact.rows_rendered = render_artifact(artifact)
+        artifact.file_size = os.path.getsize(artifact.file_path)
+        artifact.status = 'completed'
+    except Exception as e:
+        logger.exception(f"Rendering artifact {artifact.artifact_id} failed")
+        artifact.status = 'failed'
+        artifact.error = str(e)
+    artifact.finished_at = timezone.now()
+    artifact.save()
+    return artifact
+
+
+def recover_interrupted_artifacts():
+    """Requeue renderings left running by a worker that died, rendering is idempotent"""
+    return ReportArtifact.objects.filter(status='running').update(status='queued', started_at=None)
+
+
+def delete_artifacts(report_id):
+    ReportArtifact.objects.filter(report_id=report_id).delete()
+    directory = os.path.join(settings.REPORT_ARTIFACT_DIR, str(report_id))
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
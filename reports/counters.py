@@ -0,0 +1,54 @@
+from django.db import models, transaction
+from .models import ReportStatusCounter
+
+
+def apply_status_deltas(report_id, deltas):
+    """
+    Add {status: delta} to the report's counters with UPDATE ... SET count = count + delta.
+    Missing counter rows are created first with INSERT ... ON CONFLICT DO NOTHING, so concurrent
+    writers never lose an increment. Call inside the transaction that changes the vulnerabilities.
+    """
+    deltas = {status: delta for status, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    ReportStatusCounter.objects.bulk_create(
+        [ReportStatusCounter(report_id=report_id, status=status) for status in deltas],
+        ignore_conflicts=True
+    )
+    for status, delta in deltas.items():
+        ReportStatusCounter.objects.filter(report_id=report_id, status=status).update(count=models.F('count') + delta)
+
+
+def status_counts(report_ids):
+    """{status: count} of the non-empty counters; `report_ids` may be a subquery"""
+    return dict(
+        ReportStatusCounter.objects
+        .filter(report_id__in=report_ids, count__gt=0)
+        .values_list('status', 'count')
+    )
+
+
+def delete_status_counts(report_id):
+    ReportStatusCounter.objects.filter(report_id=report_id).delete()
+
+
+def rebuild_status_counts(report):
+    """Recount a report's statuses from its vulnerabilities, repairing drifted counters"""
+    counts = report.vulnerabilities.values('status').annotate(count=models.Count('id')).order_by()
+    with transaction.atomic():
+        delete_status_counts(report.pk)
+        ReportStatusCounter.objects.bulk_create([
+            ReportStatusCounter(report_id=report.pk, status=row['status'], count=row['count'])
+            for row in counts
+        ])
+
+
+def ensure_status_counts(report):
+    """
+    Rebuild the counters of a report stored before they existed (it has findings but no counter rows),
+    so they can be read and have deltas applied. Returns whether they were rebuilt.
+    """
+    if ReportStatusCounter.objects.filter(report_id=report.pk).exists() or not report.vulnerabilities.exists():
+        return False
+    rebuild_status_counts(report)
+    return True
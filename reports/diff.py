@@ -0,0 +1,74 @@
+import datetime
+from django.db import models
+from django.utils import timezone
+from signatures.models import SignatureRevision
+from .models import NessusVulnerability
+
+DIFF_CATEGORIES = ('new', 'resolved', 'persisting')
+
+
+def matching_findings(report):
+    """Findings of `report` with the same fingerprint (signature_id, target_affected) as the outer row, for Exists()/Subquery()"""
+    return NessusVulnerability.objects.filter(report=report, fingerprint=models.OuterRef('fingerprint'))
+
+
+def diff_querysets(base, head):
+    """
+    {category: queryset} for the findings of `head` that are new or persisting since `base` and the findings of
+    `base` resolved in `head`. Each category is a semi/anti-join the database runs against the
+    (report, fingerprint) index; persisting findings carry their status in `base` as `base_status`.
+    """
+    return {
+        'new': head.vulnerabilities.filter(~models.Exists(matching_findings(base))),
+        'resolved': base.vulnerabilities.filter(~models.Exists(matching_findings(head))),
+        'persisting': head.vulnerabilities.filter(models.Exists(matching_findings(base))).annotate(
+            base_status=models.Subquery(matching_findings(base).values('status')[:1])
+        ),
+    }
+
+
+def diff_counts(base, head):
+    """{category: number of distinct findings}"""
+    return {
+        category: queryset.values('fingerprint').distinct().count()
+        for category, queryset in diff_querysets(base, head).items()
+    }
+
+
+def diff_page(base, head, category, after=0, limit=500):
+    """Keyset page (by vulnerability id) of one category, returns (rows, last id or None when exhausted)"""
+    fields = ['id', 'signature_id', 'signature__name', 'signature__risk_factor', 'target_affected', 'status']
+    if category == 'persisting':
+        fields.append('base_status')
+    rows = list(diff_querysets(base, head)[category].filter(id__gt=after).order_by('id').values(*fields)[:limit])
+    return rows, rows[-1]['id'] if len(rows) == limit else None
+
+
+def severity_changes(report):
+    """
+    Findings of `report` whose signature changed severity (risk factor or CVSS score) after the report date.
+    The signatures come from the revisions since that date, a range on the (severity_changed, changed_at)
+    index, and are joined to the findings through the (report, signature) index. Each finding carries the
+    risk factor and score it was reported with (before the first such revision) and the current ones.
+    """
+    since = timezone.make_aware(datetime.datetime.combine(report.date, datetime.time.min))
+    revisions = SignatureRevision.objects.filter(severity_changed=True, changed_at__gte=since)
+    first_revision = revisions.filter(signature=models.OuterRef('signature_id')).order_by('changed_at', 'id')
+    return report.vulnerabilities.filter(signature_id__in=revisions.values('signature_id')).annotate(
+        reported_risk_factor=models.Subquery(first_revision.values('previous_risk_factor')[:1]),
+        reported_cvss_base_score=models.Subquery(first_revision.values('previous_cvss_base_score')[:1]),
+        severity_changed_at=models.Subquery(first_revision.values('changed_at')[:1]),
+    )
+
+
+def severity_changes_page(report, after=0, limit=500):
+    """Keyset page (by vulnerability id) of severity_changes(), returns (rows, last id or None when exhausted)"""
+    rows = list(
+        severity_changes(report).filter(id__gt=after).order_by('id').values(
+            'id', 'signature_id', 'signature__name', 'target_affected', 'status',
+            'reported_risk_factor', 'reported_cvss_base_score', 'severity_changed_at',
+            current_risk_factor=models.F('signature__risk_factor'),
+            current_cvss_base_score=models.F('signature__cvss_base_score'),
+        )[:limit]
+    )
+    return rows, rows[-1]['id'] if len(rows) == limit else None
@@ -0,0 +1,73 @@
+import csv
+import json
+from signatures.cache import get_signatures
+from .ingestion import chunked
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Spreadsheet applications evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+SIGNATURE_PREFIX = 'signature__'
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, lookup in columns])
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def jsonl_lines(columns, rows):
+    headers = [header for header, lookup in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=str) + '\n'
+
+
+def export_rows(queryset, lookups, chunk_size):
+    """
+    Values of `lookups` for every finding. Finding columns are read with values_list().iterator() (a server-side
+    cursor on PostgreSQL); `signature__<field>` columns come from the signature cache, one lookup per chunk.
+    """
+    fields = ['signature_id'] + [lookup for lookup in lookups if not lookup.startswith(SIGNATURE_PREFIX)]
+    signature_model = queryset.model._meta.get_field('signature').related_model
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        signatures = get_signatures(signature_model, {row[0] for row in chunk})
+        for row in chunk:
+            values = dict(zip(fields, row))
+            signature = signatures.get(values['signature_id'])
+            yield [
+                getattr(signature, lookup[len(SIGNATURE_PREFIX):], None) if lookup.startswith(SIGNATURE_PREFIX) else values[lookup]
+                for lookup in lookups
+            ]
+
+
+def export_lines(queryset, columns, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Lines of a findings export. `columns` is a list of (header, field lookup) pairs; rows are produced chunk by
+    chunk so memory stays flat whatever the report size.
+    """
+    rows = export_rows(queryset, [lookup for header, lookup in columns], chunk_size)
+    if export_format == 'csv':
+        return csv_lines(columns, rows)
+    return jsonl_lines(columns, rows)
@@ -1,11 +1,16 @@
+import codecs
 from django import forms
-import json
 from contracts.models import Contract
 
 class BurpSuiteReportUploadForm(forms.Form):
     name = forms.CharField(max_length=255, label='Report Name')
     json_file = forms.FileField(label='JSON File')
     contract = forms.ModelChoiceField(queryset=Contract.objects.none(), required=True)
+    carry_forward = forms.BooleanField(
+        required=False,
+        label='Carry forward triage statuses',
+        help_text='Copy the status of findings that were already triaged in the previous report of this service.'
+    )
 
     def __init__(self, *args, **kwargs):
         customer = kwargs.pop('customer', None)
@@ -26,13 +31,11 @@ class BurpSuiteReportUploadForm(forms.Form):
 
     def clean_json_file(self):
         json_file = self.cleaned_data['json_file']
-        try:
-            data = json.load(json_file)
-            required_keys = ['exportTime', 'issues']
-            for key in required_keys:
-                if key not in data:
-                    raise forms.ValidationError(f"The JSON file is missing the '{key}' key.")
-            json_file.seek(0)  # Reset file pointer
-            return json_file
-        except json.JSONDecodeError:
-            raise forms.ValidationError("The uploaded file is not a valid JSON file.")
\ No newline at end of file
+        # Only sniff the document here; keys and records are validated by the streaming
+        # parser while the report is ingested, so the upload is parsed once
+        head = json_file.read(64)
+        json_file.seek(0)  # Reset file pointer
+        # Exports saved by Windows tools start with a byte order mark, the parser skips it as well
+        if not head.removeprefix(codecs.BOM_UTF8).lstrip().startswith(b'{'):
+            raise forms.ValidationError("The uploaded file is not a valid JSON file.")
+        return json_file
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from signatures.versions import signatures_version
+
+
+def fragment_timeout():
+    return getattr(settings, 'REPORT_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def bump_cache_version(report):
+    """Invalidate a report's cached fragments; call in the transaction that changes its vulnerabilities"""
+    type(report).objects.filter(pk=report.pk).update(cache_version=models.F('cache_version') + 1)
+
+
+def fragment_key(report, name, *parts):
+    return ':'.join(str(part) for part in (
+        'report-fragment', report.pk, report.cache_version, signatures_version(), name, *parts
+    ))
+
+
+def cached_fragment(report, name, build, *parts):
+    """
+    Return the cached value of fragment `name` (plus `parts`, e.g. a page cursor) for the report's current
+    cache_version, calling `build()` on a miss. Stale versions are never read again and expire on their own.
+    """
+    key = fragment_key(report, name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, fragment_timeout())
+    return value
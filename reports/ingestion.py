@@ -0,0 +1,192 @@
+import json
+import logging
+import time
+from itertools import islice
+from django.db import transaction
+from .counters import apply_status_deltas
+from .fragments import bump_cache_version
+from .models import NessusVulnerability, BurpSuiteVulnerability, BurpSuitePayload
+from signatures.models import NessusSignature, BurpSuiteSignature
+
+logger = logging.getLogger(__name__)
+
+NESSUS_BATCH_SIZE = 1000
+# Burp instances carry full request/response bodies, keep batches small to bound memory
+BURPSUITE_BATCH_SIZE = 200
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from any iterable"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class IngestionStats:
+    """Counters collected while ingesting a scanner report"""
+
+    def __init__(self):
+        self.rows = 0
+        self.batches = 0
+        self.skipped = 0
+        self.missing_signatures = set()
+        self.started_at = time.monotonic()
+        self.duration = 0.0
+
+    def finish(self):
+        self.duration = time.monotonic() - self.started_at
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.duration if self.duration else 0.0
+
+    def summary(self):
+        return f"{self.rows} rows in {self.duration:.2f}s ({self.rows_per_second:.0f} rows/sec)"
+
+    def missing_summary(self, limit=20):
+        missing = sorted(self.missing_signatures)
+        listed = ', '.join(str(signature_id) for signature_id in missing[:limit])
+        if len(missing) > limit:
+            listed += f" and {len(missing) - limit} more"
+        return f"{self.skipped} alerts skipped, signatures not found: {listed}"
+
+
+def ingest_nessus_alerts(report, alerts, batch_size=NESSUS_BATCH_SIZE, progress=None):
+    """
+    Insert the vulnerabilities of a Nessus report from validated alerts, as yielded by NessusReportParser.
+    Each batch costs one signature lookup (only for plugin IDs not seen yet) and one bulk INSERT.
+    `progress` is called with the running stats after every batch.
+    """
+    stats = IngestionStats()
+    known_ids = set()
+
+    for batch in chunked(alerts, batch_size):
+        plugin_ids = {int(alert['plugin_id']) for alert in batch}
+        unresolved = plugin_ids - known_ids - stats.missing_signatures
+        if unresolved:
+            # Existence only: an id lookup on the primary key index, full signatures are not needed here
+            found = set(NessusSignature.objects.filter(id__in=unresolved).values_list('id', flat=True))
+            known_ids |= found
+            stats.missing_signatures |= unresolved - found
+
+        rows = [
+            NessusVulnerability(
+                report=report,
+                signature_id=int(alert['plugin_id']),
+                target_affected=alert['target_affected'],
+                operating_system=alert['os'],
+                status='not_started'
+            ).set_fingerprint()
+            for alert in batch
+            if int(alert['plugin_id']) in known_ids
+        ]
+        with transaction.atomic():
+            NessusVulnerability.objects.bulk_create(rows, batch_size=batch_size)
+            apply_status_deltas(report.pk, {'not_started': len(rows)})
+            bump_cache_version(report)
+
+        stats.rows += len(rows)
+        stats.skipped += len(batch) - len(rows)
+        stats.batches += 1
+        if progress:
+            progress(stats)
+
+    stats.finish()
+    logger.info(f"Nessus report {report.report_id} ingested: {stats.summary()}, {stats.batches} batches, {stats.skipped} skipped")
+    return stats
+
+
+def store_burpsuite_payloads(texts, known_digests):
+    """
+    Store request/response payloads in the content-addressed blob table and return their digests.
+    Payloads are inserted with INSERT ... ON CONFLICT DO NOTHING, so one repeated across instances,
+    reports or concurrent ingestions is stored once; `known_digests` skips those already written this run.
+    """
+    digests = []
+    new_payloads = {}
+    for text in texts:
+        digest = BurpSuitePayload.digest_for(text)
+        if digest not in known_digests and digest not in new_payloads:
+            new_payloads[digest] = BurpSuitePayload.build(text)
+        digests.append(digest)
+    if new_payloads:
+        BurpSuitePayload.objects.bulk_create(new_payloads.values(), ignore_conflicts=True)
+        known_digests.update(new_payloads)
+    return digests
+
+
+def delete_burpsuite_reports(reports):
+    """
+    Delete Burp Suite reports and then the payloads that only their vulnerabilities referenced; payloads shared
+    with other reports stay. Returns the number of payloads deleted, call inside a transaction.
+    """
+    digests = set(
+        BurpSuiteVulnerability.objects.filter(report__in=reports, payload__isnull=False)
+        .values_list('payload_id', flat=True).distinct()
+    )
+    reports.delete()
+    pruned = 0
+    for chunk in chunked(digests, BURPSUITE_BATCH_SIZE):
+        pruned += BurpSuitePayload.objects.filter(digest__in=chunk, vulnerabilities__isnull=True).delete()[0]
+    return pruned
+
+
+def ingest_burpsuite_instances(report, instances, batch_size=BURPSUITE_BATCH_SIZE, progress=None):
+    """
+    Insert the vulnerabilities of a Burp Suite report from validated (issue, instance) pairs,
+    as yielded by BurpSuiteReportParser.
+    Unknown issue types are created with one bulk INSERT ... ON CONFLICT DO NOTHING per batch,
+    request/response payloads go to the compressed blob store, and vulnerabilities are flushed in fixed-size batches so memory stays bounded.
+    `progress` is called with the running stats after every batch.
+    """
+    stats = IngestionStats()
+    known_types = set()
+    known_digests = set()
+
+    for batch in chunked(instances, batch_size):
+        new_signatures = {}
+        for issue, instance in batch:
+            signature_id = int(issue['type'])
+            if signature_id not in known_types:
+                new_signatures[signature_id] = issue['name']
+        if new_signatures:
+            BurpSuiteSignature.objects.bulk_create([
+                BurpSuiteSignature(id=signature_id, name=name, scanner_type='BurpSuite')
+                for signature_id, name in new_signatures.items()
+            ], ignore_conflicts=True)
+            known_types.update(new_signatures)
+
+        digests = store_burpsuite_payloads(
+            (json.dumps(instance.get('requests', [])) for issue, instance in batch), known_digests
+        )
+
+        rows = []
+        for (issue, instance), digest in zip(batch, digests):
+            rows.append(BurpSuiteVulnerability(
+                report=report,
+                signature_id=int(issue['type']),
+                host=issue['host'],
+                path=instance['path'],
+                location=instance['location'],
+                severity=instance['severity'],
+                confidence=instance['confidence'],
+                issueDetail=instance.get('issueDetail') or 'N/A',  # Use 'N/A' if issueDetail is None or missing
+                payload_id=digest
+            ).set_fingerprint())
+        with transaction.atomic():
+            BurpSuiteVulnerability.objects.bulk_create(rows, batch_size=batch_size)
+            apply_status_deltas(report.pk, {'not_started': len(rows)})
+            bump_cache_version(report)
+
+        stats.rows += len(rows)
+        stats.batches += 1
+        if progress:
+            progress(stats)
+
+    stats.finish()
+    logger.info(f"BurpSuite report {report.report_id} ingested: {stats.summary()}, {stats.batches} batches")
+    return stats
@@ -0,0 +1,163 @@
+import logging
+import os
+from auditlog.context import disable_auditlog
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .counters import delete_status_counts
+from .ingestion import ingest_nessus_alerts, ingest_burpsuite_instances, delete_burpsuite_reports
+from .models import IngestionJob, NessusReport, BurpSuiteReport
+from .parsers import NessusReportParser, BurpSuiteReportParser
+from .triage import carry_forward_statuses, missing_fingerprints, previous_report
+
+logger = logging.getLogger(__name__)
+
+
+def spool_upload(uploaded_file, **job_fields):
+    """Write an uploaded report to the spool directory and queue it for the ingestion worker"""
+    os.makedirs(settings.INGESTION_SPOOL_DIR, exist_ok=True)
+    job = IngestionJob(file_size=uploaded_file.size, **job_fields)
+    job.file_path = os.path.join(settings.INGESTION_SPOOL_DIR, f'{job.job_id}.json')
+    with open(job.file_path, 'wb') as spool_file:
+        for chunk in uploaded_file.chunks():
+            spool_file.write(chunk)
+    job.save()
+    return job
+
+
+def claim_next_job():
+    """Move the oldest queued job to running; the conditional UPDATE makes the claim safe across workers"""
+    for job in IngestionJob.objects.filter(status='queued').order_by('created_at')[:10]:
+        started_at = timezone.now()
+        if IngestionJob.objects.filter(pk=job.pk, status='queued').update(status='running', started_at=started_at):
+            job.status, job.started_at = 'running', started_at
+            return job
+    return None
+
+
+def ingest_nessus_file(job, json_file, progress):
+    parser = NessusReportParser(json_file)
+    report = NessusReport.objects.create(
+        customer_id=job.customer_id,
+        contract_id=job.contract_id,
+        service_id=job.service_id,
+        inventory=[],
+        name=job.name,
+    )
+    IngestionJob.objects.filter(pk=job.pk).update(report_id=report.report_id)
+    job.report_id = report.report_id
+
+    stats = ingest_nessus_alerts(report, parser, progress=progress)
+
+    report.inventory = parser.header['inventory']
+    report.save(update_fields=['inventory'])
+    warnings = [stats.missing_summary()] if stats.missing_signatures else []
+    return stats, warnings
+
+
+def ingest_burpsuite_file(job, json_file, progress):
+    parser = BurpSuiteReportParser(json_file)
+    report = BurpSuiteReport.objects.create(
+        customer_id=job.customer_id,
+        contract_id=job.contract_id,
+        service_id=job.service_id,
+        name=job.name,
+    )
+    IngestionJob.objects.filter(pk=job.pk).update(report_id=report.report_id)
+    job.report_id = report.report_id
+
+    stats = ingest_burpsuite_instances(report, parser, progress=progress)
+    return stats, []
+
+
+INGESTERS = {
+    'nessus': (ingest_nessus_file, NessusReport),
+    'burpsuite': (ingest_burpsuite_file, BurpSuiteReport),
+}
+
+
+def carry_forward_job_statuses(job):
+    """Opt-in (IngestionJob.carry_forward) copy of the previous report's triage statuses, returns warnings"""
+    report = INGESTERS[job.report_type][1].objects.get(pk=job.report_id)
+    previous = previous_report(report)
+    if previous is None:
+        return ["No previous report of this service to carry triage statuses forward from."]
+    if missing_fingerprints(previous):
+        return [
+            f"The previous report {previous.name} predates finding fingerprints, run backfill_finding_fingerprints "
+            "to carry its triage statuses forward."
+        ]
+    previous, carried = carry_forward_statuses(report, previous)
+    logger.info(f"Ingestion job {job.job_id}: carried forward {carried} statuses from report {previous.pk}")
+    return []
+
+
+def discard_partial_report(job):
+    """Remove whatever a failed job managed to insert; batches are committed as they are written"""
+    if job.report_id:
+        with disable_auditlog(), transaction.atomic():
+            reports = INGESTERS[job.report_type][1].objects.filter(pk=job.report_id)
+            if job.report_type == 'burpsuite':
+                delete_burpsuite_reports(reports)
+            else:
+                reports.delete()
+            delete_status_counts(job.report_id)
+        job.report_id = None
+
+
+def finish_job(job, status, **fields):
+    job.status = status
+    job.finished_at = timezone.now()
+    for field, value in fields.items():
+        setattr(job, field, value)
+    job.save()
+    if os.path.exists(job.file_path):
+        os.remove(job.file_path)
+    return job
+
+
+def run_ingestion_job(job):
+    """
+    Ingest a claimed job from its spooled file. Batches commit as they go so the progress
+    endpoint can see rows_processed/bytes_processed; a failure removes the partial report.
+    Triage statuses are carried forward from the previous report when the upload asked for it.
+    """
+    ingest_file = INGESTERS[job.report_type][0]
+
+    try:
+        with open(job.file_path, 'rb') as json_file:
+            def progress(stats):
+                IngestionJob.objects.filter(pk=job.pk).update(
+                    rows_processed=stats.rows,
+                    bytes_processed=json_file.tell()
+                )
+
+            stats, warnings = ingest_file(job, json_file, progress)
+        if job.carry_forward:
+            warnings += carry_forward_job_statuses(job)
+    except ValidationError as ve:
+        logger.warning(f"Ingestion job {job.job_id} rejected: {ve.messages}")
+        discard_partial_report(job)
+        return finish_job(job, 'failed', errors=job.errors + ve.messages)
+    except Exception as e:
+        logger.exception(f"Ingestion job {job.job_id} failed")
+        discard_partial_report(job)
+        return finish_job(job, 'failed', errors=job.errors + [str(e)])
+
+    logger.info(f"Ingestion job {job.job_id} completed: {stats.summary()}")
+    return finish_job(
+        job, 'completed',
+        rows_processed=stats.rows,
+        bytes_processed=job.file_size,
+        warnings=warnings,
+    )
+
+
+def recover_interrupted_jobs():
+    """Fail jobs left running by a worker that died; meant to run once when the (single) worker starts"""
+    interrupted = list(IngestionJob.objects.filter(status='running'))
+    for job in interrupted:
+        discard_partial_report(job)
+        finish_job(job, 'failed', errors=job.errors + ["The ingestion worker stopped before the job finished."])
+    return len(interrupted)
@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reports.models import NessusVulnerability, BurpSuiteVulnerability
+
+class Command(BaseCommand):
+    help = 'Fill the fingerprint column of vulnerabilities stored before finding fingerprints existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch_size', type=int, default=5000, help='Vulnerabilities updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        start_time = time.time()
+
+        for model in (NessusVulnerability, BurpSuiteVulnerability):
+            filled = 0
+            last_id = 0
+            while True:
+                # Keyset over the primary key so every batch is an index range scan and a restart resumes cleanly
+                batch = list(
+                    model.objects
+                    .filter(fingerprint='', id__gt=last_id)
+                    .order_by('id')
+                    .only('id', *model.FINGERPRINT_FIELDS)[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                with transaction.atomic():
+                    model.objects.bulk_update([vuln.set_fingerprint() for vuln in batch], ['fingerprint'])
+
+                filled += len(batch)
+                self.stdout.write(f"{model.__name__}: fingerprinted {filled} vulnerabilities")
+
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {filled} vulnerabilities fingerprinted"))
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill finished in {time.time() - start_time:.2f} seconds"))
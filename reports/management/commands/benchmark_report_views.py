@@ -0,0 +1,177 @@
+import gc
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from signatures.cache import signature_cache
+from signatures.versions import bump_signatures_version
+from reports.synthetic import SIZES, SyntheticTenant
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+class QueryCounter:
+    """Execute wrapper counting statements; unlike connection.queries it survives the per-request reset_queries"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Command(BaseCommand):
+    help = 'Time the report views against a synthetic tenant and record p50/p95 latency, query counts and peak memory as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=list(SIZES), default='1k', help='Synthetic tenant to benchmark (see generate_synthetic_data)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed the tenant was generated with')
+        parser.add_argument('--iterations', type=int, default=10, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per view before measuring')
+        parser.add_argument('--cache', choices=['cold', 'warm'], default='cold',
+                            help='cold: invalidate the rendered fragments and the signature cache before every timed request; warm: keep what the warm-up cached')
+        parser.add_argument('--output', type=str, help='Results file (default: benchmark-<size>-<commit>.json)')
+        parser.add_argument('--baseline', type=str, help='Earlier results file to compare against')
+        parser.add_argument('--max_regression', type=float, default=0.25, help='Allowed p95 slowdown against the baseline (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        tenant = SyntheticTenant(options['size'], seed=options['seed'])
+        if not tenant.exists():
+            raise CommandError(f"Synthetic tenant '{tenant.size}' not found, run: manage.py generate_synthetic_data --size {tenant.size} --seed {tenant.seed}")
+
+        # Failing views are recorded with their status code instead of aborting the run
+        client = Client(raise_request_exception=False)
+        client.force_login(tenant.user())
+        commit = git_commit()
+
+        results = {
+            'size': tenant.size,
+            'seed': tenant.seed,
+            'findings': tenant.findings,
+            'commit': commit,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'timestamp': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'cache': options['cache'],
+            'views': {},
+        }
+
+        # The test client talks to 'testserver'
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in self.view_urls(tenant).items():
+                results['views'][name] = self.measure(client, url, options['iterations'], options['warmup'], options['cache'] == 'cold')
+                view = results['views'][name]
+                self.stdout.write(
+                    f"{name:<24} {view['status']}  p50 {view['p50_ms']:>9.1f} ms  p95 {view['p95_ms']:>9.1f} ms  "
+                    f"{view['queries']:>5} queries  {view['peak_memory_kb']:>9.0f} KB peak  {view['response_bytes']} bytes"
+                )
+
+        output = options['output'] or f"benchmark-{tenant.size}-{commit or 'local'}.json"
+        with open(output, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_regression'])
+
+    def view_urls(self, tenant):
+        customer_id = tenant.customer_id
+        return {
+            'report_selection': reverse('reports:report_selection', kwargs={'customer_id': customer_id}),
+            'nessus_report_detail': reverse('reports:report_detail', kwargs={
+                'customer_id': customer_id, 'service_id': 'SYN-NESSUS', 'pk': tenant.nessus_report_id
+            }),
+            'nessus_report_groups': reverse('reports:nessus_report_groups', kwargs={
+                'customer_id': customer_id, 'service_id': 'SYN-NESSUS', 'report_id': tenant.nessus_report_id
+            }),
+            'burpsuite_report_detail': reverse('reports:report_detail', kwargs={
+                'customer_id': customer_id, 'service_id': 'SYN-BURPSUITE', 'pk': tenant.burpsuite_report_id
+            }),
+            'support_report_detail': reverse('reports:support_report_detail', kwargs={
+                'customer_id': customer_id, 'service_id': 'SYN-SUPPORT', 'pk': tenant.contract_id
+            }),
+        }
+
+    def invalidate_caches(self):
+        """Every cached fragment and count is keyed by the signatures version, a bump makes them all misses"""
+        bump_signatures_version()
+        signature_cache.clear()
+
+    def measure(self, client, url, iterations, warmup, cold):
+        for _ in range(warmup):
+            client.get(url)
+
+        timings = []
+        for _ in range(iterations):
+            if cold:
+                self.invalidate_caches()
+            gc.collect()
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+
+        # Memory is traced in a separate request, tracemalloc would skew the timings
+        if cold:
+            self.invalidate_caches()
+        gc.collect()
+        tracemalloc.start()
+        client.get(url)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'min_ms': round(min(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': queries.count,
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+            'response_bytes': len(response.content),
+        }
+
+    def compare(self, results, baseline_path, max_regression):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('cache', 'warm') != results['cache']:
+            raise CommandError(f"{baseline_path} was measured with a {baseline.get('cache', 'warm')} cache, this run with a {results['cache']} one")
+
+        regressions = []
+        for name, view in results['views'].items():
+            previous = baseline['views'].get(name)
+            if not previous:
+                continue
+            change = (view['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0
+            self.stdout.write(
+                f"{name:<24} p95 {previous['p95_ms']:.1f} -> {view['p95_ms']:.1f} ms ({change:+.0%}), "
+                f"queries {previous['queries']} -> {view['queries']}"
+            )
+            if change > max_regression:
+                regressions.append(f"{name} p95 {change:+.0%}")
+            if view['queries'] > previous['queries']:
+                regressions.append(f"{name} queries {previous['queries']} -> {view['queries']}")
+
+        if regressions:
+            raise CommandError(f"Regressions against {baseline_path}: {'; '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}"))
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from reports.synthetic import SIZES, SyntheticTenant
+
+class Command(BaseCommand):
+    help = 'Build deterministic synthetic tenants (customers, contracts, signatures, reports, time entries) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=list(SIZES), action='append', help='Tenant size in findings, repeat for several (default: 1k)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data')
+
+    def handle(self, *args, **options):
+        for size in options['size'] or ['1k']:
+            start_time = time.time()
+            tenant = SyntheticTenant(size, seed=options['seed'])
+            self.stdout.write(self.style.SUCCESS(f"Building synthetic tenant '{size}' ({tenant.findings} findings, seed {tenant.seed})"))
+            tenant.build(log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(f"Built tenant '{size}' in {time.time() - start_time:.2f} seconds"))
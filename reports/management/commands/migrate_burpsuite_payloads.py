@@ -0,0 +1,50 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reports.ingestion import store_burpsuite_payloads
+from reports.models import BurpSuiteVulnerability, BurpSuitePayload
+
+class Command(BaseCommand):
+    help = 'Move legacy Burp Suite request/response text into the compressed, content-addressed payload store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch_size', type=int, default=500, help='Vulnerabilities converted per transaction')
+        parser.add_argument('--prune', action='store_true', help='Delete payloads no vulnerability references any more')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        start_time = time.time()
+        known_digests = set()
+        migrated = 0
+        last_id = 0
+
+        while True:
+            # Keyset over the primary key so every batch is an index range scan and a restart resumes cleanly
+            batch = list(
+                BurpSuiteVulnerability.objects
+                .filter(payload__isnull=True, id__gt=last_id)
+                .order_by('id')
+                .only('id', 'request')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            with transaction.atomic():
+                digests = store_burpsuite_payloads((vuln.request or '[]' for vuln in batch), known_digests)
+                for vuln, digest in zip(batch, digests):
+                    vuln.payload_id = digest
+                    vuln.request = ''
+                BurpSuiteVulnerability.objects.bulk_update(batch, ['payload', 'request'])
+
+            migrated += len(batch)
+            self.stdout.write(f"Migrated {migrated} vulnerabilities")
+
+        duration = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f"Migrated {migrated} vulnerabilities ({len(known_digests)} new payloads) in {duration:.2f} seconds"
+        ))
+
+        if options['prune']:
+            deleted, _ = BurpSuitePayload.objects.filter(vulnerabilities__isnull=True).delete()
+            self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} unreferenced payloads"))
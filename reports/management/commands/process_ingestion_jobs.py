@@ -0,0 +1,62 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from reports.jobs import claim_next_job, run_ingestion_job, recover_interrupted_jobs
+from reports.artifacts import claim_next_artifact, run_artifact_job, recover_interrupted_artifacts
+from signatures.cache import signature_cache
+
+class Command(BaseCommand):
+    help = 'Ingest queued report uploads and render queued deliverables from the database-backed job queues (run a single worker per deployment)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll_interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Process the queued jobs and exit')
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+
+        recovered = recover_interrupted_jobs()
+        if recovered:
+            self.stdout.write(self.style.WARNING(f"Marked {recovered} interrupted job(s) as failed"))
+
+        requeued = recover_interrupted_artifacts()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} interrupted deliverable rendering(s)"))
+
+        self.stdout.write(self.style.SUCCESS("Ingestion worker started"))
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                # Uploads go first, deliverables are rendered when no upload is waiting
+                artifact = claim_next_artifact()
+                if artifact is not None:
+                    self.render_artifact(artifact)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f"Processing {job.get_report_type_display()} job {job.job_id} ({job.name})")
+            job = run_ingestion_job(job)
+
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f"Job {job.job_id} completed: {job.rows_processed} rows"))
+            else:
+                self.stdout.write(self.style.ERROR(f"Job {job.job_id} failed: {'; '.join(job.errors)}"))
+
+    def render_artifact(self, artifact):
+        self.stdout.write(f"Rendering {artifact.get_report_type_display()} deliverable {artifact.artifact_id} (report {artifact.report_id})")
+        artifact = run_artifact_job(artifact)
+        if artifact.status == 'completed':
+            self.stdout.write(self.style.SUCCESS(f"Deliverable {artifact.artifact_id} rendered: {artifact.rows_rendered} rows, {artifact.file_size} bytes"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Deliverable {artifact.artifact_id} failed: {artifact.error}"))
+        self.write_cache_stats()
+
+    def write_cache_stats(self):
+        stats = signature_cache.stats()
+        self.stdout.write(f"Signature cache: {stats['size']}/{stats['maxsize']} entries, {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
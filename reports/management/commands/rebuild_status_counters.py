@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from reports.counters import rebuild_status_counts
+from reports.models import NessusReport, BurpSuiteReport, ReportStatusCounter
+
+class Command(BaseCommand):
+    help = 'Recount the per-report status counters from the vulnerabilities (repair after manual edits or bulk imports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', type=str, help='Only rebuild the counters of this report ID')
+        parser.add_argument('--missing', action='store_true', help='Only rebuild the reports that have no counters yet (run at deploy)')
+
+    def handle(self, *args, **options):
+        rebuilt = 0
+        for model in (NessusReport, BurpSuiteReport):
+            reports = model.objects.all()
+            if options['report']:
+                reports = reports.filter(pk=options['report'])
+            if options['missing']:
+                reports = reports.exclude(pk__in=ReportStatusCounter.objects.values('report_id'))
+            for report in reports.only('pk').iterator():
+                rebuild_status_counts(report)
+                rebuilt += 1
+
+        if not options['report']:
+            # Counters of reports deleted outside the delete views
+            report_ids = list(NessusReport.objects.values_list('pk', flat=True)) + list(BurpSuiteReport.objects.values_list('pk', flat=True))
+            orphaned, _ = ReportStatusCounter.objects.exclude(report_id__in=report_ids).delete()
+            if orphaned:
+                self.stdout.write(self.style.WARNING(f"Removed {orphaned} counters of deleted reports"))
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt status counters of {rebuilt} report(s)"))
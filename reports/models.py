@@ -2,9 +2,13 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from customers.models import Customer
 from django.conf import settings
+from django.utils import timezone
 from inventories.models import Service
 from signatures.models import NessusSignature, BurpSuiteSignature
+import hashlib
+import json
 import uuid
+import zlib
 
 class BaseReport(models.Model):
     report_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -12,7 +16,9 @@ class BaseReport(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, to_field='customer_id', db_constraint=False )
     contract = models.ForeignKey('contracts.Contract', on_delete=models.DO_NOTHING, null=True, blank=True, to_field='contract_id', db_constraint=False)
     date = models.DateField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)  # Orders the reports uploaded on the same date
     service = models.ForeignKey(Service, on_delete=models.PROTECT, db_constraint=False)
+    cache_version = models.PositiveIntegerField(default=0, editable=False)  # Bumped by uploads and status transitions, keys the rendered fragments
     
     class Meta:
         abstract = True
@@ -20,10 +26,43 @@ class BaseReport(models.Model):
     def __str__(self):
         return f"{self.name} - {self.customer.customer_name} - {self.date}"
 
+class FingerprintedFinding(models.Model):
+    """
+    Stores a digest of the fields that identify a finding across reports (FINGERPRINT_FIELDS), so diffs and
+    carry-forward between scans are single indexed equality lookups. bulk_create callers use set_fingerprint().
+    """
+    FINGERPRINT_FIELDS = ()  # To be set by subclasses
+    fingerprint = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def fingerprint_values(cls, values):
+        return hashlib.sha256(json.dumps([str(values[field]) for field in cls.FINGERPRINT_FIELDS]).encode()).hexdigest()
+
+    def set_fingerprint(self):
+        self.fingerprint = self.fingerprint_values({field: getattr(self, field) for field in self.FINGERPRINT_FIELDS})
+        return self
+
+    def save(self, *args, **kwargs):
+        self.set_fingerprint()
+        super().save(*args, **kwargs)
+
 class NessusReport(BaseReport):
     inventory = models.JSONField()
 
-class NessusVulnerability(models.Model):
+RISK_FACTOR_ORDER = ['Critical', 'High', 'Medium', 'Low', 'Informational', 'None']
+
+def risk_rank(risk_factor):
+    """Severity order of a risk factor, unknown values sort last"""
+    try:
+        return RISK_FACTOR_ORDER.index(risk_factor)
+    except ValueError:
+        return len(RISK_FACTOR_ORDER)
+
+class NessusVulnerability(FingerprintedFinding):
+    FINGERPRINT_FIELDS = ('signature_id', 'target_affected')
     report = models.ForeignKey(NessusReport, on_delete=models.CASCADE, related_name='vulnerabilities')
     signature = models.ForeignKey(NessusSignature, on_delete=models.CASCADE)
     target_affected = models.CharField(max_length=255)
@@ -41,13 +80,46 @@ class NessusVulnerability(models.Model):
     changed_at = models.DateTimeField(auto_now=True)
     changed_by = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a report's signature groups (NessusReportGroupsView)
+            models.Index(fields=['report', 'signature', 'id'], name='nessus_vuln_report_sig_idx'),
+            # Finding lookups across reports (reports.diff)
+            models.Index(fields=['report', 'fingerprint'], name='nessus_vuln_report_fp_idx'),
+            # Status transitions exclude the target status, counters are rebuilt by status
+            models.Index(fields=['report', 'status'], name='nessus_vuln_report_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.signature} - {self.target_affected} - {self.status}"
 
 class BurpSuiteReport(BaseReport):
     pass
 
-class BurpSuiteVulnerability(models.Model):
+class BurpSuitePayload(models.Model):
+    """Content-addressed, zlib-compressed request/response payload shared by Burp Suite vulnerabilities"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.digest} ({self.size} bytes)"
+
+    @staticmethod
+    def digest_for(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def build(cls, text):
+        encoded = text.encode('utf-8')
+        return cls(digest=hashlib.sha256(encoded).hexdigest(), data=zlib.compress(encoded), size=len(encoded))
+
+    @property
+    def text(self):
+        return zlib.decompress(bytes(self.data)).decode('utf-8')
+
+class BurpSuiteVulnerability(FingerprintedFinding):
+    FINGERPRINT_FIELDS = ('signature_id', 'host', 'path', 'location')
     report = models.ForeignKey(BurpSuiteReport, on_delete=models.CASCADE, related_name='vulnerabilities')
     signature = models.ForeignKey(BurpSuiteSignature, on_delete=models.CASCADE)
     host = models.CharField(max_length=255)
@@ -56,7 +128,8 @@ class BurpSuiteVulnerability(models.Model):
     severity = models.CharField(max_length=50)
     confidence = models.CharField(max_length=50)
     issueDetail = models.TextField(default='N/A', null=False)
-    request = models.TextField()
+    request = models.TextField(blank=True, default='')  # Legacy uncompressed payload, moved to `payload` by migrate_burpsuite_payloads
+    payload = models.ForeignKey(BurpSuitePayload, on_delete=models.PROTECT, null=True, blank=True, related_name='vulnerabilities')
     STATUS_CHOICES = [
         ('not_started', 'Not Started'),
         ('in_review', 'In Review'),
@@ -70,9 +143,117 @@ class BurpSuiteVulnerability(models.Model):
     changed_at = models.DateTimeField(auto_now=True)
     changed_by = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Detail page grouping and the per-signature / per-severity bulk status updates
+            models.Index(fields=['report', 'signature'], name='burp_vuln_report_sig_idx'),
+            models.Index(fields=['report', 'severity'], name='burp_vuln_report_severity_idx'),
+            models.Index(fields=['report', 'status'], name='burp_vuln_report_status_idx'),
+            # Finding lookups across reports
+            models.Index(fields=['report', 'fingerprint'], name='burp_vuln_report_fp_idx'),
+        ]
+
     def __str__(self):
         return f"{self.signature} - {self.host} - {self.severity}"
 
+    @property
+    def requests(self):
+        if self.payload_id:
+            return json.loads(self.payload.text)
+        return json.loads(self.request or '[]')
+
+class ReportStatusCounter(models.Model):
+    """Vulnerability count per status of a report, kept in step with every insert and status change"""
+    report_id = models.UUIDField()
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['report_id', 'status'], name='unique_report_status_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_id} - {self.status}: {self.count}"
+
+class IngestionJob(models.Model):
+    """Queued report upload, spooled to disk and ingested by the process_ingestion_jobs worker"""
+    REPORT_TYPE_CHOICES = [
+        ('nessus', 'Nessus'),
+        ('burpsuite', 'BurpSuite'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPE_CHOICES)
+    name = models.CharField(max_length=255)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, to_field='customer_id', db_constraint=False)
+    contract = models.ForeignKey('contracts.Contract', on_delete=models.DO_NOTHING, null=True, blank=True, to_field='contract_id', db_constraint=False)
+    service = models.ForeignKey(Service, on_delete=models.PROTECT, db_constraint=False)
+    file_path = models.CharField(max_length=500)
+    file_size = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    warnings = models.JSONField(default=list, blank=True)
+    report_id = models.UUIDField(null=True, blank=True)
+    carry_forward = models.BooleanField(default=False)  # Copy triaged statuses from the previous report once ingested
+    created_by = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} - {self.name} - {self.status}"
+
+    @property
+    def progress(self):
+        """Fraction of the spooled file consumed by the parser"""
+        if self.status == 'completed':
+            return 1.0
+        return min(self.bytes_processed / self.file_size, 1.0) if self.file_size else 0.0
+
+    @property
+    def eta_seconds(self):
+        if self.status != 'running' or not self.started_at or not self.progress:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        return elapsed * (1 - self.progress) / self.progress
+
+class ReportArtifact(models.Model):
+    """
+    Queued rendering of a report deliverable, written to REPORT_ARTIFACT_DIR by the process_ingestion_jobs worker.
+    `content_version` is the report's cache_version and the signatures version the artifact was rendered from.
+    """
+    STATUS_CHOICES = IngestionJob.STATUS_CHOICES
+    artifact_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report_type = models.CharField(max_length=20, choices=IngestionJob.REPORT_TYPE_CHOICES)
+    report_id = models.UUIDField(db_index=True)
+    content_version = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    file_path = models.CharField(max_length=500)
+    file_size = models.BigIntegerField(default=0)
+    rows_rendered = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} - {self.report_id} - {self.content_version} - {self.status}"
+
 class SupportReport(BaseReport):
     """Virtual report type to show engagement data"""
     class Meta:
@@ -0,0 +1,133 @@
+import codecs
+import ijson
+from abc import ABC, abstractmethod
+from datetime import datetime
+from django.core.exceptions import ValidationError
+
+
+def build_value(events, prefix, event, value):
+    """Materialise the JSON value that starts at the current event, consuming its events"""
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    if event in ('start_map', 'start_array'):
+        end_event = 'end_map' if event == 'start_map' else 'end_array'
+        for inner_prefix, inner_event, inner_value in events:
+            builder.event(inner_event, inner_value)
+            if inner_prefix == prefix and inner_event == end_event:
+                break
+    return builder.value
+
+
+def skip_bom(json_file):
+    """Move past the UTF-8 byte order mark Windows tools write in front of exports, if there is one"""
+    start = json_file.tell()
+    if json_file.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+        json_file.seek(start)
+
+
+class StreamingReportParser(ABC):
+    """
+    Single-pass validating parser for uploaded scanner exports.
+    Iterating the parser yields validated records while the header keys are collected
+    into `self.header`; a missing top level key is reported once the document ends.
+    """
+    required_keys = []
+    header_keys = []
+
+    def __init__(self, json_file):
+        self.json_file = json_file
+        self.header = {}
+        self.keys = set()
+        self.records = 0
+
+    def __iter__(self):
+        skip_bom(self.json_file)
+        try:
+            yield from self.parse(ijson.parse(self.json_file, use_float=True))
+        except ijson.JSONError:
+            raise ValidationError("The uploaded file is not a valid JSON file.")
+        for key in self.required_keys:
+            if key not in self.keys:
+                raise ValidationError(f"The JSON file is missing the '{key}' key.")
+        self.validate_header()
+
+    @abstractmethod
+    def parse(self, events):
+        """Yield the validated records of the (prefix, event, value) stream"""
+
+    def read_top_level(self, events, prefix, event, value):
+        """Track top level keys and capture header values; returns True when the event was consumed"""
+        if prefix == '' and event == 'map_key':
+            self.keys.add(value)
+            return True
+        if prefix in self.header_keys:
+            self.header[prefix] = build_value(events, prefix, event, value)
+            return True
+        return False
+
+    def check_fields(self, record, fields, label):
+        missing_fields = [field for field in fields if field not in record or record[field] is None]
+        if missing_fields:
+            raise ValidationError(f"{label} is missing required fields: {', '.join(missing_fields)}")
+
+    def validate_header(self):
+        pass
+
+
+class NessusReportParser(StreamingReportParser):
+    required_keys = ['date', 'inventory', 'alert_report']
+    header_keys = ['date', 'inventory']
+    alert_fields = ['plugin_id', 'target_affected', 'os']
+
+    def parse(self, events):
+        for prefix, event, value in events:
+            if self.read_top_level(events, prefix, event, value):
+                continue
+            if prefix == 'alert_report.item' and event == 'start_map':
+                alert = build_value(events, prefix, event, value)
+                self.records += 1
+                self.check_fields(alert, self.alert_fields, f"Alert {self.records}")
+                yield alert
+
+
+class BurpSuiteReportParser(StreamingReportParser):
+    """
+    Yields (issue, instance) pairs from issues[*].instances[*]. Only one instance is
+    materialised at a time; instances are held back only when they appear before the
+    issue's type/name/host keys.
+    """
+    required_keys = ['exportTime', 'issues']
+    header_keys = ['exportTime']
+    issue_fields = ['type', 'name', 'host']
+    instance_fields = ['path', 'location', 'severity', 'confidence']
+
+    def parse(self, events):
+        issue = {}
+        pending = []
+
+        for prefix, event, value in events:
+            if self.read_top_level(events, prefix, event, value):
+                continue
+            if prefix == 'issues.item' and event == 'start_map':
+                issue, pending = {}, []
+            elif prefix.startswith('issues.item.') and prefix[len('issues.item.'):] in self.issue_fields:
+                issue[prefix[len('issues.item.'):]] = value
+            elif prefix == 'issues.item.instances.item' and event == 'start_map':
+                instance = build_value(events, prefix, event, value)
+                self.records += 1
+                self.check_fields(instance, self.instance_fields, f"Instance {self.records}")
+                if all(field in issue for field in self.issue_fields):
+                    yield issue, instance
+                else:
+                    pending.append(instance)
+            elif prefix == 'issues.item' and event == 'end_map':
+                self.check_fields(issue, self.issue_fields, "Issue")
+                for instance in pending:
+                    yield issue, instance
+                pending = []
+
+    def validate_header(self):
+        try:
+            datetime.strptime(self.header['exportTime'], "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ValidationError("The 'exportTime' key must be a date in YYYY-MM-DD format.")
@@ -0,0 +1,271 @@
+import datetime
+import json
+import random
+import uuid
+from decimal import Decimal
+from auditlog.context import disable_auditlog
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from contracts.models import Contract, ContractService
+from customers.models import Customer
+from engagements.models import Engagement, TimeEntry
+from inventories.models import Service, ReportType
+from signatures.bulk import index_signature_links
+from signatures.models import NessusSignature, BurpSuiteSignature
+from .counters import rebuild_status_counts, delete_status_counts
+from .ingestion import chunked, delete_burpsuite_reports, store_burpsuite_payloads
+from .models import NessusReport, NessusVulnerability, BurpSuiteReport, BurpSuiteVulnerability
+
+# Findings per tenant for each benchmark size
+SIZES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Synthetic signatures live above the real plugin/issue type ID ranges
+SIGNATURE_ID_OFFSET = 900_000_000
+INSERT_BATCH_SIZE = 5000
+BENCHMARK_USER_EMAIL = 'synthetic-benchmark@example.com'
+
+RISK_FACTORS = ['Critical', 'High', 'Medium', 'Low', 'Informational']
+RISK_WEIGHTS = [2, 8, 25, 15, 50]
+BURP_SEVERITIES = ['High', 'Medium', 'Low', 'Information']
+BURP_CONFIDENCES = ['Certain', 'Firm', 'Tentative']
+STATUS_WEIGHTS = {'not_started': 70, 'in_review': 10, 'mitigated': 5, 'fixed': 10, 'risk_accepted': 5}
+
+
+class SyntheticTenant:
+    """
+    Deterministic tenant (customer, contract, services, signatures, reports, engagements) for one benchmark size.
+    Every ID and value derives from (seed, size), so two builds with the same arguments produce the same data.
+    """
+
+    def __init__(self, size, seed=0):
+        if size not in SIZES:
+            raise ValueError(f"Unknown size '{size}', expected one of: {', '.join(SIZES)}")
+        self.size = size
+        self.seed = seed
+        self.findings = SIZES[size]
+        self.rng = random.Random(f"{seed}-{size}")
+        self.customer_id = self.uuid()
+        self.contract_id = f"C-SYN-{seed}-{size}"
+        self.nessus_report_id = self.uuid()
+        self.burpsuite_report_id = self.uuid()
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    @property
+    def nessus_signature_count(self):
+        return min(max(self.findings // 20, 50), 20_000)
+
+    @property
+    def burpsuite_signature_count(self):
+        return min(max(self.findings // 200, 20), 1_000)
+
+    @property
+    def burpsuite_findings(self):
+        # Burp instances carry request/response payloads, reports are an order of magnitude smaller than Nessus ones
+        return max(self.findings // 10, 100)
+
+    def exists(self):
+        return Customer.objects.filter(customer_id=self.customer_id).exists()
+
+    def user(self):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCHMARK_USER_EMAIL).first()
+        return user or User.objects.create_superuser(BENCHMARK_USER_EMAIL, None)
+
+    def services(self):
+        services = {}
+        for name in ('Nessus', 'BurpSuite', 'Support'):
+            report_type, _ = ReportType.objects.get_or_create(name=name)
+            services[name], _ = Service.objects.get_or_create(
+                service_id=f'SYN-{name.upper()}',
+                defaults={'service_name': f'Synthetic {name}', 'service_price': Decimal('100'), 'report_type': report_type}
+            )
+        return services
+
+    def delete(self):
+        """Remove a previous build of this tenant; signatures are shared across sizes and kept"""
+        with disable_auditlog(), transaction.atomic():
+            for model in (NessusReport, BurpSuiteReport):
+                for report_id in model.objects.filter(customer_id=self.customer_id).values_list('pk', flat=True):
+                    delete_status_counts(report_id)
+            NessusReport.objects.filter(customer_id=self.customer_id).delete()
+            delete_burpsuite_reports(BurpSuiteReport.objects.filter(customer_id=self.customer_id))
+            Engagement.objects.filter(customer_id=self.customer_id).delete()
+            for customer in Customer.objects.filter(customer_id=self.customer_id):
+                customer.delete()
+
+    def build(self, log=print):
+        self.delete()
+        with disable_auditlog():
+            user = self.user()
+            services = self.services()
+            customer, contract, contract_services = self.build_customer(services)
+            log(f"Customer {customer.customer_id} with contract {contract.contract_id}")
+            self.build_signatures()
+            log(f"{self.nessus_signature_count} Nessus and {self.burpsuite_signature_count} BurpSuite signatures")
+            self.build_nessus_report(customer, contract, services['Nessus'], user)
+            log(f"Nessus report {self.nessus_report_id} with {self.findings} findings")
+            self.build_burpsuite_report(customer, contract, services['BurpSuite'], user)
+            log(f"BurpSuite report {self.burpsuite_report_id} with {self.burpsuite_findings} instances")
+            time_entries = self.build_engagements(customer, contract, contract_services['Support'], user)
+            log(f"{time_entries} time entries")
+        return customer
+
+    def build_customer(self, services):
+        customer = Customer.objects.create(customer_id=self.customer_id, customer_name=f'Synthetic {self.size}')
+        Customer.objects.filter(pk=customer.pk).update(created_on=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        customer.refresh_from_db()
+
+        contract = Contract(
+            contract_id=self.contract_id,
+            customer=customer,
+            contract_start_date=datetime.date(2024, 1, 1),
+            contract_end_date=datetime.date(2030, 12, 31),
+            contract_status='ACTIVE',
+            taxes=Decimal('13'),
+        )
+        contract.save()
+        contract_services = {
+            name: ContractService.objects.create(contract=contract, service=service, quantity=1000)
+            for name, service in services.items()
+        }
+        contract.calculate_total()
+        return customer, contract, contract_services
+
+    def build_signatures(self):
+        rng = random.Random(f"{self.seed}-signatures")
+        nessus_signatures = []
+        for i in range(self.nessus_signature_count):
+            signature_id = SIGNATURE_ID_OFFSET + i
+            nessus_signatures.append(NessusSignature(
+                id=signature_id,
+                name=f'Synthetic plugin {i}',
+                description=f'Synthetic description {i}. ' * rng.randint(5, 40),
+                solution=f'Upgrade component {i}.',
+                synopsis=f'Synthetic synopsis {i}',
+                risk_factor=rng.choices(RISK_FACTORS, RISK_WEIGHTS)[0],
+                cvss_base_score=round(rng.uniform(0, 10), 1),
+                cve=f'["CVE-2099-{i:05d}"]',
+                xref=f'["IAVA:2099-A-{i:04d}"]',
+                references=f'https://example.com/advisories/{i} https://example.com/kb/{i}',
+                scanner_type='Nessus',
+            ))
+        for batch in chunked(nessus_signatures, INSERT_BATCH_SIZE):
+            NessusSignature.objects.bulk_create(batch, ignore_conflicts=True)
+        index_signature_links(signature.id for signature in nessus_signatures)
+
+        BurpSuiteSignature.objects.bulk_create([
+            BurpSuiteSignature(
+                id=SIGNATURE_ID_OFFSET + i,
+                name=f'Synthetic issue {i}',
+                description=f'<p>Synthetic issue background {i}.</p>' * rng.randint(2, 10),
+                remediation=f'<p>Synthetic remediation {i}.</p>',
+                scanner_type='BurpSuite',
+            )
+            for i in range(self.burpsuite_signature_count)
+        ], ignore_conflicts=True)
+
+    def build_nessus_report(self, customer, contract, service, user):
+        rng = random.Random(f"{self.seed}-{self.size}-nessus")
+        report = NessusReport.objects.create(
+            report_id=self.nessus_report_id,
+            name=f'Synthetic Nessus {self.size}',
+            customer=customer,
+            contract=contract,
+            service=service,
+            inventory=[f'10.0.{i // 256}.{i % 256}' for i in range(min(self.findings // 10, 1000))],
+        )
+        hosts = max(self.findings // 25, 10)
+        statuses, weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+
+        def rows():
+            for i in range(self.findings):
+                status = rng.choices(statuses, weights)[0]
+                yield NessusVulnerability(
+                    report=report,
+                    signature_id=SIGNATURE_ID_OFFSET + rng.randrange(self.nessus_signature_count),
+                    target_affected=f'host-{rng.randrange(hosts)}.synthetic.test',
+                    operating_system=rng.choice(['Linux', 'Windows', 'FreeBSD']),
+                    status=status,
+                    changed_by=None if status == 'not_started' else user,
+                ).set_fingerprint()
+
+        for batch in chunked(rows(), INSERT_BATCH_SIZE):
+            NessusVulnerability.objects.bulk_create(batch)
+        rebuild_status_counts(report)
+        return report
+
+    def build_burpsuite_report(self, customer, contract, service, user):
+        rng = random.Random(f"{self.seed}-{self.size}-burpsuite")
+        report = BurpSuiteReport.objects.create(
+            report_id=self.burpsuite_report_id,
+            name=f'Synthetic BurpSuite {self.size}',
+            customer=customer,
+            contract=contract,
+            service=service,
+        )
+        # A few hundred distinct request/response pairs, repeated across instances like real scans
+        payloads = [
+            json.dumps([f'GET /page/{i} HTTP/1.1', 'HTTP/1.1 200 OK ' + 'x' * rng.randint(100, 5000)])
+            for i in range(300)
+        ]
+        digests = store_burpsuite_payloads(payloads, set())
+
+        def rows():
+            for i in range(self.burpsuite_findings):
+                yield BurpSuiteVulnerability(
+                    report=report,
+                    signature_id=SIGNATURE_ID_OFFSET + rng.randrange(self.burpsuite_signature_count),
+                    host=f'https://app-{rng.randrange(20)}.synthetic.test',
+                    path=f'/api/v1/resource/{rng.randrange(5000)}',
+                    location=rng.choice(['Query parameter', 'Body parameter', 'Cookie', 'Header']),
+                    severity=rng.choice(BURP_SEVERITIES),
+                    confidence=rng.choice(BURP_CONFIDENCES),
+                    issueDetail=f'<p>Synthetic detail {i}</p>',
+                    payload_id=rng.choice(digests),
+                ).set_fingerprint()
+
+        for batch in chunked(rows(), INSERT_BATCH_SIZE):
+            BurpSuiteVulnerability.objects.bulk_create(batch)
+        rebuild_status_counts(report)
+        return report
+
+    def build_engagements(self, customer, contract, contract_service, user):
+        rng = random.Random(f"{self.seed}-{self.size}-engagements")
+        engagements = [
+            Engagement(
+                engagement_id=f'SYN-{self.seed}-{self.size}-{i:05d}',
+                name=f'Synthetic engagement {i}',
+                priority=rng.choice(['LOW', 'MEDIUM', 'HIGH', 'URGENT']),
+                customer=customer,
+                contract=contract,
+                contract_service=contract_service,
+                client_description=f'Synthetic engagement {i}',
+                status=rng.choice(['OPEN', 'IN_PROGRESS', 'RESOLVED', 'CANCELLED']),
+                created_by=user,
+            )
+            for i in range(max(self.findings // 1000, 5))
+        ]
+        Engagement.objects.bulk_create(engagements)
+
+        def time_entries():
+            for i in range(max(self.findings // 100, 20)):
+                yield TimeEntry(
+                    engagement=engagements[rng.randrange(len(engagements))],
+                    client_comment=f'Synthetic work {i}',
+                    hours_spent=Decimal(rng.randint(1, 16)) / 4,
+                    date=datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(365)),
+                    created_by=user,
+                )
+
+        count = 0
+        for batch in chunked(time_entries(), INSERT_BATCH_SIZE):
+            TimeEntry.objects.bulk_create(batch)
+            count += len(batch)
+        return count
@@ -1,3 +1,708 @@
-from django.test import TestCase
+import codecs
+import csv
+import datetime
+import functools
+import io
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from customers.models import Customer
+from inventories.models import Service, ReportType
+from signatures.cache import signature_cache
+from signatures.models import NessusSignature, BurpSuiteSignature, SignatureRevision
+from .artifacts import artifact_path, content_version, run_artifact_job
+from .counters import delete_status_counts, rebuild_status_counts, status_counts
+from .diff import diff_counts, diff_page, severity_changes_page
+from .ingestion import delete_burpsuite_reports, ingest_burpsuite_instances, ingest_nessus_alerts, store_burpsuite_payloads
+from .forms.burpsuite import BurpSuiteReportUploadForm
+from .forms.nessus import NessusReportUploadForm
+from .jobs import claim_next_job, recover_interrupted_jobs, run_ingestion_job, spool_upload
+from .parsers import BurpSuiteReportParser, NessusReportParser
+from .models import IngestionJob, NessusReport, NessusVulnerability, ReportArtifact, BurpSuiteReport, BurpSuiteVulnerability, BurpSuitePayload
+from .triage import carry_forward_statuses, previous_report, transition_status, update_returning_previous
 
-# Create your tests here.
+
+class ReportTestMixin:
+    """
+    A customer, Nessus and Burp Suite services, a user and a few signatures; reports are built with
+    nessus_report() and burpsuite_report()
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(customer_name='Customer')
+        report_type = ReportType.objects.create(name='Nessus')
+        cls.service = Service.objects.create(service_id='nessus', service_name='Nessus', service_price=1, report_type=report_type)
+        cls.burpsuite_service = Service.objects.create(
+            service_id='burpsuite', service_name='Burp Suite', service_price=1, report_type=ReportType.objects.create(name='BurpSuite')
+        )
+        cls.user = get_user_model().objects.create_user('analyst@example.com', 'password')
+        NessusSignature.objects.bulk_create([
+            NessusSignature(id=signature_id, name=f'Plugin {signature_id}', risk_factor='High', scanner_type='Nessus')
+            for signature_id in (1, 2, 3)
+        ])
+
+    def login(self, user=None):
+        self.client.force_login(user or get_user_model().objects.create_superuser('admin@example.com', 'password'))
+        session = self.client.session
+        session['selected_customer_id'] = str(self.customer.customer_id)
+        session.save()
+
+    def nessus_report(self, name, findings=(), created_at=None, **fields):
+        """Report with (signature_id, target_affected, status) findings and rebuilt status counters"""
+        report = NessusReport.objects.create(
+            customer=self.customer, service=self.service, name=name, inventory=[],
+            created_at=created_at or timezone.now(), **fields
+        )
+        NessusVulnerability.objects.bulk_create([
+            NessusVulnerability(
+                report=report, signature_id=signature_id, target_affected=target, operating_system='linux', status=status
+            ).set_fingerprint()
+            for signature_id, target, status in findings
+        ])
+        rebuild_status_counts(report)
+        return report
+
+    def ingestion_job(self, report_type, document, **fields):
+        """Queued upload of `document` spooled to a temporary directory"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        service = self.service if report_type == 'nessus' else self.burpsuite_service
+        with override_settings(INGESTION_SPOOL_DIR=directory.name):
+            return spool_upload(
+                SimpleUploadedFile('report.json', json.dumps(document).encode('utf-8')),
+                report_type=report_type, name='Upload', customer=self.customer, service=service,
+                created_by=self.user, **fields
+            )
+
+    def burpsuite_report(self, name, payloads):
+        """Report with one SQL injection instance per request/response payload"""
+        signature, _ = BurpSuiteSignature.objects.get_or_create(id=1, defaults={'name': 'SQL injection'})
+        report = BurpSuiteReport.objects.create(customer=self.customer, service=self.burpsuite_service, name=name)
+        digests = store_burpsuite_payloads(payloads, set())
+        BurpSuiteVulnerability.objects.bulk_create([
+            BurpSuiteVulnerability(
+                report=report, signature=signature, host='https://app.example.com', path=f'/{index}',
+                location='query', severity='High', confidence='Certain', payload_id=digest
+            ).set_fingerprint()
+            for index, digest in enumerate(digests)
+        ])
+        rebuild_status_counts(report)
+        return report
+
+
+class StatusCounterTests(ReportTestMixin, TestCase):
+    findings = [(1, 'host-a', 'not_started'), (2, 'host-a', 'not_started'), (3, 'host-b', 'in_review')]
+
+    def test_transition_updates_counters(self):
+        report = self.nessus_report('Report', self.findings)
+        with transaction.atomic():
+            rows = transition_status(report, report.vulnerabilities.filter(signature_id__in=[1, 3]), 'fixed', self.user)
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(status_counts([report.pk]), {'not_started': 1, 'fixed': 2})
+
+    def test_transition_builds_missing_counters_first(self):
+        report = self.nessus_report('Report', self.findings)
+        delete_status_counts(report.pk)  # As for reports stored before the counters existed
+        with transaction.atomic():
+            transition_status(report, report.vulnerabilities.filter(signature_id=1), 'fixed', self.user)
+
+        self.assertEqual(status_counts([report.pk]), {'not_started': 1, 'in_review': 1, 'fixed': 1})
+
+    def test_transition_writes_one_audit_entry_per_changed_finding(self):
+        report = self.nessus_report('Report', self.findings)
+        with transaction.atomic():
+            rows = transition_status(report, report.vulnerabilities.all(), 'in_review', self.user)
+
+        entries = LogEntry.objects.filter(content_type=ContentType.objects.get_for_model(NessusVulnerability))
+        self.assertEqual(sorted(entry.object_id for entry in entries), sorted(row['id'] for row in rows))
+        self.assertEqual(len(rows), 2)
+        for entry in entries:
+            self.assertEqual(entry.action, LogEntry.Action.UPDATE)
+            self.assertEqual(entry.changes_dict['status'], ['not_started', 'in_review'])
+            self.assertEqual((entry.actor, entry.actor_email), (self.user, self.user.email))
+
+    def test_transition_returns_the_previous_values_and_requested_fields(self):
+        report = self.nessus_report('Report', self.findings)
+        with transaction.atomic():
+            rows = transition_status(report, report.vulnerabilities.all(), 'fixed', self.user, fields=('target_affected',))
+
+        self.assertEqual(
+            sorted((row['previous_status'], row['previous_changed_by_id'], row['target_affected']) for row in rows),
+            [('in_review', None, 'host-b'), ('not_started', None, 'host-a'), ('not_started', None, 'host-a')]
+        )
+        self.assertEqual(set(report.vulnerabilities.values_list('status', 'changed_by')), {('fixed', self.user.pk)})
+
+    @skipUnless(connection.vendor == 'postgresql', 'UPDATE ... RETURNING is only used on PostgreSQL')
+    def test_update_returning_previous_on_postgresql(self):
+        report = self.nessus_report('Report', self.findings)
+        other = get_user_model().objects.create_user('reviewer@example.com', 'password')
+        report.vulnerabilities.filter(signature_id=3).update(changed_by=other)
+        changed_at = timezone.now()
+
+        with transaction.atomic():
+            rows = update_returning_previous(
+                report.vulnerabilities.exclude(signature_id=1), 'fixed', self.user, changed_at, ('signature_id', 'target_affected')
+            )
+
+        self.assertEqual(sorted((row['signature_id'], row['previous_status'], row['previous_changed_by_id'], row['target_affected']) for row in rows), [
+            (2, 'not_started', None, 'host-a'), (3, 'in_review', other.pk, 'host-b'),
+        ])
+        self.assertEqual(sorted(report.vulnerabilities.values_list('signature_id', 'status', 'changed_by')), [
+            (1, 'not_started', None), (2, 'fixed', self.user.pk), (3, 'fixed', self.user.pk),
+        ])
+        self.assertEqual(set(report.vulnerabilities.exclude(signature_id=1).values_list('changed_at', flat=True)), {changed_at})
+
+    def test_rebuild_missing_counters_command(self):
+        report = self.nessus_report('Report', self.findings)
+        delete_status_counts(report.pk)
+        call_command('rebuild_status_counters', '--missing', stdout=io.StringIO())
+
+        self.assertEqual(status_counts([report.pk]), {'not_started': 2, 'in_review': 1})
+
+
+class CarryForwardTests(ReportTestMixin, TestCase):
+    findings = [(1, 'host-a', 'not_started'), (2, 'host-a', 'not_started'), (3, 'host-b', 'not_started')]
+
+    def test_previous_report_breaks_same_day_ties_by_upload_time(self):
+        now = timezone.now()
+        other = self.nessus_report('Other scan', created_at=now - datetime.timedelta(hours=3))
+        original = self.nessus_report('Original', [
+            (1, 'host-a', 'risk_accepted'), (2, 'host-a', 'in_review'), (3, 'host-b', 'fixed'),
+        ], created_at=now - datetime.timedelta(hours=2))
+        reupload = self.nessus_report('Re-upload', self.findings, created_at=now - datetime.timedelta(hours=1))
+        self.nessus_report('Later upload', created_at=now)
+
+        self.assertEqual(other.date, reupload.date)
+        self.assertEqual(previous_report(reupload), original)
+
+        previous, carried = carry_forward_statuses(reupload)
+        self.assertEqual(previous, original)
+        self.assertEqual(carried, 2)
+        statuses = dict(reupload.vulnerabilities.values_list('signature_id', 'status'))
+        self.assertEqual(statuses, {1: 'risk_accepted', 2: 'in_review', 3: 'not_started'})
+
+    def test_previous_report_skips_reports_still_being_ingested(self):
+        now = timezone.now()
+        original = self.nessus_report('Original', created_at=now - datetime.timedelta(hours=2))
+        ingesting = self.nessus_report('Ingesting', created_at=now - datetime.timedelta(hours=1))
+        IngestionJob.objects.create(
+            report_type='nessus', name='Ingesting', customer=self.customer, service=self.service,
+            file_path='/nonexistent', status='running', report_id=ingesting.pk
+        )
+        report = self.nessus_report('Latest', created_at=now)
+        self.assertEqual(previous_report(report), original)
+
+    def test_unfingerprinted_previous_report_is_not_carried_forward(self):
+        now = timezone.now()
+        original = self.nessus_report('Original', [(1, 'host-a', 'risk_accepted')], created_at=now - datetime.timedelta(hours=1))
+        original.vulnerabilities.update(fingerprint='')
+        report = self.nessus_report('Latest', [(1, 'host-a', 'not_started')], created_at=now)
+
+        self.assertEqual(carry_forward_statuses(report), (original, 0))
+        call_command('backfill_finding_fingerprints', stdout=io.StringIO())
+        self.assertEqual(carry_forward_statuses(report), (original, 1))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ReportDiffTests(ReportTestMixin, TestCase):
+    def test_diff_categories_match_findings_by_fingerprint(self):
+        base = self.nessus_report('Base', [(1, 'host-a', 'mitigated'), (2, 'host-a', 'not_started')])
+        head = self.nessus_report('Head', [(2, 'host-a', 'not_started'), (3, 'host-b', 'not_started')])
+
+        self.assertEqual(diff_counts(base, head), {'new': 1, 'resolved': 1, 'persisting': 1})
+        rows, next_after = diff_page(base, head, 'resolved')
+        self.assertEqual([(row['signature_id'], row['target_affected']) for row in rows], [(1, 'host-a')])
+        self.assertIsNone(next_after)
+        rows, next_after = diff_page(base, head, 'persisting')
+        self.assertEqual([(row['signature_id'], row['base_status']) for row in rows], [(2, 'not_started')])
+
+    def test_severity_changes_since_the_report_date(self):
+        report = self.nessus_report('Report', [(1, 'host-a', 'not_started'), (2, 'host-a', 'not_started')])
+        NessusReport.objects.filter(pk=report.pk).update(date=datetime.date(2024, 5, 1))  # `date` is auto_now_add
+        report.refresh_from_db()
+        SignatureRevision.objects.bulk_create([
+            # Before the report: already part of what the report showed
+            SignatureRevision(signature_id=1, changed_at=timezone.make_aware(datetime.datetime(2024, 4, 1)),
+                              previous_risk_factor='Low', risk_factor='Medium', severity_changed=True),
+            SignatureRevision(signature_id=1, changed_at=timezone.make_aware(datetime.datetime(2024, 6, 1)),
+                              previous_risk_factor='Medium', risk_factor='High',
+                              previous_cvss_base_score=5.0, cvss_base_score=7.5, severity_changed=True),
+            # Text-only change of signature 2
+            SignatureRevision(signature_id=2, changed_at=timezone.make_aware(datetime.datetime(2024, 6, 1)),
+                              previous_risk_factor='High', risk_factor='High', severity_changed=False),
+        ])
+
+        rows, next_after = severity_changes_page(report)
+
+        self.assertIsNone(next_after)
+        self.assertEqual([(row['signature_id'], row['reported_risk_factor'], row['current_risk_factor'], row['reported_cvss_base_score']) for row in rows], [
+            (1, 'Medium', 'High', 5.0),
+        ])
+
+    def test_default_base_is_the_latest_earlier_scan(self):
+        now = timezone.now()
+        self.nessus_report('A same-day scan', created_at=now - datetime.timedelta(hours=3))
+        latest = self.nessus_report('B latest scan', created_at=now - datetime.timedelta(hours=2))
+        head = self.nessus_report('Head', created_at=now - datetime.timedelta(hours=1))
+        self.login()
+
+        response = self.client.get(reverse('reports:nessus_report_diff', kwargs={
+            'customer_id': self.customer.customer_id, 'service_id': self.service.service_id, 'report_id': head.pk
+        }))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['base'], latest)
+
+
+class ArtifactTests(ReportTestMixin, TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(REPORT_ARTIFACT_DIR=directory.name))
+        self.report = self.nessus_report('Report', [(1, 'host-a', 'not_started'), (2, 'host-b', 'fixed')])
+
+    def artifact(self, version):
+        return ReportArtifact.objects.create(
+            report_type='nessus', report_id=self.report.pk, content_version=version,
+            file_path=artifact_path(self.report.pk, version), created_by=self.user
+        )
+
+    def test_render_removes_only_older_versions(self):
+        version = content_version(self.report)
+        cache_version, signatures = map(int, version.split('-'))
+        older, newer = f'{cache_version}-{signatures - 1}', f'{cache_version + 1}-{signatures}'
+        for other in (older, newer):
+            os.makedirs(os.path.dirname(artifact_path(self.report.pk, other)), exist_ok=True)
+            open(artifact_path(self.report.pk, other), 'w').close()
+
+        artifact = run_artifact_job(self.artifact(version))
+
+        self.assertEqual(artifact.status, 'completed')
+        self.assertEqual(artifact.rows_rendered, 2)
+        self.assertTrue(os.path.exists(artifact.file_path))
+        self.assertFalse(os.path.exists(artifact_path(self.report.pk, older)))
+        self.assertTrue(os.path.exists(artifact_path(self.report.pk, newer)))
+
+    def test_render_of_a_superseded_version_is_not_completed(self):
+        artifact = self.artifact(content_version(self.report))
+        NessusReport.objects.filter(pk=self.report.pk).update(cache_version=self.report.cache_version + 1)
+
+        artifact = run_artifact_job(artifact)
+
+        self.assertEqual(artifact.status, 'failed')
+        self.assertFalse(os.path.exists(artifact.file_path))
+
+
+class BurpSuitePayloadTests(ReportTestMixin, TestCase):
+    def test_deleting_a_report_removes_only_its_own_payloads(self):
+        self.burpsuite_report('Kept', ['GET /shared', 'GET /kept'])
+        deleted = self.burpsuite_report('Deleted', ['GET /shared', 'GET /deleted'])
+
+        with transaction.atomic():
+            pruned = delete_burpsuite_reports(BurpSuiteReport.objects.filter(pk=deleted.pk))
+
+        self.assertEqual(pruned, 1)
+        self.assertEqual(
+            set(BurpSuitePayload.objects.values_list('digest', flat=True)),
+            {BurpSuitePayload.digest_for(text) for text in ('GET /shared', 'GET /kept')}
+        )
+
+
+class IngestionTests(ReportTestMixin, TestCase):
+    def test_nessus_ingestion_checks_signatures_by_id_only(self):
+        report = self.nessus_report('Report')
+        signature_cache.clear()
+        alerts = [
+            {'plugin_id': 1, 'target_affected': 'host-a', 'os': 'linux'},
+            {'plugin_id': 2, 'target_affected': 'host-a', 'os': 'linux'},
+            {'plugin_id': 99, 'target_affected': 'host-b', 'os': 'linux'},
+        ]
+
+        stats = ingest_nessus_alerts(report, alerts, batch_size=2)
+
+        self.assertEqual((stats.rows, stats.skipped), (2, 1))
+        self.assertEqual(stats.missing_signatures, {99})
+        self.assertEqual(signature_cache.stats()['size'], 0)
+
+
+    def test_failed_burpsuite_ingestion_discards_the_partial_report(self):
+        instance = {'path': '/search', 'location': 'query', 'severity': 'High', 'confidence': 'Certain', 'requests': ['GET /search']}
+        job = self.ingestion_job('burpsuite', {'exportTime': '2024-05-01', 'issues': [
+            {'type': '1049088', 'name': 'SQL injection', 'host': 'https://app.example.com', 'instances': [instance]},
+            {'type': '2097920', 'name': 'Cross-site scripting', 'host': 'https://app.example.com', 'instances': [
+                {**instance, 'requests': ['GET /comments']}, {'path': '/comments', 'location': 'body'},
+            ]},
+        ]})
+        job.status = 'running'
+
+        # One instance per batch, so the first issue is written before the second one fails validation
+        with mock.patch('reports.jobs.ingest_burpsuite_instances', functools.partial(ingest_burpsuite_instances, batch_size=1)):
+            job = run_ingestion_job(job)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.errors, ['Instance 3 is missing required fields: severity, confidence'])
+        self.assertIsNone(job.report_id)
+        self.assertFalse(BurpSuiteReport.objects.exists())
+        self.assertFalse(BurpSuiteVulnerability.objects.exists())
+        self.assertFalse(BurpSuitePayload.objects.exists())
+        self.assertFalse(os.path.exists(job.file_path))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class IngestionJobTests(ReportTestMixin, TestCase):
+    document = {
+        'date': '2024-05-01',
+        'inventory': [{'host': 'host-a'}],
+        'alert_report': [
+            {'plugin_id': 1, 'target_affected': 'host-a', 'os': 'linux'},
+            {'plugin_id': 2, 'target_affected': 'host-a', 'os': 'linux'},
+            {'plugin_id': 99, 'target_affected': 'host-b', 'os': 'linux'},
+        ],
+    }
+
+    def progress(self, job):
+        return self.client.get(reverse('reports:ingestion_job_progress', kwargs={
+            'customer_id': self.customer.customer_id, 'service_id': self.service.service_id, 'pk': job.pk
+        }))
+
+    def test_claim_takes_the_oldest_queued_job_once(self):
+        first = self.ingestion_job('nessus', self.document)
+        second = self.ingestion_job('nessus', self.document)
+
+        self.assertEqual(claim_next_job().pk, first.pk)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(IngestionJob.objects.get(pk=first.pk).status, 'running')
+
+    def test_completed_job(self):
+        self.ingestion_job('nessus', self.document)
+        job = run_ingestion_job(claim_next_job())
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.rows_processed, job.bytes_processed), (2, job.file_size))
+        self.assertEqual(len(job.warnings), 1)
+        self.assertIn('99', job.warnings[0])
+        report = NessusReport.objects.get(pk=job.report_id)
+        self.assertEqual(report.inventory, [{'host': 'host-a'}])
+        self.assertEqual(status_counts([report.pk]), {'not_started': 2})
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_rejected_job_records_the_error_and_removes_the_report(self):
+        alerts = self.document['alert_report'] + [{'plugin_id': 3, 'target_affected': 'host-c'}]
+        self.ingestion_job('nessus', {**self.document, 'alert_report': alerts})
+        job = run_ingestion_job(claim_next_job())
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.errors, ['Alert 4 is missing required fields: os'])
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(IngestionJob.objects.get(pk=job.pk).report_id)
+        self.assertFalse(NessusReport.objects.exists())
+        self.assertFalse(NessusVulnerability.objects.exists())
+
+    def test_unexpected_error_fails_the_job(self):
+        self.ingestion_job('nessus', self.document)
+        with mock.patch('reports.jobs.ingest_nessus_alerts', side_effect=RuntimeError('disk full')), self.assertLogs('reports.jobs', 'ERROR'):
+            job = run_ingestion_job(claim_next_job())
+
+        self.assertEqual((job.status, job.errors), ('failed', ['disk full']))
+        self.assertFalse(NessusReport.objects.exists())
+
+    def test_interrupted_jobs_are_failed_on_recovery(self):
+        queued = self.ingestion_job('nessus', self.document)
+        interrupted = self.ingestion_job('nessus', self.document, status='running')
+        report = self.nessus_report('Partial', [(1, 'host-a', 'not_started')])
+        IngestionJob.objects.filter(pk=interrupted.pk).update(report_id=report.pk)
+
+        self.assertEqual(recover_interrupted_jobs(), 1)
+
+        interrupted.refresh_from_db()
+        self.assertEqual(interrupted.status, 'failed')
+        self.assertEqual(interrupted.errors, ["The ingestion worker stopped before the job finished."])
+        self.assertIsNone(interrupted.report_id)
+        self.assertFalse(NessusReport.objects.filter(pk=report.pk).exists())
+        self.assertEqual(status_counts([report.pk]), {})
+        self.assertEqual(IngestionJob.objects.get(pk=queued.pk).status, 'queued')
+
+    def test_progress_of_a_running_job(self):
+        job = self.ingestion_job('nessus', self.document, status='running')
+        IngestionJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - datetime.timedelta(seconds=30), rows_processed=1, bytes_processed=job.file_size // 4
+        )
+        self.login()
+
+        data = self.progress(job).json()
+
+        self.assertEqual((data['status'], data['status_label'], data['rows_processed']), ('running', 'Running', 1))
+        self.assertAlmostEqual(data['progress'], 25, delta=1)
+        self.assertAlmostEqual(data['eta_seconds'], 90, delta=5)
+        self.assertIsNone(data['report_url'])
+
+    def test_progress_of_a_completed_job_links_the_report(self):
+        self.ingestion_job('nessus', self.document)
+        job = run_ingestion_job(claim_next_job())
+        self.login()
+
+        data = self.progress(job).json()
+
+        self.assertEqual((data['status'], data['progress'], data['eta_seconds']), ('completed', 100, None))
+        self.assertEqual(data['report_url'], reverse('reports:report_detail', kwargs={
+            'customer_id': self.customer.customer_id, 'service_id': self.service.service_id, 'pk': job.report_id
+        }))
+
+    def test_progress_requires_the_upload_permission(self):
+        job = self.ingestion_job('nessus', self.document)
+        member = get_user_model().objects.create_user('member@example.com', 'password')
+        member.customers.add(self.customer)
+        member.user_permissions.add(Permission.objects.get(codename='view_nessusreport'))
+        self.login(member)
+        self.assertEqual(self.progress(job).status_code, 403)
+
+        member.user_permissions.add(Permission.objects.get(codename='add_nessusreport'))
+        member = get_user_model().objects.get(pk=member.pk)  # Drop the cached permissions
+        self.login(member)
+        self.assertEqual(self.progress(job).json()['status'], 'queued')
+
+
+class ReportParserTests(TestCase):
+    report = {
+        'date': '2024-05-01',
+        'inventory': [{'host': 'host-a'}],
+        'alert_report': [{'plugin_id': 1, 'target_affected': 'host-a', 'os': 'linux'}],
+    }
+
+    def test_export_with_byte_order_mark(self):
+        parser = NessusReportParser(io.BytesIO(codecs.BOM_UTF8 + json.dumps(self.report).encode('utf-8')))
+
+        self.assertEqual(list(parser), self.report['alert_report'])
+        self.assertEqual(parser.header, {'date': '2024-05-01', 'inventory': [{'host': 'host-a'}]})
+
+    def test_upload_forms_accept_a_byte_order_mark(self):
+        content = codecs.BOM_UTF8 + b'\n  ' + json.dumps(self.report).encode('utf-8')
+        for form_class in (NessusReportUploadForm, BurpSuiteReportUploadForm):
+            form = form_class(data={'name': 'Report'}, files={'json_file': SimpleUploadedFile('report.json', content)})
+            form.is_valid()
+            self.assertNotIn('json_file', form.errors, form_class.__name__)
+
+    def test_upload_forms_reject_other_documents(self):
+        form = NessusReportUploadForm(data={'name': 'Report'}, files={'json_file': SimpleUploadedFile('report.json', codecs.BOM_UTF8 + b'<xml/>')})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['json_file'], ["The uploaded file is not a valid JSON file."])
+
+    def test_export_without_byte_order_mark(self):
+        parser = NessusReportParser(io.BytesIO(json.dumps(self.report).encode('utf-8')))
+        self.assertEqual(list(parser), self.report['alert_report'])
+
+
+class BurpSuiteReportParserTests(TestCase):
+    instance = {'path': '/search', 'location': 'query', 'severity': 'High', 'confidence': 'Certain'}
+
+    def parse(self, document):
+        parser = BurpSuiteReportParser(io.BytesIO(json.dumps(document).encode('utf-8')))
+        return parser, list(parser)
+
+    def test_export(self):
+        login = {**self.instance, 'path': '/login'}
+        parser, records = self.parse({'exportTime': '2024-05-01', 'issues': [
+            # Instances listed before the issue keys are held back until the issue is complete
+            {'instances': [self.instance, login], 'type': '1049088', 'name': 'SQL injection', 'host': 'https://app.example.com'},
+            {'type': '2097920', 'name': 'Cross-site scripting', 'host': 'https://app.example.com', 'instances': [self.instance]},
+        ]})
+
+        self.assertEqual([(issue['type'], instance['path']) for issue, instance in records], [
+            ('1049088', '/search'), ('1049088', '/login'), ('2097920', '/search'),
+        ])
+        self.assertEqual(records[0][0], {'type': '1049088', 'name': 'SQL injection', 'host': 'https://app.example.com'})
+        self.assertEqual(parser.header, {'exportTime': '2024-05-01'})
+
+    def test_empty_issue_list(self):
+        parser, records = self.parse({'exportTime': '2024-05-01', 'issues': []})
+        self.assertEqual(records, [])
+        self.assertEqual(parser.records, 0)
+
+    def test_missing_required_key(self):
+        with self.assertRaisesMessage(ValidationError, "The JSON file is missing the 'exportTime' key."):
+            self.parse({'issues': []})
+        with self.assertRaisesMessage(ValidationError, "The JSON file is missing the 'issues' key."):
+            self.parse({'exportTime': '2024-05-01'})
+
+    def test_missing_fields(self):
+        with self.assertRaisesMessage(ValidationError, 'Issue is missing required fields: host'):
+            self.parse({'exportTime': '2024-05-01', 'issues': [{'type': '1049088', 'name': 'SQL injection', 'instances': [self.instance]}]})
+        with self.assertRaisesMessage(ValidationError, 'Instance 1 is missing required fields: confidence'):
+            self.parse({'exportTime': '2024-05-01', 'issues': [
+                {'type': '1049088', 'name': 'SQL injection', 'host': 'https://app.example.com', 'instances': [{**self.instance, 'confidence': None}]},
+            ]})
+
+    def test_export_time_must_be_a_date(self):
+        with self.assertRaisesMessage(ValidationError, "The 'exportTime' key must be a date in YYYY-MM-DD format."):
+            self.parse({'exportTime': 'yesterday', 'issues': []})
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ReportDetailTests(ReportTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_burpsuite_issues_follow_the_viewer_permissions(self):
+        report = self.burpsuite_report('Report', ['GET /'])
+        url = reverse('reports:report_detail', kwargs={
+            'customer_id': self.customer.customer_id, 'service_id': self.burpsuite_service.service_id, 'pk': report.pk
+        })
+        viewer = get_user_model().objects.create_user('viewer@example.com', 'password')
+        viewer.user_permissions.add(Permission.objects.get(codename='view_burpsuitereport'))
+        viewer.customers.add(self.customer)
+
+        self.login()
+        self.assertContains(self.client.get(url), 'bulk-status-update')
+        self.login(viewer)
+        response = self.client.get(url)
+        self.assertContains(response, 'SQL injection')
+        self.assertNotContains(response, 'bulk-status-update')
+        self.assertNotContains(response, 'status-select status-')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ReportExportTests(ReportTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        signature_cache.clear()
+        NessusSignature.objects.filter(pk=1).update(name='=HYPERLINK("https://evil.example")', synopsis='-1 day')
+        NessusSignature.objects.filter(pk=2).update(name='+cmd', synopsis='@SUM(A1)')
+        self.report = self.nessus_report('Weekly scan', [
+            (1, 'host-a', 'not_started'), (2, 'host-b', 'fixed'), (3, 'host-c', 'not_started'),
+        ])
+        self.url = self.export_url(self.report)
+
+    def export_url(self, report, customer=None):
+        return reverse('reports:report_export', kwargs={
+            'customer_id': (customer or self.customer).customer_id, 'service_id': self.service.service_id, 'pk': report.pk
+        })
+
+    def test_csv_export_streams_every_finding_with_formulas_escaped(self):
+        self.login()
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('weekly-scan', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['target_affected'] for row in rows], ['host-a', 'host-b', 'host-c'])
+        self.assertEqual(
+            [(row['name'], row['synopsis']) for row in rows],
+            [("'=HYPERLINK(\"https://evil.example\")", "'-1 day"), ("'+cmd", "'@SUM(A1)"), ('Plugin 3', '')]
+        )
+        self.assertEqual(rows[0]['plugin_id'], '1')
+
+    def test_jsonl_export_keeps_values_as_they_are(self):
+        self.login()
+        response = self.client.get(self.url, {'format': 'jsonl', 'status': 'not_started'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(line['plugin_id'], line['name'], line['status']) for line in lines], [
+            (1, '=HYPERLINK("https://evil.example")', 'not_started'), (3, 'Plugin 3', 'not_started'),
+        ])
+
+    def test_burpsuite_export(self):
+        report = self.burpsuite_report('Burp scan', ['GET /', 'GET /admin'])
+        self.login()
+        response = self.client.get(reverse('reports:report_export', kwargs={
+            'customer_id': self.customer.customer_id, 'service_id': self.burpsuite_service.service_id, 'pk': report.pk
+        }))
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['name'], row['path']) for row in rows], [('SQL injection', '/0'), ('SQL injection', '/1')])
+
+    def test_unknown_format_is_rejected(self):
+        self.login()
+        self.assertEqual(self.client.get(self.url, {'format': 'xlsx'}).status_code, 400)
+
+    def test_export_requires_the_view_permission(self):
+        member = get_user_model().objects.create_user('member@example.com', 'password')
+        member.customers.add(self.customer)
+        self.login(member)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        member.user_permissions.add(Permission.objects.get(codename='view_nessusreport'))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_export_is_scoped_to_the_customer(self):
+        other_customer = Customer.objects.create(customer_name='Other customer')
+        member = get_user_model().objects.create_user('member@example.com', 'password')
+        member.user_permissions.add(Permission.objects.get(codename='view_nessusreport'))
+        member.customers.add(other_customer)
+        self.login(member)
+
+        # Not a member of the report's customer, and the report is not found under the other customer
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.export_url(self.report, other_customer)).status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class NessusReportGroupsTests(ReportTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        NessusSignature.objects.create(id=4, name='Plugin 4', risk_factor='Critical', scanner_type='Nessus')
+        self.report = self.nessus_report('Report', [
+            (1, 'host-a', 'not_started'), (1, 'host-b', 'fixed'), (1, 'host-c', 'not_started'),
+            (2, 'host-a', 'in_review'), (4, 'host-a', 'not_started'),
+        ])
+        self.url = reverse('reports:nessus_report_groups', kwargs={
+            'customer_id': self.customer.customer_id, 'service_id': self.service.service_id, 'report_id': self.report.pk
+        })
+        self.login()
+
+    def test_pages_follow_risk_factor_then_signature(self):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {'limit': 2, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            pages.append(page['groups'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        targets = [
+            (group['risk_factor'], group['signature']['id'], target['target_affected'])
+            for groups in pages for group in groups for target in group['targets']
+        ]
+        self.assertEqual(targets, [
+            ('Critical', 4, 'host-a'), ('High', 1, 'host-a'), ('High', 1, 'host-b'),
+            ('High', 1, 'host-c'), ('High', 2, 'host-a'),
+        ])
+        # Signature 1 continues on the second page, which only carries its id
+        self.assertEqual(pages[1][0]['signature'], {'id': 1})
+        self.assertEqual(pages[0][1]['signature']['name'], 'Plugin 1')
+
+    def test_cursor_round_trip(self):
+        first = self.client.get(self.url, {'limit': 3}).json()
+        self.assertEqual(first['next_cursor'], f"1.1.{self.report.vulnerabilities.get(signature_id=1, target_affected='host-b').pk}")
+
+        second = self.client.get(self.url, {'limit': 3, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([target['target_affected'] for group in second['groups'] for target in group['targets']], ['host-c', 'host-a'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'limit': 'many'}, {'cursor': '1.2'}, {'cursor': 'a.b.c'}, {'cursor': '-1.0.0'}, {'cursor': '6.0.0'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    def test_limit_is_clamped(self):
+        for limit in (0, -1):
+            response = self.client.get(self.url, {'limit': limit})
+            self.assertEqual(response.status_code, 200, limit)
+            self.assertEqual(len(response.json()['groups'][0]['targets']), 1)
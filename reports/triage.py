@@ -0,0 +1,161 @@
+import logging
+from auditlog.cid import get_cid
+from auditlog.models import LogEntry
+from auditlog.registry import auditlog
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+from django.utils import timezone
+from .counters import apply_status_deltas, ensure_status_counts, rebuild_status_counts
+from .fragments import bump_cache_version
+from .models import IngestionJob
+
+logger = logging.getLogger(__name__)
+
+
+def update_returning_previous(vulnerabilities, new_status, user, changed_at, fields):
+    """
+    PostgreSQL: lock and update the rows in one UPDATE ... FROM (SELECT ... FOR UPDATE) ... RETURNING,
+    which hands back each changed row together with its previous status and changed_by.
+    """
+    model = vulnerabilities.model
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    selected, params = vulnerabilities.select_for_update(of=('self',)).values('id', 'status', 'changed_by_id').query.sql_with_params()
+    returning = ', '.join(f"target.{quote(model._meta.get_field(field).column)}" for field in fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS target SET {quote('status')} = %s, {quote('changed_by_id')} = %s, {quote('changed_at')} = %s "
+            f"FROM ({selected}) AS previous WHERE target.{quote('id')} = previous.{quote('id')} "
+            f"RETURNING target.{quote('id')}, previous.{quote('status')}, previous.{quote('changed_by_id')}"
+            + (f", {returning}" if returning else ''),
+            [new_status, user.pk, changed_at, *params]
+        )
+        columns = ['id', 'previous_status', 'previous_changed_by_id', *fields]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def update_then_read(vulnerabilities, new_status, user, changed_at, fields):
+    """Backends without UPDATE ... RETURNING: read the locked rows, then update them in one statement"""
+    rows = [
+        {'id': row.pop('id'), 'previous_status': row.pop('status'), 'previous_changed_by_id': row.pop('changed_by_id'), **row}
+        for row in vulnerabilities.select_for_update(of=('self',)).values('id', 'status', 'changed_by_id', *fields)
+    ]
+    if rows:
+        # The rows are locked, so the same filter matches exactly the rows read above
+        vulnerabilities.update(status=new_status, changed_by=user, changed_at=changed_at)
+    return rows
+
+
+def log_transitions(model, rows, new_status, user, changed_at):
+    """Write the audit trail of a bulk transition with one bulk_create, as the row-by-row save() signals would"""
+    if not rows or not auditlog.contains(model):
+        return
+    content_type = ContentType.objects.get_for_model(model)
+    cid = get_cid()
+    LogEntry.objects.bulk_create([
+        LogEntry(
+            content_type=content_type,
+            object_pk=str(row['id']),
+            object_id=row['id'],
+            object_repr=f"{model._meta.verbose_name} {row['id']}",
+            action=LogEntry.Action.UPDATE,
+            changes={
+                'status': [row['previous_status'], new_status],
+                'changed_by': [str(row['previous_changed_by_id']), str(user.pk)],
+            },
+            actor=user,
+            actor_email=user.email,
+            timestamp=changed_at,
+            cid=cid,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+def transition_status(report, vulnerabilities, new_status, user, fields=()):
+    """
+    Move the matched vulnerabilities that are not already in `new_status` to it, set changed_by/changed_at,
+    update the report's status counters and cache version and write the audit entries. The rows are changed by a single UPDATE
+    (with RETURNING on PostgreSQL) instead of one save() per row; call inside a transaction.
+    Returns one dict per changed row with its id, previous status/changed_by and the requested `fields`.
+    """
+    # Before the UPDATE: a rebuild afterwards would already count the rows the deltas below move
+    ensure_status_counts(report)
+    changed_at = timezone.now()
+    vulnerabilities = vulnerabilities.exclude(status=new_status)
+    if connection.vendor == 'postgresql':
+        rows = update_returning_previous(vulnerabilities, new_status, user, changed_at, fields)
+    else:
+        rows = update_then_read(vulnerabilities, new_status, user, changed_at, fields)
+
+    deltas = {new_status: len(rows)}
+    for row in rows:
+        deltas[row['previous_status']] = deltas.get(row['previous_status'], 0) - 1
+    apply_status_deltas(report.pk, deltas)
+    if rows:
+        bump_cache_version(report)
+
+    log_transitions(vulnerabilities.model, rows, new_status, user, changed_at)
+    for row in rows:
+        row['changed_at'] = changed_at
+    return rows
+
+
+# Triage decisions that still hold when a finding shows up again; a reappearing 'fixed' finding needs a new look
+CARRY_FORWARD_STATUSES = ('in_review', 'monitoring', 'mitigated', 'risk_accepted', 'not_applicable')
+
+
+def comparable_reports(report):
+    """Other reports of the same customer and service, latest first, skipping reports that are still being ingested"""
+    return (
+        type(report).objects
+        .filter(customer_id=report.customer_id, service_id=report.service_id)
+        .exclude(pk=report.pk)
+        .exclude(pk__in=IngestionJob.objects.filter(status__in=['queued', 'running'], report_id__isnull=False).values('report_id'))
+        .order_by('-date', '-created_at', '-pk')
+    )
+
+
+def previous_report(report):
+    """Latest comparable report uploaded before `report`; `date` has day precision, `created_at` orders same-day uploads"""
+    return comparable_reports(report).filter(
+        models.Q(date__lt=report.date) | models.Q(date=report.date, created_at__lt=report.created_at)
+    ).first()
+
+
+def missing_fingerprints(report):
+    """Whether `report` has findings stored before fingerprints existed (see backfill_finding_fingerprints)"""
+    return report.vulnerabilities.filter(fingerprint='').exists()
+
+
+def carry_forward_statuses(report, previous=None):
+    """
+    Copy status, changed_by and changed_at from `previous` (default: previous_report()) to the findings of
+    `report` with the same fingerprint, for previous statuses in CARRY_FORWARD_STATUSES. The copy is a single
+    UPDATE with correlated subqueries on the (report, fingerprint) index; the counters are then recounted.
+    Nothing is carried from a report with unfingerprinted findings, they would never match.
+    Returns (previous report or None, number of findings carried forward).
+    """
+    previous = previous or previous_report(report)
+    if previous is None:
+        return None, 0
+    if missing_fingerprints(previous):
+        logger.warning(f"Report {previous.pk} has findings without fingerprints, no statuses carried forward to report {report.pk}")
+        return previous, 0
+
+    triaged = (
+        previous.vulnerabilities
+        .filter(fingerprint=models.OuterRef('fingerprint'), status__in=CARRY_FORWARD_STATUSES)
+        .order_by('-changed_at')
+    )
+    with transaction.atomic():
+        carried = report.vulnerabilities.filter(status='not_started').filter(models.Exists(triaged)).update(
+            status=models.Subquery(triaged.values('status')[:1]),
+            changed_by=models.Subquery(triaged.values('changed_by')[:1]),
+            changed_at=models.Subquery(triaged.values('changed_at')[:1]),
+        )
+        if carried:
+            rebuild_status_counts(report)
+            bump_cache_version(report)
+    return previous, carried
@@ -1,5 +1,8 @@
 from django.urls import path
 from .views import factory
+from .views.jobs import IngestionJobProgressView
+from .views.burpsuite import BurpSuiteVulnerabilityEvidenceView
+from .views.nessus import NessusReportGroupsView, NessusReportDiffView, NessusReportDiffDataView, NessusReportSeverityChangesView
 
 app_name = 'reports'
 
@@ -7,7 +10,15 @@ urlpatterns = [
     path('', factory.report_selection_view, name='report_selection'),
     path('<str:service_id>/', factory.report_list_view, name='report_list'),
     path('<str:service_id>/upload/', factory.report_upload_view, name='report_upload'),
+    path('<str:service_id>/jobs/<uuid:pk>/', IngestionJobProgressView.as_view(), name='ingestion_job_progress'),
     path('<str:service_id>/<uuid:pk>/', factory.report_detail_view, name='report_detail'),
+    path('<str:service_id>/<uuid:report_id>/evidence/<int:pk>/', BurpSuiteVulnerabilityEvidenceView.as_view(), name='burpsuite_vulnerability_evidence'),
+    path('<str:service_id>/<uuid:report_id>/groups/', NessusReportGroupsView.as_view(), name='nessus_report_groups'),
+    path('<str:service_id>/<uuid:report_id>/diff/', NessusReportDiffView.as_view(), name='nessus_report_diff'),
+    path('<str:service_id>/<uuid:report_id>/diff/data/', NessusReportDiffDataView.as_view(), name='nessus_report_diff_data'),
+    path('<str:service_id>/<uuid:report_id>/severity-changes/', NessusReportSeverityChangesView.as_view(), name='nessus_report_severity_changes'),
     path('<str:service_id>/<uuid:pk>/delete/', factory.report_delete_view, name='report_delete'),
+    path('<str:service_id>/<uuid:pk>/export/', factory.report_export_view, name='report_export'),
+    path('<str:service_id>/<uuid:pk>/deliverable/', factory.report_deliverable_view, name='report_deliverable'),
     path('<str:service_id>/<str:pk>/', factory.report_detail_view, name='support_report_detail'),
 ]
\ No newline at end of file
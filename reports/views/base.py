@@ -1,10 +1,18 @@
-from django.views.generic import ListView, DetailView, UpdateView, DeleteView
+from django.views.generic import ListView, DetailView, UpdateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from core.mixins import SelectedCustomerRequiredMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.utils.safestring import mark_safe
-from django.http import HttpResponseRedirect
+from django.utils.html import escape
+from django.http import HttpResponseRedirect, StreamingHttpResponse, JsonResponse, FileResponse
+from django.shortcuts import get_object_or_404
+from django.utils.text import slugify
+from django.db import transaction
+from ..counters import delete_status_counts
+from ..exports import EXPORT_FORMATS, export_lines
+from ..artifacts import artifact_path, content_version, request_artifact, delete_artifacts
+import os
 
 class ReportBaseView(SelectedCustomerRequiredMixin, LoginRequiredMixin, PermissionRequiredMixin):
     model = None  # To be set by subclasses
@@ -48,13 +56,90 @@ class ReportDeleteView(ReportBaseView, DeleteView):
             'service_id': self.object.service.service_id
         })
 
+    def delete_report(self):
+        self.object.delete()
+
     def delete(self, request, *args, **kwargs):
         self.object = self.get_object()
         success_url = self.get_success_url()
         report_name = self.object.name
-        self.object.delete()
+        with transaction.atomic():
+            delete_status_counts(self.object.pk)
+            delete_artifacts(self.object.pk)
+            self.delete_report()
         messages.warning(self.request, mark_safe(f"Report <strong>{report_name}</strong> has been deleted successfully."), extra_tags='alert-warning')
         return HttpResponseRedirect(success_url)
     
     def post(self, request, *args, **kwargs):
-        return self.delete(request, *args, **kwargs)
\ No newline at end of file
+        return self.delete(request, *args, **kwargs)
+
+class ReportObjectMixin:
+    """Loads the report of the URL, scoped to the selected customer and the service"""
+    def get_object(self):
+        return get_object_or_404(
+            self.model,
+            pk=self.kwargs['pk'],
+            customer=self.request.selected_customer,
+            service__service_id=self.kwargs['service_id']
+        )
+
+class ReportExportView(ReportObjectMixin, ReportBaseView, View):
+    """
+    Streams a report's findings as CSV or JSON lines (?format=csv|jsonl), optionally filtered by
+    ?status= (repeatable), ?severity= and ?host=. Rows go out as they are read from the database.
+    """
+    export_columns = []  # (header, field lookup) pairs, to be set by subclasses
+    severity_lookup = None
+    host_lookup = None
+
+    def get_queryset(self, report):
+        vulnerabilities = report.vulnerabilities.order_by('id')
+        statuses = self.request.GET.getlist('status')
+        if statuses:
+            vulnerabilities = vulnerabilities.filter(status__in=statuses)
+        if self.request.GET.get('severity'):
+            vulnerabilities = vulnerabilities.filter(**{self.severity_lookup: self.request.GET['severity']})
+        if self.request.GET.get('host'):
+            vulnerabilities = vulnerabilities.filter(**{f'{self.host_lookup}__icontains': self.request.GET['host']})
+        return vulnerabilities
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': 'Invalid format'}, status=400)
+
+        report = self.get_object()
+        response = StreamingHttpResponse(
+            export_lines(self.get_queryset(report), self.export_columns, export_format),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        filename = f"{slugify(report.name) or 'report'}-{report.date}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class ReportDeliverableView(ReportObjectMixin, ReportBaseView, View):
+    """
+    Downloads the rendered HTML deliverable of the report's current content version straight from disk.
+    When it is not rendered yet a ReportArtifact is queued for the worker and the user is sent back to the report.
+    """
+    report_type = None  # To be set by subclasses, matches IngestionJob.REPORT_TYPE_CHOICES
+
+    def get(self, request, *args, **kwargs):
+        report = self.get_object()
+        path = artifact_path(report.pk, content_version(report))
+        if os.path.exists(path):
+            filename = f"{slugify(report.name) or 'report'}-{report.date}.html"
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='text/html')
+
+        artifact = request_artifact(report, self.report_type, request.user)
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'status': artifact.status, 'error': artifact.error}, status=202)
+        if artifact.status == 'failed':
+            messages.error(request, f"The deliverable could not be generated: {artifact.error}", extra_tags='alert-danger')
+        else:
+            messages.info(request, mark_safe(f"The deliverable of <strong>{escape(report.name)}</strong> is being generated, download it again in a moment."), extra_tags='alert-primary')
+        return HttpResponseRedirect(reverse('reports:report_detail', kwargs={
+            'customer_id': report.customer_id,
+            'service_id': self.kwargs['service_id'],
+            'pk': report.pk
+        }))
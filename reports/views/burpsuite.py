@@ -1,15 +1,21 @@
 from django.views.generic.edit import FormView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views.generic import DetailView
 from django.contrib import messages
 from django.utils.safestring import mark_safe
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .base import ReportBaseView, ReportListView, ReportDetailView, ReportDeleteView
+from .base import ReportBaseView, ReportListView, ReportDetailView, ReportDeleteView, ReportExportView, ReportDeliverableView
 from ..models import BurpSuiteReport, BurpSuiteVulnerability
-from ..forms.burpsuite import BurpSuiteReportUploadForm
+from ..triage import transition_status
+from ..ingestion import delete_burpsuite_reports
+from ..fragments import fragment_timeout
+from signatures.versions import signatures_version
 from signatures.models import BurpSuiteSignature
+from signatures.cache import get_signatures
+from ..forms.burpsuite import BurpSuiteReportUploadForm
 from inventories.models import Service
-from ..views.mixins import StatusSummaryMixin
+from ..views.mixins import StatusSummaryMixin, IngestionJobUploadMixin
 import json
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_POST
@@ -42,32 +48,35 @@ class BurpSuiteReportDetailView(StatusSummaryMixin, ReportDetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        vulnerabilities = self.object.vulnerabilities.select_related('signature').all()
-            
-        status_summary = {}
-        for status_value, status_label in BurpSuiteVulnerability.STATUS_CHOICES:
-            count = vulnerabilities.filter(status=status_value).count()
-            if count > 0:  # Only include statuses that have instances
-                status_summary[status_label] = count
-        
-        context['status_summary'] = status_summary
-        
         # Add STATUS_CHOICES to context
         context['STATUS_CHOICES'] = BurpSuiteVulnerability.STATUS_CHOICES
-        
+
+        # The issue list is a cached template fragment keyed by the report's cache_version; `issues` is
+        # passed as a callable so the template only runs the query when the fragment is not cached
+        context['issues'] = self.get_issues
+        context['fragment_timeout'] = fragment_timeout()
+        context['signatures_version'] = signatures_version()
+        return context
+
+    def get_issues(self):
+        # Evidence (issue detail and request/response payloads) is fetched per instance by BurpSuiteVulnerabilityEvidenceView
+        vulnerabilities = list(self.object.vulnerabilities.select_related('changed_by').defer('issueDetail', 'request', 'payload'))
+        signatures = get_signatures(BurpSuiteSignature, {vuln.signature_id for vuln in vulnerabilities})
+
         grouped_vulnerabilities = {}
         for vuln in vulnerabilities:
-            signature_id = vuln.signature.id
+            signature_id = vuln.signature_id
             if signature_id not in grouped_vulnerabilities:
+                signature = signatures[signature_id]
                 grouped_vulnerabilities[signature_id] = {
                     'type': signature_id,
-                    'name': vuln.signature.name,
+                    'name': signature.name,
                     'host': vuln.host,
                     'signature': {
-                        'description': vuln.signature.description,
-                        'references': vuln.signature.references,
-                        'remediation': vuln.signature.remediation,
-                        'vulnerability_classifications': vuln.signature.vulnerability_classifications
+                        'description': signature.description,
+                        'references': signature.references,
+                        'remediation': signature.remediation,
+                        'vulnerability_classifications': signature.vulnerability_classifications
                     },
                     'instances': [],
                     'severity_counts': {'High': 0, 'Medium': 0, 'Low': 0, 'Information': 0}
@@ -79,8 +88,12 @@ class BurpSuiteReportDetailView(StatusSummaryMixin, ReportDetailView):
                 'location': vuln.location,
                 'severity': vuln.severity,
                 'confidence': vuln.confidence,
-                'issueDetail': vuln.issueDetail,
-                'requests': json.loads(vuln.request),
+                'evidence_url': reverse('reports:burpsuite_vulnerability_evidence', kwargs={
+                    'customer_id': self.object.customer_id,
+                    'service_id': self.kwargs['service_id'],
+                    'report_id': self.object.report_id,
+                    'pk': vuln.id
+                }),
                 'status': vuln.status,  # Add this
                 'changed_by': vuln.changed_by.email if vuln.changed_by else 'N/A',  # Add this
                 'changed_at': timezone.localtime(vuln.changed_at).strftime('%b %d, %Y, %I:%M:%S %p') if vuln.changed_at else 'N/A',  # Add this
@@ -88,8 +101,7 @@ class BurpSuiteReportDetailView(StatusSummaryMixin, ReportDetailView):
             grouped_vulnerabilities[signature_id]['instances'].append(instance_data)
             grouped_vulnerabilities[signature_id]['severity_counts'][vuln.severity] += 1
         
-        context['issues'] = list(grouped_vulnerabilities.values())
-        return context
+        return list(grouped_vulnerabilities.values())
 
     @method_decorator(require_POST)
     def post(self, request, *args, **kwargs):
@@ -101,10 +113,12 @@ class BurpSuiteReportDetailView(StatusSummaryMixin, ReportDetailView):
         bulk_type = request.POST.get('bulk_type')
         severity = request.POST.get('severity')
 
+        if new_status not in dict(BurpSuiteVulnerability.STATUS_CHOICES):
+            return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
+
         try:
             with transaction.atomic():
                 report = self.get_object()
-                updated_vulnerabilities = []
 
                 if bulk_type == 'signature':
                     vulnerabilities = BurpSuiteVulnerability.objects.filter(
@@ -119,18 +133,13 @@ class BurpSuiteReportDetailView(StatusSummaryMixin, ReportDetailView):
                 else:
                     vulnerabilities = BurpSuiteVulnerability.objects.filter(id=vulnerability_id, report=report)
 
-                for vulnerability in vulnerabilities:
-                    if vulnerability.status != new_status:
-                        vulnerability.status = new_status
-                        vulnerability.changed_by = request.user
-                        vulnerability.save()
-
-                        updated_vulnerabilities.append({
-                            'id': vulnerability.id,
-                            'status': new_status,
-                            'changed_by': request.user.email,
-                            'changed_at': timezone.localtime(vulnerability.changed_at).strftime('%b %d, %Y, %I:%M:%S %p')
-                        })
+                changed = transition_status(report, vulnerabilities, new_status, request.user)
+                updated_vulnerabilities = [{
+                    'id': row['id'],
+                    'status': new_status,
+                    'changed_by': request.user.email,
+                    'changed_at': timezone.localtime(row['changed_at']).strftime('%b %d, %Y, %I:%M:%S %p')
+                } for row in changed]
 
                 return JsonResponse({
                     'success': True, 
@@ -141,7 +150,28 @@ class BurpSuiteReportDetailView(StatusSummaryMixin, ReportDetailView):
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-class BurpSuiteReportUploadView(ReportBaseView, FormView):
+class BurpSuiteVulnerabilityEvidenceView(ReportBaseView, DetailView):
+    """JSON evidence of one instance, loaded when the instance is expanded on the report page"""
+    model = BurpSuiteVulnerability
+    permission_required = 'reports.view_burpsuitereport'
+
+    def get_queryset(self):
+        return BurpSuiteVulnerability.objects.filter(
+            report__customer=self.request.selected_customer,
+            report__service__service_id=self.kwargs['service_id'],
+            report_id=self.kwargs['report_id']
+        ).select_related('payload').only('id', 'issueDetail', 'request', 'payload')
+
+    def get(self, request, *args, **kwargs):
+        vulnerability = self.get_object()
+        return JsonResponse({
+            'id': vulnerability.id,
+            'issueDetail': vulnerability.issueDetail,
+            'requests': vulnerability.requests,
+        })
+
+class BurpSuiteReportUploadView(IngestionJobUploadMixin, ReportBaseView, FormView):
+    report_type = 'burpsuite'
     form_class = BurpSuiteReportUploadForm
     template_name = 'reports/report_upload.html'
     permission_required = 'reports.add_burpsuitereport'
@@ -163,87 +193,42 @@ class BurpSuiteReportUploadView(ReportBaseView, FormView):
         kwargs['service'] = get_object_or_404(Service, service_id=self.kwargs['service_id'])
         return kwargs
 
-    def form_valid(self, form):
-        json_file = form.cleaned_data['json_file']
-        contract = form.cleaned_data.get('contract')
-        service = get_object_or_404(Service, service_id=self.kwargs['service_id'])
-        report_name = form.cleaned_data.get('name')
-        
-        try:
-            data = json.load(json_file)
-
-            with transaction.atomic():
-                report = BurpSuiteReport.objects.create(
-                    customer=self.request.selected_customer,
-                    contract=contract,
-                    service=service,
-                    date=timezone.datetime.strptime(data['exportTime'], "%Y-%m-%d").date(),
-                    name=report_name,
-                )
-
-                for issue in data['issues']:
-                    signature, created = BurpSuiteSignature.objects.get_or_create(
-                        id=issue['type'],
-                        defaults={'name': issue['name']}
-                    )
-                    
-                    for instance in issue['instances']:
-                        required_fields = ['path', 'location', 'severity', 'confidence']
-                        missing_fields = [field for field in required_fields if field not in instance or instance[field] is None]
-                        
-                        if missing_fields:
-                            raise ValidationError(f"Required fields {', '.join(missing_fields)} are missing or null in the JSON data")
-
-                        try:
-                            BurpSuiteVulnerability.objects.create(
-                                report=report,
-                                signature=signature,
-                                host=issue['host'],
-                                path=instance['path'],
-                                location=instance['location'],
-                                severity=instance['severity'],
-                                confidence=instance['confidence'],
-                                issueDetail=instance.get('issueDetail') or 'N/A',  # Use 'N/A' if issueDetail is None or missing
-                                request=json.dumps(instance.get('requests', []))
-                            )
-                        except Exception as e:
-                            messages.error(self.request, f"Error creating BurpSuiteVulnerability: {str(e)}",
-                            extra_tags='alert-danger')
-                            raise
-
-                messages.success(self.request,
-                                mark_safe(f"BurpSuite Report <strong>{report.report_id}</strong> uploaded successfully."))
-
-        except ValidationError as ve:
-            messages.error(self.request,
-                           mark_safe(f"Validation error: <strong>{str(ve)}</strong>"),
-                           extra_tags='alert-danger')
-            return self.form_invalid(form)
-        except json.JSONDecodeError as je:
-            messages.error(self.request,
-                           mark_safe(f"Invalid JSON file: <strong>{str(je)}</strong>"),
-                           extra_tags='alert-danger')
-            return self.form_invalid(form)
-        except Exception as e:
-            messages.error(self.request,
-                           mark_safe(f"Error uploading report: <strong>{str(e)}</strong>"),
-                           extra_tags='alert-danger')
-            return self.form_invalid(form)
-
-        return super().form_valid(form)
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['service'] = get_object_or_404(Service, service_id=self.kwargs['service_id'])
         context['report_type'] = 'BurpSuite'
         return context
 
-    def get_success_url(self):
-        return reverse_lazy('reports:report_list', kwargs={
-            'customer_id': self.request.selected_customer.customer_id,
-            'service_id': self.kwargs['service_id']
-        })
-
 class BurpSuiteReportDeleteView(ReportDeleteView):
     model = BurpSuiteReport
-    permission_required = 'reports.delete_burpsuitereport'
\ No newline at end of file
+    permission_required = 'reports.delete_burpsuitereport'
+
+    def delete_report(self):
+        # The payload foreign key is PROTECT, the payloads only this report used are removed explicitly
+        delete_burpsuite_reports(BurpSuiteReport.objects.filter(pk=self.object.pk))
+
+class BurpSuiteReportExportView(ReportExportView):
+    model = BurpSuiteReport
+    permission_required = 'reports.view_burpsuitereport'
+    severity_lookup = 'severity'
+    host_lookup = 'host'
+    export_columns = [
+        ('id', 'id'),
+        ('issue_type', 'signature_id'),
+        ('name', 'signature__name'),
+        ('severity', 'severity'),
+        ('confidence', 'confidence'),
+        ('host', 'host'),
+        ('path', 'path'),
+        ('location', 'location'),
+        ('vulnerability_classifications', 'signature__vulnerability_classifications'),
+        ('status', 'status'),
+        ('changed_by', 'changed_by__email'),
+        ('changed_at', 'changed_at'),
+        ('fingerprint', 'fingerprint'),
+    ]
+
+class BurpSuiteReportDeliverableView(ReportDeliverableView):
+    model = BurpSuiteReport
+    report_type = 'burpsuite'
+    permission_required = 'reports.view_burpsuitereport'
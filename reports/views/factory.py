@@ -8,10 +8,12 @@ from contracts.models import Contract
 from django.db.models import Count, Q
 
 from .nessus import (
-    NessusReportListView, NessusReportDetailView, NessusReportUploadView, NessusReportDeleteView
+    NessusReportListView, NessusReportDetailView, NessusReportUploadView, NessusReportDeleteView, NessusReportExportView,
+    NessusReportDeliverableView
 )
 from .burpsuite import (
-    BurpSuiteReportListView, BurpSuiteReportDetailView, BurpSuiteReportUploadView, BurpSuiteReportDeleteView
+    BurpSuiteReportListView, BurpSuiteReportDetailView, BurpSuiteReportUploadView, BurpSuiteReportDeleteView, BurpSuiteReportExportView,
+    BurpSuiteReportDeliverableView
 )
 from .support import (
     SupportReportListView, SupportReportDetailView
@@ -28,12 +30,16 @@ class ReportViewFactory:
                 'detail': NessusReportDetailView,
                 'upload': NessusReportUploadView,
                 'delete': NessusReportDeleteView,
+                'export': NessusReportExportView,
+                'deliverable': NessusReportDeliverableView,
             },
             'burpsuite': {
                 'list': BurpSuiteReportListView,
                 'detail': BurpSuiteReportDetailView,
                 'upload': BurpSuiteReportUploadView,
                 'delete': BurpSuiteReportDeleteView,
+                'export': BurpSuiteReportExportView,
+                'deliverable': BurpSuiteReportDeliverableView,
             },
             'support': {  # Add this section
                 'list': SupportReportListView,
@@ -105,4 +111,14 @@ def report_upload_view(request, customer_id, service_id):
 def report_delete_view(request, customer_id, service_id, pk):
     service = get_object_or_404(Service, service_id=service_id)
     view_class = ReportViewFactory.get_view_class(service, 'delete')
-    return view_class.as_view()(request, customer_id=customer_id, service_id=service_id, pk=pk)
\ No newline at end of file
+    return view_class.as_view()(request, customer_id=customer_id, service_id=service_id, pk=pk)
+
+def report_export_view(request, customer_id, service_id, pk):
+    service = get_object_or_404(Service, service_id=service_id)
+    view_class = ReportViewFactory.get_view_class(service, 'export')
+    return view_class.as_view()(request, customer_id=customer_id, service_id=service_id, pk=pk)
+
+def report_deliverable_view(request, customer_id, service_id, pk):
+    service = get_object_or_404(Service, service_id=service_id)
+    view_class = ReportViewFactory.get_view_class(service, 'deliverable')
+    return view_class.as_view()(request, customer_id=customer_id, service_id=service_id, pk=pk)
@@ -0,0 +1,42 @@
+from django.views.generic import DetailView
+from django.http import JsonResponse
+from django.urls import reverse
+from .base import ReportBaseView
+from ..models import IngestionJob
+
+class IngestionJobProgressView(ReportBaseView, DetailView):
+    """JSON progress of a queued upload, polled by the upload page"""
+    model = IngestionJob
+
+    def get_queryset(self):
+        return IngestionJob.objects.filter(
+            customer=self.request.selected_customer,
+            service__service_id=self.kwargs['service_id']
+        )
+
+    def has_permission(self):
+        # Same permission as the upload that created the job
+        self.object = self.get_object()
+        return self.request.user.has_perm(f'reports.add_{self.object.report_type}report')
+
+    def get(self, request, *args, **kwargs):
+        job = self.object
+        eta_seconds = job.eta_seconds
+        data = {
+            'job_id': str(job.job_id),
+            'status': job.status,
+            'status_label': job.get_status_display(),
+            'rows_processed': job.rows_processed,
+            'progress': round(job.progress * 100, 1),
+            'eta_seconds': round(eta_seconds) if eta_seconds is not None else None,
+            'errors': job.errors,
+            'warnings': job.warnings,
+            'report_url': None,
+        }
+        if job.status == 'completed' and job.report_id:
+            data['report_url'] = reverse('reports:report_detail', kwargs={
+                'customer_id': job.customer_id,
+                'service_id': self.kwargs['service_id'],
+                'pk': job.report_id
+            })
+        return JsonResponse(data)
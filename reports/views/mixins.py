@@ -1,31 +1,32 @@
-from django.db import models
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseRedirect
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from inventories.models import Service
+from ..models import IngestionJob
+from ..jobs import spool_upload
+from ..counters import ensure_status_counts, status_counts
 
 class StatusSummaryMixin:
-    def get_status_summary(self):
-        if hasattr(self, 'object') and hasattr(self.object, 'vulnerabilities'):
-            # Get STATUS_CHOICES from the model
-            model = self.object.vulnerabilities.model
-            status_choices = dict(model.STATUS_CHOICES)
-            
-            # Get counts from database
-            counts = (
-                self.object.vulnerabilities
-                .values('status')
-                .annotate(count=models.Count('id'))
-                .order_by('status')
-            )
-            
-            # Convert to dictionary with proper labels
-            return {
-                status['status']: {
-                    'label': status_choices[status['status']],
-                    'count': status['count']
-                }
-                for status in counts
-                if status['count'] > 0  # Only include non-zero counts
+    def get_status_summary(self, report_ids=None):
+        """Status summary read from the ReportStatusCounter rows; `report_ids` defaults to the current report"""
+        if report_ids is None:
+            if not hasattr(self, 'object'):
+                return {}
+            ensure_status_counts(self.object)
+            report_ids = [self.object.pk]
+
+        counts = status_counts(report_ids)
+        return {
+            status_value: {
+                'label': status_label,
+                'count': counts[status_value]
             }
-        return {}
+            for status_value, status_label in self.model._meta.get_field('vulnerabilities').related_model.STATUS_CHOICES
+            if counts.get(status_value)  # Only include non-zero counts
+        }
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -33,10 +34,54 @@ class StatusSummaryMixin:
         return context
 
     def get(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' and request.GET.get('counts_only'):
-            return JsonResponse({'status_summary': self.get_status_summary()})
-            
+            # The ownership check runs as a subquery so the poll is a single indexed lookup
+            report_ids = self.model.objects.filter(
+                pk=self.kwargs['pk'],
+                customer=self.request.selected_customer,
+                service__service_id=self.kwargs['service_id']
+            ).values('pk')
+            return JsonResponse({'status_summary': self.get_status_summary(report_ids)})
+
+        self.object = self.get_object()
         context = self.get_context_data(object=self.object)
-        return self.render_to_response(context)
\ No newline at end of file
+        return self.render_to_response(context)
+
+class IngestionJobUploadMixin:
+    """Spools the uploaded report to disk and queues it for the ingestion worker instead of ingesting in the request"""
+    report_type = None  # To be set by subclasses, matches IngestionJob.REPORT_TYPE_CHOICES
+
+    def form_valid(self, form):
+        self.job = spool_upload(
+            form.cleaned_data['json_file'],
+            report_type=self.report_type,
+            name=form.cleaned_data.get('name'),
+            customer=self.request.selected_customer,
+            contract=form.cleaned_data.get('contract'),
+            service=get_object_or_404(Service, service_id=self.kwargs['service_id']),
+            created_by=self.request.user,
+            carry_forward=form.cleaned_data.get('carry_forward', False),
+        )
+        messages.info(self.request, mark_safe(f"Report <strong>{self.job.name}</strong> has been queued for processing."), extra_tags='alert-primary')
+        return HttpResponseRedirect(self.get_success_url())
+
+    def get_success_url(self):
+        url = reverse('reports:report_upload', kwargs={
+            'customer_id': self.request.selected_customer.customer_id,
+            'service_id': self.kwargs['service_id']
+        })
+        return f"{url}?job={self.job.job_id}"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        job_id = self.request.GET.get('job')
+        if job_id:
+            try:
+                context['job'] = IngestionJob.objects.filter(
+                    pk=job_id,
+                    customer=self.request.selected_customer,
+                    service__service_id=self.kwargs['service_id']
+                ).first()
+            except ValidationError:
+                pass  # Malformed job id in the query string
+        return context
@@ -1,21 +1,26 @@
 from django.views.generic.edit import FormView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views.generic import View, TemplateView
 from django.contrib import messages
 from django.utils.safestring import mark_safe
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
+from django.core.exceptions import ValidationError
 from core.mixins import SelectedCustomerRequiredMixin
-from .base import ReportListView, ReportDetailView, ReportDeleteView #, ReportUpdateView
-from ..models import NessusReport, NessusVulnerability
+from .base import ReportListView, ReportDetailView, ReportDeleteView, ReportExportView, ReportDeliverableView #, ReportUpdateView
+from ..models import NessusReport, NessusVulnerability, RISK_FACTOR_ORDER, risk_rank
+from ..triage import transition_status, comparable_reports, missing_fingerprints, previous_report
+from ..fragments import cached_fragment
+from ..diff import DIFF_CATEGORIES, diff_counts, diff_page, severity_changes_page
 from ..forms.nessus import NessusReportUploadForm
-from signatures.models import NessusSignature
-from ..views.mixins import StatusSummaryMixin
+from ..views.mixins import StatusSummaryMixin, IngestionJobUploadMixin
 from inventories.models import Service
+from signatures.models import NessusSignature
+from signatures.cache import get_signatures
 import json
 from django.shortcuts import get_object_or_404
 from django.views.decorators.http import require_POST
 from .base import ReportBaseView
-from collections import defaultdict
 from django.contrib.auth import get_user_model
 from django.db import models, transaction
 from django.utils.decorators import method_decorator
@@ -39,6 +44,20 @@ class NessusReportListView(ReportListView):
         context['service'] = self.service
         return context
 
+
+def signature_data(signature):
+    """JSON representation of a signature as shown in a report group, expects cves/reference_links prefetched (see signatures.cache)"""
+    return {
+        'id': signature.id,
+        'name': signature.name,
+        'risk_factor': signature.risk_factor,
+        'cvss_base_score': signature.cvss_base_score,
+        'description': signature.description,
+        'solution': signature.solution,
+        'cve': [link.cve_id for link in signature.cves.all()],
+        'references': [link.value for link in signature.reference_links.all() if link.kind == 'see_also'],
+    }
+
 class NessusReportDetailView(StatusSummaryMixin, ReportDetailView):
     model = NessusReport
     template_name = 'reports/nessus/report_detail.html'
@@ -57,85 +76,29 @@ class NessusReportDetailView(StatusSummaryMixin, ReportDetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        vulnerabilities = self.object.vulnerabilities.select_related('signature').all()
-
-        status_summary = {}
-        for status_value, status_label in NessusVulnerability.STATUS_CHOICES:
-            count = vulnerabilities.filter(status=status_value).count()
-            if count > 0:  # Only include statuses that have targets
-                status_summary[status_label] = count
-        
-        context['status_summary'] = status_summary
-        
         context['STATUS_CHOICES'] = NessusVulnerability.STATUS_CHOICES
-        
-        # Fetch the latest change information for each vulnerability
-        latest_changes = vulnerabilities.values(
-            'signature', 'target_affected'
-        ).annotate(
-            latest_change=models.Max('changed_at'),
-            changed_by_id=models.F('changed_by')
-        )
-
-        # Fetch user information
-        user_ids = set(change['changed_by_id'] for change in latest_changes if change['changed_by_id'] is not None)
-        User = get_user_model()
-        user_dict = {user.id: user for user in User.objects.filter(id__in=user_ids)}
-
-        # Function to order risk factors by severity
-        def severity_order(risk_factor):
-            order = {'Critical': 0, 'High': 1, 'Medium': 2, 'Low': 3, 'Informational': 4, 'None': 5}
-            return order.get(risk_factor, 6)
-        
-        grouped_vulnerabilities = defaultdict(lambda: defaultdict(list))
-        for vuln in vulnerabilities:
-            # Process references (previously see_also)
-            if vuln.signature.references:
-                vuln.signature.references = vuln.signature.references.split()
-            
-            # Process CVEs
-            if vuln.signature.cve:
-                try:
-                    cve_list = json.loads(vuln.signature.cve)
-                    vuln.signature.cve = [cve.strip().replace('"', '').replace(' ', '') for cve in cve_list if cve.strip()]
-                except json.JSONDecodeError:
-                    vuln.signature.cve = []
-
-            # Format the changed_at date for each vulnerability
-            if vuln.changed_at:
-                formatted_change_date = timezone.localtime(vuln.changed_at).strftime('%b %d, %Y, %I:%M:%S %p')
-            else:
-                formatted_change_date = 'N/A'
-            
-            grouped_vulnerabilities[vuln.signature.risk_factor][vuln.signature.id].append({
-                'signature': vuln.signature,
-                'targets': [{
-                    'id': vuln.id,
-                    'target_affected': vuln.target_affected,
-                    'status': vuln.status,
-                    'changed_at': formatted_change_date,
-                    'changed_by': vuln.changed_by.email if vuln.changed_by else 'N/A',
-                    'STATUS_CHOICES': NessusVulnerability.STATUS_CHOICES  # Add this line
-                }]
-            })
 
-        # Sort the grouped vulnerabilities
-        sorted_vulnerabilities = []
-        for risk_factor, signatures in sorted(grouped_vulnerabilities.items(), key=lambda x: severity_order(x[0])):
-            vuln_group = {
-                'risk_factor': risk_factor,
-                'vulnerabilities': []
-            }
-            for signature_id, vulns in signatures.items():
-                vuln_group['vulnerabilities'].append({
-                    'signature': vulns[0]['signature'],
-                    'targets': [target for vuln in vulns for target in vuln['targets']]
-                })
-            sorted_vulnerabilities.append(vuln_group)
-        
-        context['grouped_vulnerabilities'] = sorted_vulnerabilities
+        # Only the risk factor headers are rendered here, the signature groups are loaded from NessusReportGroupsView
+        context['risk_groups'] = cached_fragment(self.object, 'nessus-risk-groups', self.get_risk_groups)
+        context['groups_url'] = reverse('reports:nessus_report_groups', kwargs={
+            'customer_id': self.object.customer_id,
+            'service_id': self.kwargs['service_id'],
+            'report_id': self.object.report_id
+        })
         return context
 
+    def get_risk_groups(self):
+        risk_counts = (
+            self.object.vulnerabilities
+            .values('signature__risk_factor')
+            .annotate(signatures=models.Count('signature', distinct=True), targets=models.Count('id'))
+            .order_by()
+        )
+        return sorted(
+            ({'risk_factor': row['signature__risk_factor'], 'signatures': row['signatures'], 'targets': row['targets']} for row in risk_counts),
+            key=lambda group: risk_rank(group['risk_factor'])
+        )
+
     @method_decorator(require_POST)
     def post(self, request, *args, **kwargs):
         return self.update_vulnerability_status(request, *args, **kwargs)
@@ -146,10 +109,12 @@ class NessusReportDetailView(StatusSummaryMixin, ReportDetailView):
         bulk_type = request.POST.get('bulk_type')
         risk_factor = request.POST.get('risk_factor')
 
+        if new_status not in dict(NessusVulnerability.STATUS_CHOICES):
+            return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
+
         try:
             with transaction.atomic():
                 report = self.get_object()
-                updated_vulnerabilities = []
 
                 if bulk_type == 'vulnerability':
                     vulnerabilities = NessusVulnerability.objects.filter(
@@ -164,19 +129,14 @@ class NessusReportDetailView(StatusSummaryMixin, ReportDetailView):
                 else:
                     vulnerabilities = NessusVulnerability.objects.filter(id=vulnerability_id, report=report)
 
-                for vulnerability in vulnerabilities:
-                    if vulnerability.status != new_status:
-                        vulnerability.status = new_status
-                        vulnerability.changed_by = request.user  # This is now correct
-                        vulnerability.save()
-
-                        updated_vulnerabilities.append({
-                            'id': vulnerability.id,
-                            'target_affected': vulnerability.target_affected,
-                            'status': new_status,
-                            'changed_by': request.user.email,
-                            'changed_at': timezone.localtime(vulnerability.changed_at).strftime('%b %d, %Y, %I:%M:%S %p')
-                        })
+                changed = transition_status(report, vulnerabilities, new_status, request.user, fields=('target_affected',))
+                updated_vulnerabilities = [{
+                    'id': row['id'],
+                    'target_affected': row['target_affected'],
+                    'status': new_status,
+                    'changed_by': request.user.email,
+                    'changed_at': timezone.localtime(row['changed_at']).strftime('%b %d, %Y, %I:%M:%S %p')
+                } for row in changed]
 
                 return JsonResponse({
                     'success': True, 
@@ -191,7 +151,203 @@ class NessusReportDetailView(StatusSummaryMixin, ReportDetailView):
         return self.update_vulnerability_status(request, *args, **kwargs)
 
 
-class NessusReportUploadView(ReportBaseView, FormView):
+class NessusReportGroupsView(ReportBaseView, View):
+    """
+    Keyset-paginated signature groups of a report, ordered by (risk factor severity, signature, vulnerability).
+    `cursor` is the position of the last row returned; a group larger than a page continues on the next page,
+    so every page costs at most one bounded query per risk factor no matter how large the report is.
+    Targets are read as slim value rows and each signature on the page is loaded once afterwards; a group
+    continued from the previous page only carries the signature id, the client already has the rest.
+    Pages are cached per report cache_version, so reopening an unchanged report skips the queries.
+    """
+    permission_required = 'reports.view_nessusreport'
+    page_size = 500
+    max_page_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        report = get_object_or_404(
+            NessusReport,
+            pk=self.kwargs['report_id'],
+            customer=self.request.selected_customer,
+            service__service_id=self.kwargs['service_id']
+        )
+        try:
+            rank, signature_id, vulnerability_id = self.parse_cursor(request.GET.get('cursor'))
+            limit = max(1, min(int(request.GET.get('limit', self.page_size)), self.max_page_size))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+        page = cached_fragment(
+            report, 'nessus-groups', lambda: self.build_page(report, rank, signature_id, vulnerability_id, limit),
+            rank, signature_id, vulnerability_id, limit
+        )
+        return JsonResponse(page)
+
+    def build_page(self, report, rank, signature_id, vulnerability_id, limit):
+        rows = []
+        for current_rank in range(rank, len(RISK_FACTOR_ORDER)):
+            vulnerabilities = report.vulnerabilities.filter(signature__risk_factor=RISK_FACTOR_ORDER[current_rank])
+            if current_rank == rank:
+                vulnerabilities = vulnerabilities.filter(
+                    models.Q(signature_id__gt=signature_id) | models.Q(signature_id=signature_id, id__gt=vulnerability_id)
+                )
+            rows.extend(
+                dict(row, rank=current_rank) for row in
+                vulnerabilities.order_by('signature_id', 'id').values(
+                    'id', 'signature_id', 'target_affected', 'status', 'changed_at', 'changed_by__email'
+                )[:limit - len(rows)]
+            )
+            if len(rows) >= limit:
+                break
+
+        continued_id = signature_id if rows and (rows[0]['rank'], rows[0]['signature_id']) == (rank, signature_id) else None
+        signatures = get_signatures(NessusSignature, {row['signature_id'] for row in rows} - {continued_id})
+        groups = []
+        for row in rows:
+            if not groups or groups[-1]['signature']['id'] != row['signature_id']:
+                groups.append({
+                    'risk_factor': RISK_FACTOR_ORDER[row['rank']],
+                    'signature': (
+                        {'id': row['signature_id']} if row['signature_id'] == continued_id
+                        else signature_data(signatures[row['signature_id']])
+                    ),
+                    'targets': [],
+                })
+            groups[-1]['targets'].append({
+                'id': row['id'],
+                'target_affected': row['target_affected'],
+                'status': row['status'],
+                'changed_by': row['changed_by__email'] or 'N/A',
+                'changed_at': timezone.localtime(row['changed_at']).strftime('%b %d, %Y, %I:%M:%S %p') if row['changed_at'] else 'N/A',
+            })
+
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_cursor = f"{last['rank']}.{last['signature_id']}.{last['id']}"
+        return {'groups': groups, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """(risk factor rank, signature id, vulnerability id) of a `rank.signature.vulnerability` cursor, ValueError when malformed"""
+        if not cursor:
+            return 0, -1, 0
+        rank, signature_id, vulnerability_id = (int(part) for part in cursor.split('.'))
+        if not 0 <= rank < len(RISK_FACTOR_ORDER):
+            raise ValueError(f"Invalid risk factor rank {rank}")
+        return rank, signature_id, vulnerability_id
+
+class NessusReportDiffMixin(ReportBaseView):
+    """Resolves the compared reports: the head from the URL, the base from ?base= (same customer and service)"""
+    permission_required = 'reports.view_nessusreport'
+
+    def get_report(self, pk):
+        try:
+            return get_object_or_404(
+                NessusReport,
+                pk=pk,
+                customer=self.request.selected_customer,
+                service__service_id=self.kwargs['service_id']
+            )
+        except ValidationError:
+            raise Http404("Invalid report ID")
+
+    def get_base_candidates(self, head):
+        return comparable_reports(head)
+
+class NessusReportDiffView(NessusReportDiffMixin, TemplateView):
+    """Compares a report with an earlier scan of the same service; the finding lists load from NessusReportDiffDataView"""
+    template_name = 'reports/nessus/report_diff.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        head = self.get_report(self.kwargs['report_id'])
+        candidates = self.get_base_candidates(head)
+        base_id = self.request.GET.get('base')
+        if base_id:
+            base = self.get_report(base_id)
+        else:
+            base = previous_report(head) or candidates.first()
+        # Unfingerprinted findings match nothing, every finding would show up as new or resolved
+        unfingerprinted = [report for report in (base, head) if report and missing_fingerprints(report)]
+
+        context.update({
+            'report': head,
+            'base': base,
+            'base_candidates': candidates.only('report_id', 'name', 'date'),
+            'categories': DIFF_CATEGORIES,
+            'STATUS_CHOICES': NessusVulnerability.STATUS_CHOICES,
+            'unfingerprinted': unfingerprinted,
+            'counts': diff_counts(base, head) if base and not unfingerprinted else None,
+            'data_url': reverse('reports:nessus_report_diff_data', kwargs={
+                'customer_id': head.customer_id,
+                'service_id': self.kwargs['service_id'],
+                'report_id': head.report_id
+            }),
+        })
+        return context
+
+class NessusReportDiffDataView(NessusReportDiffMixin, View):
+    """
+    JSON diff of two reports: ?base=<report_id>&category=new|resolved|persisting&after=<id>&limit=<n>.
+    The first page (no `after`) also carries the counts of every category.
+    """
+    page_size = 500
+    max_page_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        head = self.get_report(self.kwargs['report_id'])
+        base = self.get_report(request.GET.get('base'))
+        category = request.GET.get('category', 'new')
+        if category not in DIFF_CATEGORIES:
+            return JsonResponse({'error': 'Invalid category'}, status=400)
+        try:
+            after = int(request.GET.get('after', 0))
+            limit = max(1, min(int(request.GET.get('limit', self.page_size)), self.max_page_size))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+        if missing_fingerprints(base) or missing_fingerprints(head):
+            return JsonResponse({'error': 'Findings without fingerprints, run backfill_finding_fingerprints'}, status=409)
+
+        findings, next_after = diff_page(base, head, category, after, limit)
+        data = {
+            'base': str(base.report_id),
+            'head': str(head.report_id),
+            'category': category,
+            'findings': findings,
+            'next_after': next_after,
+        }
+        if not after:
+            data['counts'] = diff_counts(base, head)
+        return JsonResponse(data)
+
+class NessusReportSeverityChangesView(NessusReportDiffMixin, View):
+    """
+    JSON list of the report's findings whose signature severity changed in a feed import after the report date:
+    ?after=<id>&limit=<n>, with the reported and current risk factor and CVSS base score of each finding.
+    """
+    page_size = 500
+    max_page_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        report = self.get_report(self.kwargs['report_id'])
+        try:
+            after = int(request.GET.get('after', 0))
+            limit = max(1, min(int(request.GET.get('limit', self.page_size)), self.max_page_size))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+        findings, next_after = severity_changes_page(report, after, limit)
+        return JsonResponse({
+            'report': str(report.report_id),
+            'since': report.date.isoformat(),
+            'findings': findings,
+            'next_after': next_after,
+        })
+
+class NessusReportUploadView(IngestionJobUploadMixin, ReportBaseView, FormView):
+    report_type = 'nessus'
     form_class = NessusReportUploadForm
     template_name = 'reports/report_upload.html'
     permission_required = 'reports.add_nessusreport'
@@ -202,68 +358,39 @@ class NessusReportUploadView(ReportBaseView, FormView):
         kwargs['service'] = get_object_or_404(Service, service_id=self.kwargs['service_id'])
         return kwargs
 
-    def form_valid(self, form):
-        json_file = form.cleaned_data['json_file']
-        contract = form.cleaned_data.get('contract')
-        service = get_object_or_404(Service, service_id=self.kwargs['service_id'])
-        report_name = form.cleaned_data.get('name')
-
-        try:
-            data = json.load(json_file)
-
-            with transaction.atomic():
-                self.object = NessusReport.objects.create(
-                    customer=self.request.selected_customer,
-                    contract=contract,
-                    service=service,
-                    date=data['date'],
-                    inventory=data['inventory'],
-                    name=report_name,
-                )
-
-                for alert in data['alert_report']:
-                    try:
-                        signature = NessusSignature.objects.get(id=alert['plugin_id'])
-                        
-                        NessusVulnerability.objects.create(
-                            report=self.object,
-                            signature=signature,
-                            target_affected=alert['target_affected'],
-                            operating_system=alert['os'],
-                            status='not_started'
-                        )
-
-                    except NessusSignature.DoesNotExist:
-                        messages.warning(self.request,
-                                        mark_safe(f"Signature with ID <strong>{alert['plugin_id']}</strong> not found."),
-                                        extra_tags='alert-warning')
-
-                messages.success(self.request,
-                                mark_safe(f"Nessus Report <strong>{self.object.report_id}</strong> uploaded successfully."))
-
-        except json.JSONDecodeError:
-            messages.error(self.request, "Invalid JSON file.", extra_tags='alert-danger')
-            return self.form_invalid(form)
-        except Exception as e:
-            messages.error(self.request,
-                           mark_safe(f"Error uploading report: <strong>{str(e)}</strong>"),
-                           extra_tags='alert-danger')
-            return self.form_invalid(form)
-
-        return super().form_valid(form)
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['service'] = get_object_or_404(Service, service_id=self.kwargs['service_id'])
         context['report_type'] = 'Nessus'
         return context
 
-    def get_success_url(self):
-        return reverse_lazy('reports:report_list', kwargs={
-            'customer_id': self.request.selected_customer.customer_id,
-            'service_id': self.object.service.service_id
-        })
-
 class NessusReportDeleteView(ReportDeleteView):
     model = NessusReport
-    permission_required = 'reports.delete_nessusreport'
\ No newline at end of file
+    permission_required = 'reports.delete_nessusreport'
+
+class NessusReportExportView(ReportExportView):
+    model = NessusReport
+    permission_required = 'reports.view_nessusreport'
+    severity_lookup = 'signature__risk_factor'
+    host_lookup = 'target_affected'
+    export_columns = [
+        ('id', 'id'),
+        ('plugin_id', 'signature_id'),
+        ('name', 'signature__name'),
+        ('risk_factor', 'signature__risk_factor'),
+        ('cvss_base_score', 'signature__cvss_base_score'),
+        ('cve', 'signature__cve'),
+        ('synopsis', 'signature__synopsis'),
+        ('solution', 'signature__solution'),
+        ('target_affected', 'target_affected'),
+        ('operating_system', 'operating_system'),
+        ('status', 'status'),
+        ('changed_by', 'changed_by__email'),
+        ('changed_at', 'changed_at'),
+        ('fingerprint', 'fingerprint'),
+    ]
+
+class NessusReportDeliverableView(ReportDeliverableView):
+    model = NessusReport
+    report_type = 'nessus'
+    permission_required = 'reports.view_nessusreport'
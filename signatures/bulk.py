@@ -0,0 +1,168 @@
+import io
+from itertools import islice
+from django.db import connection, transaction
+
+STAGING_CHUNK_SIZE = 10000
+
+
+def copy_text(value):
+    """Encode one value for PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def load_staging_postgresql(cursor, staging, fields, rows, chunk_size):
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    staged = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return staged
+        buffer = io.StringIO()
+        for row in chunk:
+            buffer.write('\t'.join(copy_text(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN", buffer)
+        staged += len(chunk)
+
+
+def load_staging_executemany(cursor, staging, fields, rows, chunk_size):
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    staged = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return staged
+        cursor.executemany(f"INSERT INTO {staging} ({columns}) VALUES ({placeholders})", chunk)
+        staged += len(chunk)
+
+
+def copy_upsert(model, rows, chunk_size=STAGING_CHUNK_SIZE):
+    """
+    Upsert an iterable of dicts (keyed by field attname) into `model` through a temporary staging table.
+    PostgreSQL loads the staging table with COPY FROM STDIN; other backends (SQLite) use executemany.
+    The staged rows are merged with a single INSERT ... ON CONFLICT (pk) DO UPDATE, the last
+    occurrence of a duplicated primary key wins. Returns the number of rows staged.
+    """
+    quote = connection.ops.quote_name
+    fields = list(model._meta.concrete_fields)
+    table = quote(model._meta.db_table)
+    staging = quote(f'{model._meta.db_table}_staging')
+    pk_column = quote(model._meta.pk.column)
+    columns = ', '.join(quote(field.column) for field in fields)
+    updates = ', '.join(f"{quote(field.column)} = EXCLUDED.{quote(field.column)}" for field in fields if not field.primary_key)
+
+    def prepared(rows):
+        for row in rows:
+            yield [
+                field.get_db_prep_save(row[field.attname] if field.attname in row else field.get_default(), connection)
+                for field in fields
+            ]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            cursor.execute(f"ALTER TABLE {staging} ADD COLUMN staging_seq bigserial")
+            staged = load_staging_postgresql(cursor, staging, fields, prepared(rows), chunk_size)
+            source = f"SELECT DISTINCT ON ({pk_column}) {columns} FROM {staging} ORDER BY {pk_column}, staging_seq DESC"
+        else:
+            cursor.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} AS SELECT {columns} FROM {table} WHERE 0")
+            staged = load_staging_executemany(cursor, staging, fields, prepared(rows), chunk_size)
+            # SQLite needs the WHERE clause to parse INSERT ... SELECT ... ON CONFLICT; rows apply in order
+            source = f"SELECT {columns} FROM {staging} WHERE true ORDER BY rowid"
+
+        cursor.execute(f"INSERT INTO {table} ({columns}) {source} ON CONFLICT ({pk_column}) DO UPDATE SET {updates}")
+
+        if connection.vendor != 'postgresql':
+            cursor.execute(f"DROP TABLE temp.{staging}")
+
+    return staged
+
+
+def load_content_hashes(model):
+    """Preload {pk: content_hash} for delta syncs"""
+    return dict(model.objects.values_list('pk', 'content_hash').iterator(chunk_size=10000))
+
+
+def load_signature_states(signature_ids):
+    """
+    {pk: SignatureRevision.STATE_FIELDS tuple} of the stored Nessus signatures among `signature_ids`. Signatures
+    stored before content hashes existed get theirs computed from the stored content, so an unchanged one
+    does not look changed.
+    """
+    from .models import NessusSignature, SignatureRevision
+
+    states = {
+        row[0]: row[1:]
+        for row in NessusSignature.objects.filter(id__in=signature_ids).values_list('id', *SignatureRevision.STATE_FIELDS)
+    }
+    unhashed = [pk for pk, state in states.items() if state[0] is None]
+    if unhashed:
+        fields = NessusSignature.content_hash_fields()
+        for values in NessusSignature.objects.filter(id__in=unhashed).values('id', *fields):
+            states[values['id']] = (NessusSignature.hash_values(values),) + states[values['id']][1:]
+    return states
+
+
+def track_revisions(rows, revisions, changed_at, chunk_size=1000):
+    """
+    Pass Nessus staging rows through unchanged while appending a SignatureRevision to `revisions` for every row
+    that overwrites a stored signature with different content. The stored state is read with one indexed
+    query per chunk, before the staged rows are merged.
+    """
+    from .models import SignatureRevision
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        states = load_signature_states([row['id'] for row in chunk])
+        # The last occurrence of an id repeated in the feed is the one the merge keeps
+        for row in {row['id']: row for row in chunk}.values():
+            revision = SignatureRevision.between(row['id'], states.get(row['id']), row, changed_at)
+            if revision is not None:
+                revisions.append(revision)
+        yield from chunk
+
+
+def needs_write(known_hashes, pk, digest, counters):
+    """Compare a row's hash with the preloaded map, counting new/changed/unchanged rows"""
+    if pk not in known_hashes:
+        counters['new'] += 1
+        return True
+    if known_hashes[pk] != digest:
+        counters['changed'] += 1
+        return True
+    counters['unchanged'] += 1
+    return False
+
+
+def index_signature_links(signature_ids, chunk_size=1000):
+    """
+    Rebuild the SignatureCVE/SignatureReference rows of the given Nessus signatures from their stored
+    cve, xref and references text, one delete + two bulk INSERTs per chunk. Returns the number of signatures indexed.
+    """
+    from .models import NessusSignature, SignatureCVE, SignatureReference
+
+    indexed = 0
+    signature_ids = iter(signature_ids)
+    while True:
+        chunk = list(islice(signature_ids, chunk_size))
+        if not chunk:
+            return indexed
+        cves, references = [], []
+        for signature_id, cve, xref, see_also in NessusSignature.objects.filter(id__in=chunk).values_list('id', 'cve', 'xref', 'references'):
+            cve_ids, links = NessusSignature.parse_links(cve, xref, see_also)
+            cves += [SignatureCVE(signature_id=signature_id, cve_id=cve_id) for cve_id in cve_ids]
+            references += [SignatureReference(signature_id=signature_id, kind=kind, value=value) for kind, value in links]
+            indexed += 1
+        with transaction.atomic():
+            SignatureCVE.objects.filter(signature_id__in=chunk).delete()
+            SignatureReference.objects.filter(signature_id__in=chunk).delete()
+            SignatureCVE.objects.bulk_create(cves)
+            SignatureReference.objects.bulk_create(references)
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .versions import signatures_version
+
+# Columns the report groups, the deliverables and the exports read. The long text nothing shows (cpe, agent,
+# xref, see_also) and the search vector stay out of the cache; reading another column costs a query per signature
+CACHED_FIELDS = {
+    'nessus': ('id', 'name', 'risk_factor', 'cvss_base_score', 'description', 'solution', 'synopsis', 'cve'),
+    'burpsuite': ('id', 'name', 'description', 'references', 'remediation', 'vulnerability_classifications'),
+}
+# Relations signature_data() and the report templates read, loaded once with the cached signature
+PREFETCHED_RELATIONS = {
+    'nessus': ('cves', 'reference_links'),
+}
+
+
+def scanner_type_of(model):
+    return model._meta.model_name.removesuffix('signature')
+
+
+class SignatureCache:
+    """
+    Bounded, process-local LRU cache of slim signature instances (CACHED_FIELDS) keyed by (scanner_type, id). Entries belong to one
+    global signatures version: once an upload or an edit bumps it, the next lookup drops everything cached.
+    Cached instances are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_many(self, model, ids):
+        """{id: signature} for the given ids, loading the missing ones in one query; unknown ids are left out"""
+        scanner_type = scanner_type_of(model)
+        version = signatures_version()
+        found, missing = {}, []
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            for signature_id in set(ids):
+                key = (scanner_type, signature_id)
+                signature = self.entries.get(key)
+                if signature is None:
+                    missing.append(signature_id)
+                else:
+                    self.entries.move_to_end(key)
+                    found[signature_id] = signature
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = (
+                model.objects.only(*CACHED_FIELDS[scanner_type])
+                .prefetch_related(*PREFETCHED_RELATIONS.get(scanner_type, ()))
+                .in_bulk(missing)
+            )
+            with self.lock:
+                if self.version == version:
+                    for signature_id, signature in loaded.items():
+                        self.entries[(scanner_type, signature_id)] = signature
+                    while len(self.entries) > self.maxsize:
+                        self.entries.popitem(last=False)
+                        self.evictions += 1
+            found.update(loaded)
+        return found
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'version': self.version,
+            }
+
+
+signature_cache = SignatureCache(getattr(settings, 'SIGNATURE_CACHE_SIZE', 5000))
+
+
+def get_signatures(model, ids):
+    return signature_cache.get_many(model, ids)
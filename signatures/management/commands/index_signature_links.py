@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from signatures.bulk import index_signature_links
+from signatures.models import NessusSignature
+
+class Command(BaseCommand):
+    help = 'Rebuild the SignatureCVE and SignatureReference tables from the stored Nessus signature text (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk_size', type=int, default=1000, help='Signatures indexed per transaction')
+        parser.add_argument('--missing', action='store_true', help='Only index signatures that have link text but no links yet (run at deploy)')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        signatures = NessusSignature.objects.all()
+        if options['missing']:
+            signatures = signatures.filter(cves__isnull=True, reference_links__isnull=True).exclude(
+                (Q(cve__isnull=True) | Q(cve__in=['', '[]'])) &
+                (Q(xref__isnull=True) | Q(xref__in=['', '[]'])) &
+                (Q(references__isnull=True) | Q(references=''))
+            )
+        signature_ids = signatures.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000)
+        indexed = index_signature_links(signature_ids, chunk_size=options['chunk_size'])
+        duration = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(f"Indexed CVE and reference links of {indexed} Nessus signatures in {duration:.2f} seconds"))
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from signatures.models import NessusSignature, BurpSuiteSignature
+from signatures.search import update_search_vectors
+
+class Command(BaseCommand):
+    help = 'Recompute the full-text search index of all Nessus and BurpSuite signatures (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk_size', type=int, default=5000, help='Signatures refreshed per statement')
+        parser.add_argument('--missing', action='store_true', help='Only index signatures whose search vector is empty (run at deploy)')
+
+    def handle(self, *args, **options):
+        if options['missing'] and connection.vendor != 'postgresql':
+            # The SQLite FTS5 table is filled from every stored signature when it is first used
+            self.stdout.write(self.style.SUCCESS(f"Nothing to backfill on {connection.vendor}"))
+            return
+
+        for model in (NessusSignature, BurpSuiteSignature):
+            start_time = time.time()
+            signatures = model.objects.all()
+            if options['missing']:
+                signatures = signatures.filter(search_vector__isnull=True)
+            signature_ids = signatures.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000)
+            refreshed = update_search_vectors(model, signature_ids, chunk_size=options['chunk_size'])
+            duration = time.time() - start_time
+            self.stdout.write(self.style.SUCCESS(f"Refreshed the search index of {refreshed} {model.__name__} rows in {duration:.2f} seconds"))
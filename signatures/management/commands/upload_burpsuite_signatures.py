@@ -1,119 +1,172 @@
-import os
-import json
 import multiprocessing
+from collections import deque
+from itertools import islice
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db import transaction
-from datetime import datetime
+from django.db import connections
 import time
-from tqdm import tqdm
 from functools import partial
+import ijson
+from tqdm import tqdm
+from signatures.versions import bump_signatures_version
+from signatures.bulk import load_content_hashes, needs_write
+from signatures.search import update_search_vectors
+
+UPDATE_FIELDS = ['name', 'description', 'remediation', 'references', 'vulnerability_classifications', 'retired', 'scanner_type', 'scg_last_update', 'content_hash']
 
-def process_chunk(chunk_file, batch_update_time):
-    # Re-initialize Django for this process
+def init_worker():
+    # Runs once per worker; the worker then keeps its own database connection for every batch it receives
     import django
     django.setup()
-    
-    # Import the model here to ensure it's available in this process
+
+def signature_values(entry, batch_update_time):
+    return {
+        'id': entry['issue_type_id'],
+        'name': entry['name'],
+        'description': entry['description'],
+        'remediation': entry.get('remediation', ''),
+        'references': entry.get('references', ''),
+        'vulnerability_classifications': entry.get('vulnerability_classifications', ''),
+        'retired': entry.get('retired', False),
+        'scanner_type': 'BurpSuite',
+        'scg_last_update': batch_update_time,
+    }
+
+def process_batch(entries, batch_update_time):
     from signatures.models import BurpSuiteSignature
-    
-    with open(chunk_file, 'r') as file:
-        data = json.load(file)
-    
-    processed_count = 0
+
+    signatures = {}
     error_count = 0
-    
-    with transaction.atomic():
-        for entry in data:
-            try:
-                BurpSuiteSignature.objects.update_or_create(
-                    id=entry['issue_type_id'],
-                    defaults={
-                        'name': entry['name'],
-                        'description': entry['description'],
-                        'remediation': entry.get('remediation', ''),
-                        'references': entry.get('references', ''),
-                        'vulnerability_classifications': entry.get('vulnerability_classifications', ''),
-                        'retired': entry.get('retired', False),
-                        'scanner_type': 'BurpSuite',
-                        'scg_last_update': batch_update_time,
-                    }
-                )
-                processed_count += 1
-            except Exception as e:
-                error_count += 1
-                print(f"Error processing signature with ID: {entry.get('issue_type_id', 'Unknown')}: {str(e)}")
-    
-    os.remove(chunk_file)
+    for entry in entries:
+        try:
+            values = signature_values(entry, batch_update_time)
+            values['content_hash'] = BurpSuiteSignature.hash_values(values)
+            signatures[values['id']] = BurpSuiteSignature(**values)  # Last duplicate in a batch wins
+        except Exception as e:
+            error_count += 1
+            print(f"Error processing signature with ID: {entry.get('issue_type_id', 'Unknown')}: {str(e)}")
+
+    try:
+        BurpSuiteSignature.objects.bulk_create(
+            signatures.values(),
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=UPDATE_FIELDS,
+        )
+        update_search_vectors(BurpSuiteSignature, list(signatures))
+        return len(signatures), error_count
+    except Exception as e:
+        print(f"Batch upsert failed ({str(e)}), retrying signatures one by one")
+
+    # Isolate the rows that broke the set-based upsert
+    processed_count = 0
+    written_ids = []
+    for signature in signatures.values():
+        try:
+            BurpSuiteSignature.objects.update_or_create(
+                id=signature.id,
+                defaults={field: getattr(signature, field) for field in UPDATE_FIELDS}
+            )
+            written_ids.append(signature.id)
+            processed_count += 1
+        except Exception as e:
+            error_count += 1
+            print(f"Error processing signature with ID: {signature.id}: {str(e)}")
+    update_search_vectors(BurpSuiteSignature, written_ids)
     return processed_count, error_count
 
+def delta_entries(entries, batch_update_time, known_hashes, counters):
+    """Drop feed entries whose content hash matches the stored signature (--delta)"""
+    from signatures.models import BurpSuiteSignature
+
+    for entry in entries:
+        try:
+            values = signature_values(entry, batch_update_time)
+            if not needs_write(known_hashes, values['id'], BurpSuiteSignature.hash_values(values), counters):
+                continue
+        except Exception:
+            pass  # Let the worker report the broken entry
+        yield entry
+
+def iter_batches(json_file_path, batch_size, entry_filter=None):
+    with open(json_file_path, 'rb') as file:
+        entries = ijson.items(file, 'item', use_float=True)
+        if entry_filter:
+            entries = entry_filter(entries)
+        while True:
+            batch = list(islice(entries, batch_size))
+            if not batch:
+                return
+            yield batch
+
 class Command(BaseCommand):
-    help = 'Upload BurpSuite signatures from a JSON file using sharding'
+    help = 'Upload BurpSuite signatures from a JSON file using a process pool'
 
     def add_arguments(self, parser):
         parser.add_argument('json_file', type=str, help='Path to the JSON file')
-        parser.add_argument('--chunk_size', type=int, default=1000, help='Number of signatures per chunk')
+        parser.add_argument('--chunk_size', type=int, default=1000, help='Number of signatures per batch sent to a worker')
         parser.add_argument('--max_workers', type=int, default=multiprocessing.cpu_count(), help='Max number of worker processes')
+        parser.add_argument('--delta', action='store_true', help='Only write signatures that are new or whose content hash changed')
 
     def handle(self, *args, **options):
         json_file_path = options['json_file']
         chunk_size = options['chunk_size']
         max_workers = options['max_workers']
 
-        self.stdout.write(self.style.SUCCESS(f"Starting sharded BurpSuite signature upload from {json_file_path}"))
+        self.stdout.write(self.style.SUCCESS(f"Starting parallel BurpSuite signature upload from {json_file_path} with {max_workers} workers"))
 
         start_time = time.time()
         batch_update_time = timezone.now()
+        total_processed = 0
+        total_errors = 0
+        delta_counters = {'new': 0, 'changed': 0, 'unchanged': 0}
 
         try:
-            with open(json_file_path, 'r') as file:
-                data = json.load(file)
-
-            total_entries = len(data)
-            self.stdout.write(self.style.SUCCESS(f"Total entries in JSON file: {total_entries}"))
-
-            # Create tempshardsigs folder if it doesn't exist
-            shard_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'tempshardsigs')
-            os.makedirs(shard_folder, exist_ok=True)
-            self.stdout.write(self.style.SUCCESS(f"Using shard folder: {shard_folder}"))
-
-            # Create chunks
-            chunks = []
-            for i in range(0, total_entries, chunk_size):
-                chunk = data[i:i+chunk_size]
-                chunk_file = os.path.join(shard_folder, f'temp_chunk_{i}.json')
-                with open(chunk_file, 'w') as f:
-                    json.dump(chunk, f)
-                chunks.append(chunk_file)
-
-            # Process chunks in parallel
-            process_chunk_partial = partial(process_chunk, batch_update_time=batch_update_time)
-            with multiprocessing.Pool(max_workers) as pool:
-                results = list(tqdm(
-                    pool.imap(process_chunk_partial, chunks),
-                    total=len(chunks),
-                    desc="Processing chunks"
-                ))
-
-            # Aggregate results
-            total_processed = sum(r[0] for r in results)
-            total_errors = sum(r[1] for r in results)
-
-            end_time = time.time()
-            duration = end_time - start_time
+            entry_filter = None
+            if options['delta']:
+                from signatures.models import BurpSuiteSignature
+                known_hashes = load_content_hashes(BurpSuiteSignature)
+                entry_filter = partial(delta_entries, batch_update_time=batch_update_time, known_hashes=known_hashes, counters=delta_counters)
+
+            # Workers must not inherit the parent's database connection
+            connections.close_all()
+
+            # Batches travel to the workers over the pool's pipes; at most two batches per worker
+            # are in flight so the parent never holds more than that in memory
+            with multiprocessing.Pool(max_workers, initializer=init_worker) as pool:
+                pending = deque()
+                progress = tqdm(desc="Processing batches", unit="batch")
+
+                def collect(result):
+                    nonlocal total_processed, total_errors
+                    processed, errors = result.get()
+                    total_processed += processed
+                    total_errors += errors
+                    progress.update(1)
+
+                for batch in iter_batches(json_file_path, chunk_size, entry_filter):
+                    pending.append(pool.apply_async(process_batch, (batch, batch_update_time)))
+                    if len(pending) >= max_workers * 2:
+                        collect(pending.popleft())
+                while pending:
+                    collect(pending.popleft())
+                progress.close()
+
+            duration = time.time() - start_time
+            bump_signatures_version()  # Cached report fragments embed signature text
 
             self.stdout.write(self.style.SUCCESS(f"Processed BurpSuite signatures in {duration:.2f} seconds"))
             self.stdout.write(self.style.SUCCESS(f"Processed: {total_processed}, Errors: {total_errors}"))
+            self.stdout.write(self.style.SUCCESS(
+                f"Throughput: {total_processed / duration if duration else 0:.0f} signatures/sec with {max_workers} workers"
+            ))
+            if options['delta']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Delta: {delta_counters['new']} new, {delta_counters['changed']} changed, {delta_counters['unchanged']} unchanged (skipped)"
+                ))
 
-            # Import BurpSuiteSignature here for the final count
             from signatures.models import BurpSuiteSignature
             self.stdout.write(self.style.SUCCESS(f"Total BurpSuite signatures in database: {BurpSuiteSignature.objects.count()}"))
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"An error occurred during the upload process: {str(e)}"))
-        finally:
-            # Cleanup: remove any remaining shard files
-            for chunk_file in chunks:
-                if os.path.exists(chunk_file):
-                    os.remove(chunk_file)
-            self.stdout.write(self.style.SUCCESS("Cleaned up temporary shard files."))
\ No newline at end of file
@@ -3,13 +3,16 @@ import json
 import multiprocessing
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db import transaction
+from django.db import transaction, connection
 from datetime import datetime
 import time
 from tqdm import tqdm
 from functools import partial
 from django.conf import settings
 import ijson 
+from signatures.versions import bump_signatures_version
+from signatures.bulk import copy_upsert, load_content_hashes, needs_write, index_signature_links, load_signature_states, track_revisions
+from signatures.search import update_search_vectors
 
 def convert_date(date_string):
     if not date_string:
@@ -19,47 +22,61 @@ def convert_date(date_string):
     except ValueError:
         return None
 
+def signature_values(entry, batch_update_time):
+    risk_factor = entry.get('risk_factor')
+    if risk_factor == "None":
+        risk_factor = "Informational"
+
+    return {
+        'name': entry.get('plugin_name', '')[:1000],
+        'risk_factor': risk_factor[:20],
+        'description': entry.get('description', ''),
+        'solution': entry.get('solution', ''),
+        'synopsis': entry.get('synopsis', ''),
+        'references': entry.get('see_also', ''),
+        'plugin_modification_date': convert_date(entry.get('plugin_modification_date')),
+        'cvss_base_score': entry.get('cvss_base_score'),
+        'cvss_vector': entry.get('cvss_vector', '')[:255],
+        'cve': json.dumps(entry.get('cve', [])),
+        'exploitability_ease': entry.get('exploitability_ease', '')[:255],
+        'exploit_code_maturity': entry.get('exploit_code_maturity', '')[:50],
+        'cpe': entry.get('cpe', ''),
+        'vpr_score': entry.get('vpr_score'),
+        'epss_score': entry.get('epss_score'),
+        'family_name': entry.get('family_name', '')[:255],
+        'scanner_type': 'Nessus',
+        'scg_last_update': batch_update_time,
+        'agent': entry.get('agent', ''),
+        'cvss3_base_score': entry.get('cvss3_base_score'),
+        'cvss3_vector': entry.get('cvss3_vector', '')[:255],
+        'xref': json.dumps(entry.get('xref', [])),
+    }
+
 def process_chunk(entries, batch_update_time):
     # Import the model here to ensure it's available in this process
-    from signatures.models import NessusSignature
+    from signatures.models import NessusSignature, SignatureRevision
 
     processed_count = 0
     error_count = 0
+    written_ids = []
+    revisions = {}
 
     with transaction.atomic():
+        # Stored state of the chunk's signatures, read once to record what the update changes
+        states = load_signature_states([entry['id'] for entry in entries if 'id' in entry])
         for entry in entries:
             try:
-                risk_factor = entry.get('risk_factor')
-                if risk_factor == "None":
-                    risk_factor = "Informational"
-
-                NessusSignature.objects.update_or_create(
-                    id=entry['id'],
-                    defaults={
-                        'name': entry.get('plugin_name', '')[:1000],
-                        'risk_factor': risk_factor[:20],
-                        'description': entry.get('description', ''),
-                        'solution': entry.get('solution', ''),
-                        'synopsis': entry.get('synopsis', ''),
-                        'references': entry.get('see_also', ''),
-                        'plugin_modification_date': convert_date(entry.get('plugin_modification_date')),
-                        'cvss_base_score': entry.get('cvss_base_score'),
-                        'cvss_vector': entry.get('cvss_vector', '')[:255],
-                        'cve': json.dumps(entry.get('cve', [])),
-                        'exploitability_ease': entry.get('exploitability_ease', '')[:255],
-                        'exploit_code_maturity': entry.get('exploit_code_maturity', '')[:50],
-                        'cpe': entry.get('cpe', ''),
-                        'vpr_score': entry.get('vpr_score'),
-                        'epss_score': entry.get('epss_score'),
-                        'family_name': entry.get('family_name', '')[:255],
-                        'scanner_type': 'Nessus',
-                        'scg_last_update': batch_update_time,
-                        'agent': entry.get('agent', ''),
-                        'cvss3_base_score': entry.get('cvss3_base_score'),
-                        'cvss3_vector': entry.get('cvss3_vector', '')[:255],
-                        'xref': json.dumps(entry.get('xref', [])),
-                    }
+                values = signature_values(entry, batch_update_time)
+                # update_or_create() only saves the fields in defaults, so the hash save() computes has to be one of them
+                values['content_hash'] = NessusSignature.hash_values(values)
+                signature, _ = NessusSignature.objects.update_or_create(id=entry['id'], defaults=values)
+                signature_id = int(signature.pk)
+                revision = SignatureRevision.between(
+                    signature_id, states.get(signature_id),
+                    {field: getattr(signature, field) for field in SignatureRevision.STATE_FIELDS}, batch_update_time
                 )
+                revisions[signature_id] = revision  # The last write of a repeated id wins
+                written_ids.append(signature.pk)
                 processed_count += 1
                 if processed_count % 100 == 0:
                     print(f"Processed {processed_count} signatures")
@@ -67,19 +84,65 @@ def process_chunk(entries, batch_update_time):
                 error_count += 1
                 print(f"Error processing signature with ID: {entry.get('id', 'Unknown')}: {str(e)}")
 
+        # Revisions, CVE and reference links and the full-text index of the whole chunk in bulk
+        SignatureRevision.objects.bulk_create([revision for revision in revisions.values() if revision is not None])
+        index_signature_links(written_ids)
+        update_search_vectors(NessusSignature, written_ids)
+
     return processed_count, error_count
 
+def delta_entries(entries, batch_update_time, known_hashes, counters):
+    """Drop feed entries whose content hash matches the stored signature (--delta with --mode=orm)"""
+    from signatures.models import NessusSignature
+
+    for entry in entries:
+        try:
+            digest = NessusSignature.hash_values(signature_values(entry, batch_update_time))
+            if not needs_write(known_hashes, int(entry['id']), digest, counters):
+                continue
+        except Exception:
+            pass  # Let process_chunk report the broken entry
+        yield entry
+
+def copy_rows(entries, batch_update_time, counters, known_hashes=None, written_ids=None):
+    """Map feed entries to staging rows for --mode=copy, counting the entries that cannot be mapped"""
+    from signatures.models import NessusSignature
+
+    for entry in entries:
+        try:
+            row = signature_values(entry, batch_update_time)
+            row['id'] = int(entry['id'])
+            row['content_hash'] = NessusSignature.hash_values(row)
+        except Exception as e:
+            counters['errors'] += 1
+            print(f"Error processing signature with ID: {entry.get('id', 'Unknown')}: {str(e)}")
+            continue
+        if known_hashes is not None and not needs_write(known_hashes, row['id'], row['content_hash'], counters):
+            continue
+        counters['processed'] += 1
+        if written_ids is not None:
+            written_ids.append(row['id'])
+        yield row
+
 class Command(BaseCommand):
     help = 'Upload Nessus signatures from a JSON file using streaming'
 
     def add_arguments(self, parser):
         parser.add_argument('json_file', type=str, help='Path to the JSON file')
         parser.add_argument('--batch_size', type=int, default=100, help='Number of signatures per batch')
+        parser.add_argument('--mode', choices=['orm', 'copy'], default='orm',
+                            help='orm: update_or_create per signature; copy: stage with COPY (executemany outside PostgreSQL) and upsert in one statement')
+        parser.add_argument('--delta', action='store_true', help='Only write signatures that are new or whose content hash changed')
 
     def handle(self, *args, **options):
         json_file_path = options['json_file']
         batch_size = options['batch_size']
 
+        delta = options['delta']
+
+        if options['mode'] == 'copy':
+            return self.handle_copy(json_file_path, batch_size, delta)
+
         self.stdout.write(self.style.SUCCESS(f"Starting streaming Nessus signature upload from {json_file_path}"))
 
         start_time = time.time()
@@ -88,6 +151,7 @@ class Command(BaseCommand):
         total_processed = 0
         total_errors = 0
         current_batch = []
+        delta_counters = {'new': 0, 'changed': 0, 'unchanged': 0}
 
         try:
             # Count total items first
@@ -97,9 +161,12 @@ class Command(BaseCommand):
 
             # Process the file in streaming mode
             with open(json_file_path, 'rb') as file:
-                parser = ijson.items(file, 'item')
-                
-                for entry in tqdm(parser, total=total_items, desc="Processing signatures"):
+                parser = tqdm(ijson.items(file, 'item'), total=total_items, desc="Processing signatures")
+                if delta:
+                    from signatures.models import NessusSignature
+                    parser = delta_entries(parser, batch_update_time, load_content_hashes(NessusSignature), delta_counters)
+
+                for entry in parser:
                     current_batch.append(entry)
                     
                     if len(current_batch) >= batch_size:
@@ -121,9 +188,13 @@ class Command(BaseCommand):
 
             end_time = time.time()
             duration = end_time - start_time
+            bump_signatures_version()  # Cached report fragments embed signature text
 
             self.stdout.write(self.style.SUCCESS(f"Processed Nessus signatures in {duration:.2f} seconds"))
             self.stdout.write(self.style.SUCCESS(f"Processed: {total_processed}, Errors: {total_errors}"))
+            self.stdout.write(self.style.SUCCESS(f"Throughput: {total_processed / duration if duration else 0:.0f} signatures/sec"))
+            if delta:
+                self.write_delta_summary(delta_counters)
 
             # Show final count
             from signatures.models import NessusSignature
@@ -132,4 +203,53 @@ class Command(BaseCommand):
             ))
 
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An error occurred during the upload process: {str(e)}"))
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f"An error occurred during the upload process: {str(e)}"))
+
+    def write_delta_summary(self, counters):
+        self.stdout.write(self.style.SUCCESS(
+            f"Delta: {counters['new']} new, {counters['changed']} changed, {counters['unchanged']} unchanged (skipped)"
+        ))
+
+    def handle_copy(self, json_file_path, batch_size, delta):
+        from signatures.models import NessusSignature, SignatureRevision
+
+        self.stdout.write(self.style.SUCCESS(f"Starting COPY-mode Nessus signature upload from {json_file_path} ({connection.vendor})"))
+
+        start_time = time.time()
+        batch_update_time = timezone.now()
+        counters = {'processed': 0, 'errors': 0, 'new': 0, 'changed': 0, 'unchanged': 0}
+        known_hashes = load_content_hashes(NessusSignature) if delta else None
+
+        try:
+            with open(json_file_path, 'rb') as file:
+                entries = tqdm(ijson.items(file, 'item', use_float=True), desc="Staging signatures")
+                written_ids = []
+                revisions = []
+                rows = track_revisions(copy_rows(entries, batch_update_time, counters, known_hashes, written_ids), revisions, batch_update_time)
+                with transaction.atomic():
+                    copy_upsert(NessusSignature, rows, chunk_size=max(batch_size, 1000))
+                    SignatureRevision.objects.bulk_create(revisions, batch_size=1000)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Recorded {len(revisions)} signature revisions, {sum(revision.severity_changed for revision in revisions)} with a severity change"
+                ))
+
+            self.stdout.write(self.style.SUCCESS("Indexing CVE and reference links..."))
+            index_signature_links(written_ids, chunk_size=max(batch_size, 1000))
+
+            self.stdout.write(self.style.SUCCESS("Refreshing the full-text search index..."))
+            update_search_vectors(NessusSignature, written_ids)
+
+            duration = time.time() - start_time
+            bump_signatures_version()  # Cached report fragments embed signature text
+
+            self.stdout.write(self.style.SUCCESS(f"Processed Nessus signatures in {duration:.2f} seconds"))
+            self.stdout.write(self.style.SUCCESS(f"Processed: {counters['processed']}, Errors: {counters['errors']}"))
+            self.stdout.write(self.style.SUCCESS(f"Throughput: {counters['processed'] / duration if duration else 0:.0f} signatures/sec"))
+            if delta:
+                self.write_delta_summary(counters)
+            self.stdout.write(self.style.SUCCESS(
+                f"Total Nessus signatures in database: {NessusSignature.objects.count()}"
+            ))
+
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"An error occurred during the upload process: {str(e)}"))
@@ -1,3 +1,8 @@
+import hashlib
+import json
+from decimal import Decimal
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 
@@ -8,6 +13,13 @@ class BaseSignature(models.Model):
     scanner_type = models.CharField(max_length=50)
     scg_last_update = models.DateTimeField(default=timezone.now)
     references = models.TextField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Bookkeeping columns that do not change what a signature says
+    HASH_EXCLUDED_FIELDS = ('id', 'scg_last_update', 'content_hash', 'search_vector')
+    # (field, tsvector weight) pairs of the full-text search, see signatures/search.py
+    SEARCH_FIELDS = (('name', 'A'), ('description', 'B'))
 
     class Meta:
         abstract = True
@@ -16,6 +28,27 @@ class BaseSignature(models.Model):
     def __str__(self):
         return f"{self.id} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        self.content_hash = self.hash_values({field: getattr(self, field) for field in self.content_hash_fields()})
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def content_hash_fields(cls):
+        return [field.attname for field in cls._meta.concrete_fields if field.attname not in cls.HASH_EXCLUDED_FIELDS]
+
+    @classmethod
+    def hash_values(cls, values):
+        """Stable digest of a signature's content, lets the upload commands skip unchanged rows"""
+        normalized = []
+        for field in cls.content_hash_fields():
+            value = values.get(field)
+            if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                value = repr(float(value))
+            elif value is not None:
+                value = str(value)
+            normalized.append(value)
+        return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
 class NessusSignature(BaseSignature):
     RISK_FACTOR_CHOICES = [
         ('Critical', 'Critical'),
@@ -28,7 +61,7 @@ class NessusSignature(BaseSignature):
     exploitability_ease = models.CharField(max_length=255, null=True, blank=True)
     cpe = models.TextField(null=True, blank=True)
     solution = models.TextField(null=True, blank=True)
-    risk_factor = models.CharField(max_length=20, choices=RISK_FACTOR_CHOICES)
+    risk_factor = models.CharField(max_length=20, choices=RISK_FACTOR_CHOICES, db_index=True)  # Report groups and bulk updates filter by it
     cvss_vector = models.CharField(max_length=255, null=True, blank=True)
     synopsis = models.TextField(null=True, blank=True)
     plugin_modification_date = models.DateField(null=True, blank=True)
@@ -43,15 +76,139 @@ class NessusSignature(BaseSignature):
     cvss3_vector = models.CharField(max_length=255, null=True, blank=True)
     xref = models.TextField(null=True, blank=True)
 
+    SEARCH_FIELDS = (('name', 'A'), ('synopsis', 'B'), ('description', 'C'))
+
+    class Meta(BaseSignature.Meta):
+        indexes = [GinIndex(fields=['search_vector'], name='nessus_sig_search_idx')]
+
     def save(self, *args, **kwargs):
         self.scanner_type = 'Nessus'
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def parse_links(cve, xref, references):
+        """Split the stored cve/xref JSON and whitespace separated references into (cve_ids, [(kind, value)])"""
+        def json_list(text):
+            try:
+                values = json.loads(text) if text else []
+            except json.JSONDecodeError:
+                return []
+            return values if isinstance(values, list) else []
+
+        cve_ids = []
+        for item in json_list(cve):
+            cve_id = str(item).strip().replace('"', '').replace(' ', '').upper()
+            if cve_id and cve_id not in cve_ids:
+                cve_ids.append(cve_id)
+        links = [('see_also', value) for value in (references or '').split()]
+        links += [('xref', str(value).strip()) for value in json_list(xref) if str(value).strip()]
+        return cve_ids, links
+
+class SignaturesVersion(models.Model):
+    """
+    Single row holding the global signatures version (see signatures/versions.py). The cache only keeps a copy:
+    culling can drop the key, but the version is reloaded from here and never restarts.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"Signatures version {self.version}"
+
+class SignatureCVE(models.Model):
+    """CVE IDs of a Nessus signature, normalized out of NessusSignature.cve for indexed lookups"""
+    signature = models.ForeignKey(NessusSignature, on_delete=models.CASCADE, related_name='cves')
+    cve_id = models.CharField(max_length=32, db_index=True)
+
+    class Meta:
+        ordering = ['cve_id']
+        constraints = [
+            models.UniqueConstraint(fields=['signature', 'cve_id'], name='unique_signature_cve'),
+        ]
+
+    def __str__(self):
+        return f"{self.signature_id} - {self.cve_id}"
+
+class SignatureReference(models.Model):
+    """See-also URLs and cross references of a Nessus signature, normalized out of references/xref"""
+    KIND_CHOICES = [
+        ('see_also', 'See Also'),
+        ('xref', 'Cross Reference'),
+    ]
+    signature = models.ForeignKey(NessusSignature, on_delete=models.CASCADE, related_name='reference_links')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    value = models.TextField()
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.signature_id} - {self.value}"
+
+class SignatureRevision(models.Model):
+    """
+    Append-only history of Nessus signature content changes, one row per changed signature and feed import,
+    with the severity fields before and after. Written in bulk by upload_nessus_signatures.
+    """
+    SEVERITY_FIELDS = ('risk_factor', 'cvss_base_score', 'cvss3_base_score')
+    # Stored signature values a revision is computed from, see signatures.bulk.load_signature_states()
+    STATE_FIELDS = ('content_hash',) + SEVERITY_FIELDS
+
+    signature = models.ForeignKey(NessusSignature, on_delete=models.CASCADE, related_name='revisions')
+    changed_at = models.DateTimeField(default=timezone.now)
+    previous_risk_factor = models.CharField(max_length=20, null=True, blank=True)
+    risk_factor = models.CharField(max_length=20, null=True, blank=True)
+    previous_cvss_base_score = models.FloatField(null=True, blank=True)
+    cvss_base_score = models.FloatField(null=True, blank=True)
+    previous_cvss3_base_score = models.FloatField(null=True, blank=True)
+    cvss3_base_score = models.FloatField(null=True, blank=True)
+    severity_changed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-changed_at', '-id']
+        indexes = [
+            # Signatures whose severity changed since a date, joined to vulnerabilities on (report, signature)
+            models.Index(fields=['severity_changed', 'changed_at', 'signature'], name='sig_revision_changed_idx'),
+            # Revisions of one signature, read per finding for the before/after values
+            models.Index(fields=['signature', 'severity_changed', 'changed_at'], name='sig_revision_severity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.signature_id} - {self.previous_risk_factor} -> {self.risk_factor} ({self.changed_at})"
+
+    @classmethod
+    def between(cls, signature_id, previous, current, changed_at):
+        """
+        Revision of one signature from its stored state (a STATE_FIELDS tuple) to the values being written (a dict
+        keyed by field), or None when the signature is new or its content hash did not change
+        """
+        if previous is None or previous[0] == current['content_hash']:
+            return None
+        values = {}
+        for field, previous_value in zip(cls.SEVERITY_FIELDS, previous[1:]):
+            values[f'previous_{field}'] = cls.severity_value(previous_value)
+            values[field] = cls.severity_value(current[field])
+        return cls(
+            signature_id=signature_id,
+            changed_at=changed_at,
+            severity_changed=any(values[f'previous_{field}'] != values[field] for field in cls.SEVERITY_FIELDS),
+            **values
+        )
+
+    @staticmethod
+    def severity_value(value):
+        # Feed scores arrive as Decimal or float, stored ones as float
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return float(value)
+        return value
+
 class BurpSuiteSignature(BaseSignature):
     remediation = models.TextField(null=True, blank=True)
     vulnerability_classifications = models.TextField(null=True, blank=True)
     retired = models.BooleanField(default=False)
 
+    class Meta(BaseSignature.Meta):
+        indexes = [GinIndex(fields=['search_vector'], name='burpsuite_sig_search_idx')]
+
     def save(self, *args, **kwargs):
         self.scanner_type = 'BurpSuite'
         super().save(*args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import hashlib
+import json
+from django.core.cache import cache
+from django.db import models
+from .versions import signatures_version
+
+SIGNATURE_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+class KeysetPage:
+    """One page of a keyset-paginated list, with the cursors of the pages around it (None at either end)"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, count):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def ordering_keys(queryset):
+    """[(field, descending)] of the queryset's ordering, with the primary key as the final tie-breaker"""
+    ordering = [field for field in queryset.query.order_by if isinstance(field, str)] or ['id']
+    if 'id' not in ordering and '-id' not in ordering:
+        ordering.append('id')
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def encode_cursor(obj, keys):
+    return ':'.join(repr(getattr(obj, field)) for field, descending in keys)
+
+
+def decode_cursor(cursor, keys):
+    """Values of an encoded cursor, None when it is malformed or belongs to another ordering"""
+    try:
+        values = [int(part) if part.lstrip('-').isdigit() else float(part) for part in cursor.split(':')]
+    except ValueError:
+        return None
+    return values if len(values) == len(keys) else None
+
+
+def beyond_cursor(keys, values, backwards):
+    """Rows strictly after (or before) the cursor in the given ordering, a row-value comparison spelled with Q()"""
+    condition = models.Q()
+    for index, (field, descending) in enumerate(keys):
+        lookup = 'lt' if descending != backwards else 'gt'
+        equal = {key: value for (key, key_descending), value in zip(keys[:index], values[:index])}
+        condition |= models.Q(**equal, **{f'{field}__{lookup}': values[index]})
+    return condition
+
+
+def keyset_page(queryset, after=None, before=None, limit=50, count=None):
+    """
+    Page of `queryset` following the `after` cursor or preceding the `before` cursor, in the queryset's own
+    ordering. Every page is one `WHERE (ordering) > cursor ... LIMIT` range read, so it costs the same at any depth.
+    """
+    keys = ordering_keys(queryset)
+    backwards = before is not None
+    values = decode_cursor(before if backwards else after, keys) if (after or before) else None
+    if values is None:
+        backwards = False
+    else:
+        queryset = queryset.filter(beyond_cursor(keys, values, backwards))
+
+    ordering = [f"{'-' if descending != backwards else ''}{field}" for field, descending in keys]
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows, None, None, count)
+
+    has_next = more if not backwards else True
+    has_previous = more if backwards else values is not None
+    return KeysetPage(
+        rows,
+        encode_cursor(rows[-1], keys) if has_next else None,
+        encode_cursor(rows[0], keys) if has_previous else None,
+        count,
+    )
+
+
+def signature_count(queryset, filters):
+    """
+    Cached count of a filtered signature list. The key holds the global signatures version, so uploads and edits
+    invalidate every count at once; `filters` is whatever identifies the filtering (e.g. the query parameters).
+    """
+    digest = hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = ':'.join(str(part) for part in ('signature-count', queryset.model._meta.label_lower, signatures_version(), digest))
+    return cache.get_or_set(key, queryset.count, SIGNATURE_COUNT_TIMEOUT)
@@ -0,0 +1,117 @@
+import re
+from functools import reduce
+from itertools import islice
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, models, transaction
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'english'
+SEARCH_CHUNK_SIZE = 5000
+# Matches ranked by the SQLite fallback, the list views paginate within them
+SQLITE_RESULT_LIMIT = 1000
+# PostgreSQL's default ts_rank weights, reused for the bm25 column weights of the SQLite fallback
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+
+def search_terms(query):
+    """Word tokens of a user query; punctuation never reaches the tsquery/FTS5 parsers"""
+    return re.findall(r'\w+', query.lower())
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def ensure_fts_table(model):
+    """Create the FTS5 table of the SQLite fallback on first use and fill it from the signatures already stored"""
+    table = fts_table(model)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [table])
+        if cursor.fetchone():
+            return
+        columns = ', '.join(field for field, weight in model.SEARCH_FIELDS)
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({columns}, tokenize = 'porter unicode61')")
+        fill_fts_table(cursor, model)
+
+
+def fill_fts_table(cursor, model, ids=None):
+    table = fts_table(model)
+    columns = ', '.join(field for field, weight in model.SEARCH_FIELDS)
+    values = ', '.join(f"coalesce({field}, '')" for field, weight in model.SEARCH_FIELDS)
+    source = f"SELECT id, {values} FROM {model._meta.db_table}"
+    if ids is None:
+        cursor.execute(f"INSERT INTO {table} (rowid, {columns}) {source}")
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", ids)
+    cursor.execute(f"INSERT INTO {table} (rowid, {columns}) {source} WHERE id IN ({placeholders})", ids)
+
+
+def search_vector(model):
+    """Weighted tsvector expression over the model's SEARCH_FIELDS"""
+    return reduce(lambda left, right: left + right, (
+        SearchVector(field, weight=weight, config=SEARCH_CONFIG) for field, weight in model.SEARCH_FIELDS
+    ))
+
+
+def update_search_vectors(model, ids, chunk_size=SEARCH_CHUNK_SIZE):
+    """
+    Refresh the full-text index of the given signatures after they were written: one set-based UPDATE of the
+    search_vector column per chunk on PostgreSQL, a delete + INSERT ... SELECT into the FTS5 table on SQLite.
+    Returns the number of signatures refreshed.
+    """
+    refreshed = 0
+    ids = iter(ids)
+    if connection.vendor == 'sqlite':
+        ensure_fts_table(model)
+    while True:
+        chunk = list(islice(ids, chunk_size))
+        if not chunk:
+            return refreshed
+        if connection.vendor == 'postgresql':
+            model.objects.filter(id__in=chunk).update(search_vector=search_vector(model))
+        elif connection.vendor == 'sqlite':
+            with transaction.atomic(), connection.cursor() as cursor:
+                fill_fts_table(cursor, model, chunk)
+        refreshed += len(chunk)
+
+
+def search_signatures(queryset, query):
+    """
+    Filter a signature queryset to the matches of a free-text query, best match first. Every term must match,
+    the last one also as a prefix so results keep up while the user types. PostgreSQL searches the GIN-indexed
+    search_vector column ranked by ts_rank; SQLite uses an FTS5 table ranked by bm25 (the best
+    SQLITE_RESULT_LIMIT matches); other backends fall back to a substring match.
+    """
+    model = queryset.model
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        search_query = SearchQuery(tsquery, search_type='raw', config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=search_query)
+            # ts_rank is a float4; as double precision the rank round-trips exactly through the keyset cursors
+            .annotate(search_rank=Cast(SearchRank(models.F('search_vector'), search_query), models.FloatField()))
+            .order_by('-search_rank', 'id')
+        )
+
+    if connection.vendor == 'sqlite':
+        ensure_fts_table(model)
+        table = fts_table(model)
+        match = ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        weights = ', '.join(str(WEIGHTS[weight]) for field, weight in model.SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}, {weights}) LIMIT %s",
+                [match, SQLITE_RESULT_LIMIT]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return queryset.none()
+        rank = models.Case(*(models.When(id=signature_id, then=models.Value(index)) for index, signature_id in enumerate(ids)))
+        return queryset.filter(id__in=ids).annotate(search_rank=rank).order_by('search_rank')
+
+    return queryset.filter(models.Q(name__icontains=query) | models.Q(description__icontains=query))
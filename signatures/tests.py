@@ -1,3 +1,339 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from .bulk import copy_upsert
+from .cache import SignatureCache, signature_cache
+from .models import NessusSignature, BurpSuiteSignature, SignatureCVE, SignatureRevision
+from .versions import SIGNATURES_VERSION_KEY, bump_signatures_version, signatures_version
+from .pagination import keyset_page
+from .search import search_signatures, search_vector, update_search_vectors
 
-# Create your tests here.
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated scores, so most page boundaries fall inside a run of equal sort values
+        NessusSignature.objects.bulk_create([
+            NessusSignature(
+                id=signature_id, name=f'Plugin {signature_id}', risk_factor='High', scanner_type='Nessus',
+                cvss_base_score=[9.8, 7.5, 0.1][signature_id % 3]
+            )
+            for signature_id in range(1, 24)
+        ])
+
+    def walk(self, queryset, limit):
+        """Ids of every page followed forwards, then of every page followed back from the last one"""
+        forwards, pages = [], []
+        page = keyset_page(queryset, limit=limit)
+        while True:
+            pages.append(page)
+            forwards += [signature.pk for signature in page]
+            if not page.has_next():
+                break
+            page = keyset_page(queryset, after=page.next_cursor, limit=limit)
+
+        backwards = [signature.pk for signature in page]
+        while page.has_previous():
+            page = keyset_page(queryset, before=page.previous_cursor, limit=limit)
+            backwards = [signature.pk for signature in page] + backwards
+        return forwards, backwards, pages
+
+    def test_pages_cover_float_ties_exactly_once(self):
+        queryset = NessusSignature.objects.order_by('-cvss_base_score')
+        expected = list(queryset.order_by('-cvss_base_score', 'id').values_list('id', flat=True))
+
+        forwards, backwards, pages = self.walk(queryset, limit=5)
+
+        self.assertEqual(forwards, expected)
+        self.assertEqual(backwards, expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertFalse(pages[0].has_previous())
+
+    def test_malformed_cursor_restarts_from_the_first_page(self):
+        queryset = NessusSignature.objects.order_by('-cvss_base_score')
+        page = keyset_page(queryset, after='not-a-cursor', limit=5)
+        self.assertEqual([signature.pk for signature in page], [signature.pk for signature in keyset_page(queryset, limit=5)])
+
+    def test_search_results_page_by_rank(self):
+        NessusSignature.objects.filter(id__in=[4, 5, 6]).update(name='Apache HTTP Server outdated')
+        update_search_vectors(NessusSignature, [4, 5, 6])
+        queryset = search_signatures(NessusSignature.objects.all(), 'apache serv')
+
+        forwards, backwards, pages = self.walk(queryset, limit=2)
+
+        self.assertEqual(sorted(forwards), [4, 5, 6])
+        self.assertEqual(backwards, forwards)
+
+
+class NessusSignatureUploadTests(TestCase):
+    entries = [
+        {'id': 10, 'plugin_name': 'OpenSSH outdated', 'risk_factor': 'High', 'cvss_base_score': 7.5},
+        {'id': 11, 'plugin_name': 'TLS 1.0 enabled', 'risk_factor': 'Medium', 'cvss_base_score': 5.0},
+    ]
+
+    def upload(self, entries, *options, mode='orm'):
+        # One entry per line, the command counts the lines for its progress
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as feed:
+            feed.write('[\n' + ',\n'.join(json.dumps(entry) for entry in entries) + '\n]\n')
+        self.addCleanup(os.remove, feed.name)
+        out = io.StringIO()
+        call_command('upload_nessus_signatures', feed.name, f'--mode={mode}', *options, stdout=out)
+        self.assertNotIn('An error occurred', out.getvalue())
+        return out.getvalue()
+
+    def test_orm_upload_stores_content_hashes(self):
+        self.upload(self.entries)
+
+        for signature in NessusSignature.objects.filter(id__in=[10, 11]):
+            self.assertTrue(signature.content_hash)
+            signature.save()  # save() recomputes the hash from the stored values
+            self.assertEqual(NessusSignature.objects.get(pk=signature.pk).content_hash, signature.content_hash)
+
+    def test_delta_upload_skips_unchanged_signatures(self):
+        self.upload(self.entries)
+        changed = [self.entries[0], {**self.entries[1], 'risk_factor': 'High'}]
+
+        output = self.upload(changed, '--delta')
+
+        self.assertIn('Delta: 0 new, 1 changed, 1 unchanged (skipped)', output)
+        self.assertEqual(NessusSignature.objects.get(pk=11).risk_factor, 'High')
+
+    def test_revisions_record_changed_signatures_only(self):
+        self.upload(self.entries)
+        self.assertFalse(SignatureRevision.objects.exists())
+
+        self.upload([
+            {**self.entries[0], 'plugin_name': 'OpenSSH < 9.8 outdated'},
+            {**self.entries[1], 'risk_factor': 'High', 'cvss_base_score': 7.4},
+        ])
+
+        revisions = {revision.signature_id: revision for revision in SignatureRevision.objects.all()}
+        self.assertEqual(set(revisions), {10, 11})
+        self.assertFalse(revisions[10].severity_changed)
+        self.assertTrue(revisions[11].severity_changed)
+        self.assertEqual(
+            (revisions[11].previous_risk_factor, revisions[11].risk_factor, revisions[11].previous_cvss_base_score, revisions[11].cvss_base_score),
+            ('Medium', 'High', 5.0, 7.4)
+        )
+
+    def test_signatures_stored_without_a_hash_are_compared_by_content(self):
+        self.upload(self.entries)
+        NessusSignature.objects.update(content_hash=None)  # As stored before content hashes existed
+
+        self.upload([self.entries[0], {**self.entries[1], 'risk_factor': 'High'}])
+
+        self.assertEqual(list(SignatureRevision.objects.values_list('signature_id', 'severity_changed')), [(11, True)])
+        self.assertFalse(NessusSignature.objects.filter(content_hash__isnull=True).exists())
+
+
+    def test_copy_upload_upserts_with_the_last_duplicate_winning(self):
+        self.upload(self.entries)
+        orm_hashes = dict(NessusSignature.objects.values_list('id', 'content_hash'))
+
+        output = self.upload([
+            {**self.entries[0], 'plugin_name': 'OpenSSH < 9.6 outdated'},
+            {**self.entries[1], 'risk_factor': 'High', 'cvss_base_score': 7.4},
+            {**self.entries[0], 'plugin_name': 'OpenSSH < 9.8 outdated'},
+            {'id': 12, 'plugin_name': 'SMB signing disabled', 'risk_factor': 'Medium', 'cvss_base_score': 5.3},
+        ], mode='copy')
+
+        self.assertIn('Processed: 4, Errors: 0', output)
+        self.assertEqual(list(NessusSignature.objects.order_by('id').values_list('id', 'name', 'risk_factor')), [
+            (10, 'OpenSSH < 9.8 outdated', 'High'), (11, 'TLS 1.0 enabled', 'High'), (12, 'SMB signing disabled', 'Medium'),
+        ])
+        self.assertNotEqual(NessusSignature.objects.get(pk=10).content_hash, orm_hashes[10])
+        signature = NessusSignature.objects.get(pk=12)
+        stored_hash = signature.content_hash
+        signature.save()  # The staged hash matches the one save() computes
+        self.assertEqual(NessusSignature.objects.get(pk=12).content_hash, stored_hash)
+        self.assertTrue(SignatureRevision.objects.filter(signature_id=11, severity_changed=True).exists())
+
+    def test_copy_upload_with_delta_skips_unchanged_signatures(self):
+        self.upload(self.entries, mode='copy')
+        output = self.upload([self.entries[0], {**self.entries[1], 'risk_factor': 'High'}], '--delta', mode='copy')
+
+        self.assertIn('Delta: 0 new, 1 changed, 1 unchanged (skipped)', output)
+        self.assertEqual(NessusSignature.objects.get(pk=11).risk_factor, 'High')
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY FROM STDIN staging is PostgreSQL only')
+    def test_copy_upsert_stages_with_copy_on_postgresql(self):
+        NessusSignature.objects.create(id=10, name='OpenSSH outdated', risk_factor='High', scanner_type='Nessus')
+        description = 'Tab\there, back\\slash,\nnew line and \\N'
+
+        with mock.patch('signatures.bulk.load_staging_executemany') as executemany:
+            staged = copy_upsert(NessusSignature, iter([
+                {'id': 10, 'name': 'First', 'risk_factor': 'Low', 'scanner_type': 'Nessus'},
+                {'id': 11, 'name': 'New', 'risk_factor': 'Medium', 'scanner_type': 'Nessus', 'description': description},
+                {'id': 10, 'name': 'Last', 'risk_factor': 'Critical', 'scanner_type': 'Nessus'},
+            ]), chunk_size=2)
+
+        executemany.assert_not_called()
+        self.assertEqual(staged, 3)
+        self.assertEqual(NessusSignature.objects.get(pk=10).name, 'Last')
+        self.assertEqual(NessusSignature.objects.get(pk=11).description, description)
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SignatureEditTests(TestCase):
+    def test_links_are_indexed_before_the_version_bump(self):
+        NessusSignature.objects.create(id=20, name='OpenSSH outdated', risk_factor='High', scanner_type='Nessus', cve='["CVE-2024-6387"]')
+        self.client.force_login(get_user_model().objects.create_superuser('admin@example.com', 'password'))
+        indexed_at_bump = []
+
+        def bump():
+            indexed_at_bump.append(list(SignatureCVE.objects.filter(signature_id=20).values_list('cve_id', flat=True)))
+
+        with mock.patch('signatures.views.base.bump_signatures_version', side_effect=bump):
+            response = self.client.post(reverse('signatures:signature_update', kwargs={'scanner_type': 'nessus', 'pk': 20}), {
+                'id': 20, 'name': 'OpenSSH regreSSHion', 'description': '', 'risk_factor': 'Critical', 'solution': '',
+            })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(indexed_at_bump, [['CVE-2024-6387']])
+
+
+class SignaturesVersionTests(TestCase):
+    def test_version_survives_the_cache_key_being_culled(self):
+        bump_signatures_version()
+        bump_signatures_version()
+        version = signatures_version()
+
+        cache.delete(SIGNATURES_VERSION_KEY)
+
+        self.assertEqual(signatures_version(), version)
+        bump_signatures_version()
+        self.assertEqual(signatures_version(), version + 1)
+
+
+class SignatureLinkIndexTests(TestCase):
+    def test_index_missing_links(self):
+        NessusSignature.objects.bulk_create([
+            NessusSignature(id=30, name='Indexed', risk_factor='High', scanner_type='Nessus', cve='["CVE-2023-0001"]'),
+            NessusSignature(id=31, name='Stored before the link tables', risk_factor='High', scanner_type='Nessus',
+                            cve='["CVE-2023-0002"]', references='https://example.com/advisory'),
+            NessusSignature(id=32, name='No links', risk_factor='Low', scanner_type='Nessus', cve='[]', xref='[]', references=''),
+        ])
+        SignatureCVE.objects.create(signature_id=30, cve_id='CVE-2023-0001')
+
+        out = io.StringIO()
+        call_command('index_signature_links', '--missing', stdout=out)
+
+        self.assertIn('of 1 Nessus signatures', out.getvalue())
+        self.assertEqual(list(SignatureCVE.objects.order_by('cve_id').values_list('signature_id', 'cve_id')), [
+            (30, 'CVE-2023-0001'), (31, 'CVE-2023-0002'),
+        ])
+        self.assertTrue(NessusSignature.objects.get(pk=31).reference_links.exists())
+
+
+class SignatureSearchIndexTests(TestCase):
+    def create_signatures(self):
+        NessusSignature.objects.bulk_create([
+            NessusSignature(id=40, name='Apache Tomcat outdated', risk_factor='High', scanner_type='Nessus'),
+            NessusSignature(id=41, name='Apache Struts RCE', risk_factor='Critical', scanner_type='Nessus'),
+            NessusSignature(id=42, name='OpenSSL outdated', risk_factor='Medium', scanner_type='Nessus'),
+        ])
+
+    def search(self, query):
+        return sorted(search_signatures(NessusSignature.objects.all(), query).values_list('id', flat=True))
+
+    def test_rebuild_indexes_signatures_written_without_it(self):
+        self.search('apache')  # Creates the SQLite FTS5 table before the rows exist
+        self.create_signatures()
+
+        call_command('rebuild_signature_search', stdout=io.StringIO())
+
+        self.assertEqual(self.search('apache'), [40, 41])
+        self.assertEqual(self.search('outdat'), [40, 42])
+
+    @skipUnless(connection.vendor == 'postgresql', 'search_vector is only used on PostgreSQL')
+    def test_missing_search_vectors_are_backfilled_on_postgresql(self):
+        self.create_signatures()
+        NessusSignature.objects.filter(id=42).update(search_vector=search_vector(NessusSignature))
+        self.assertEqual(self.search('outdated'), [42])
+
+        out = io.StringIO()
+        call_command('rebuild_signature_search', '--missing', stdout=out)
+
+        self.assertIn('Refreshed the search index of 2 NessusSignature rows', out.getvalue())
+        self.assertEqual(self.search('outdated'), [40, 42])
+        ranked = search_signatures(NessusSignature.objects.all(), 'apache')
+        self.assertIsInstance(ranked.first().search_rank, float)
+        # Every rank round-trips through the keyset cursor, so walking the pages returns each match once
+        forwards, cursor = [], None
+        while True:
+            page = keyset_page(ranked, after=cursor, limit=1)
+            forwards += [signature.pk for signature in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sorted(forwards), [40, 41])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SignatureCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        NessusSignature.objects.bulk_create([
+            NessusSignature(id=signature_id, name=f'Plugin {signature_id}', risk_factor='High', scanner_type='Nessus',
+                            description='Description', cpe='cpe:/a:vendor:product' * 100)
+            for signature_id in (50, 51, 52)
+        ])
+        SignatureCVE.objects.create(signature_id=50, cve_id='CVE-2024-0050')
+
+    def test_least_recently_used_signature_is_evicted(self):
+        lru = SignatureCache(maxsize=2)
+        lru.get_many(NessusSignature, [50, 51])
+        lru.get_many(NessusSignature, [50])  # 51 is now the least recently used
+        lru.get_many(NessusSignature, [52])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(set(lru.get_many(NessusSignature, [50, 52])), {50, 52})
+        stats = lru.stats()
+        self.assertEqual((stats['size'], stats['evictions'], stats['hits'], stats['misses']), (2, 1, 3, 3))
+
+    def test_cached_signatures_are_slim_with_links_prefetched(self):
+        signature = SignatureCache(maxsize=10).get_many(NessusSignature, [50])[50]
+
+        with self.assertNumQueries(0):
+            self.assertEqual((signature.name, signature.description), ('Plugin 50', 'Description'))
+            self.assertEqual([link.cve_id for link in signature.cves.all()], ['CVE-2024-0050'])
+        self.assertIn('cpe', signature.get_deferred_fields())
+
+    def test_version_bump_invalidates_the_cached_signatures(self):
+        lru = SignatureCache(maxsize=10)
+        lru.get_many(NessusSignature, [50])
+        NessusSignature.objects.filter(pk=50).update(name='Plugin 50 renamed')
+        self.assertEqual(lru.get_many(NessusSignature, [50])[50].name, 'Plugin 50')
+
+        bump_signatures_version()
+
+        self.assertEqual(lru.get_many(NessusSignature, [50])[50].name, 'Plugin 50 renamed')
+        self.assertEqual(lru.stats()['version'], signatures_version())
+
+    def test_signatures_of_each_scanner_are_cached_apart(self):
+        BurpSuiteSignature.objects.create(id=50, name='Burp issue 50')
+        lru = SignatureCache(maxsize=10)
+        self.assertEqual(lru.get_many(NessusSignature, [50])[50].name, 'Plugin 50')
+        self.assertEqual(lru.get_many(BurpSuiteSignature, [50])[50].name, 'Burp issue 50')
+
+    def test_stats_endpoint(self):
+        signature_cache.clear()
+        signature_cache.get_many(NessusSignature, [50, 51])
+        self.client.force_login(get_user_model().objects.create_superuser('admin@example.com', 'password'))
+
+        stats = self.client.get(reverse('signatures:signature_cache_stats')).json()
+
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['maxsize'], signature_cache.maxsize)
+        self.assertIn('hit_ratio', stats)
+
+    def test_stats_endpoint_requires_the_view_permission(self):
+        self.client.force_login(get_user_model().objects.create_user('viewer@example.com', 'password'))
+        self.assertEqual(self.client.get(reverse('signatures:signature_cache_stats')).status_code, 403)
@@ -1,10 +1,12 @@
 from django.urls import path
 from .views import factory
+from .views.base import SignatureCacheStatsView
 
 app_name = 'signatures'
 
 urlpatterns = [
     path('', factory.signature_selection_view, name='signature_selection'),
+    path('cache/stats/', SignatureCacheStatsView.as_view(), name='signature_cache_stats'),
     path('<str:scanner_type>/', factory.signature_list_view, name='signature_list'),
     path('<str:scanner_type>/<int:pk>/', factory.signature_detail_view, name='signature_detail'),
     path('<str:scanner_type>/create/', factory.signature_create_view, name='signature_create'),
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.db import models, transaction
+
+SIGNATURES_VERSION_KEY = 'signatures-version'
+SIGNATURES_VERSION_ID = 1
+
+
+def stored_signatures_version():
+    from .models import SignaturesVersion
+
+    row, _ = SignaturesVersion.objects.get_or_create(pk=SIGNATURES_VERSION_ID)
+    return row.version
+
+
+def signatures_version():
+    """
+    Global signature version; cached report fragments embed signature text and include it in their keys.
+    Read from the cache, which is refilled from the SignaturesVersion row when the key was culled or bumped.
+    """
+    version = cache.get(SIGNATURES_VERSION_KEY)
+    if version is None:
+        version = stored_signatures_version()
+        cache.add(SIGNATURES_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def bump_signatures_version():
+    """Call after signatures are created, edited, deleted or uploaded"""
+    from .models import SignaturesVersion
+
+    with transaction.atomic():
+        SignaturesVersion.objects.get_or_create(pk=SIGNATURES_VERSION_ID)
+        SignaturesVersion.objects.filter(pk=SIGNATURES_VERSION_ID).update(version=models.F('version') + 1)
+        cache.delete(SIGNATURES_VERSION_KEY)
+        # Again once committed, a reader may have cached the old version from the row in between
+        transaction.on_commit(lambda: cache.delete(SIGNATURES_VERSION_KEY))
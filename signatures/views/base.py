@@ -1,17 +1,58 @@
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.utils.safestring import mark_safe
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
+from django.db import transaction
+from ..versions import bump_signatures_version
+from ..search import update_search_vectors
+from ..pagination import keyset_page, signature_count
+from ..cache import signature_cache
 
 class SignatureBaseView(LoginRequiredMixin, PermissionRequiredMixin):
     model = None  # To be set by subclasses
     context_object_name = 'signature'
 
+class SignatureIndexMixin:
+    """
+    Saves the signature and refreshes what is derived from it in one transaction, then bumps the signatures version,
+    so nothing re-rendered for the new version can read a signature whose indexes are still being written
+    """
+    def index_signature(self):
+        update_search_vectors(self.model, [self.object.pk])
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            self.index_signature()
+        bump_signatures_version()
+        return response
+
 class SignatureListView(SignatureBaseView, ListView):
     context_object_name = 'signatures'
     paginate_by = 50
+    cursor_params = ('after', 'before', 'page')
+
+    def paginate_queryset(self, queryset, page_size):
+        """Keyset pagination (?after=/?before= cursors) instead of OFFSET pages, with a cached count of the filtered list"""
+        filters = {key: values for key, values in self.request.GET.lists() if key not in self.cursor_params and any(values)}
+        page = keyset_page(
+            queryset,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+            limit=page_size,
+            count=signature_count(queryset, filters),
+        )
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        for key in self.cursor_params:
+            query.pop(key, None)
+        context['filter_query'] = query.urlencode()
+        return context
 
     def get_template_names(self):
         return [f'signatures/{self.kwargs["scanner_type"]}/signature_list.html']
@@ -20,7 +61,7 @@ class SignatureDetailView(SignatureBaseView, DetailView):
     def get_template_names(self):
         return [f'signatures/{self.kwargs["scanner_type"]}/signature_detail.html']
 
-class SignatureCreateView(SignatureBaseView, CreateView):
+class SignatureCreateView(SignatureIndexMixin, SignatureBaseView, CreateView):
     def get_template_names(self):
         return [f'signatures/{self.kwargs["scanner_type"]}/signature_form.html']
 
@@ -32,7 +73,7 @@ class SignatureCreateView(SignatureBaseView, CreateView):
         messages.success(self.request, mark_safe(f"Signature <strong>{self.object.name}</strong> has been created successfully."), extra_tags='alert-success')
         return response
 
-class SignatureUpdateView(SignatureBaseView, UpdateView):
+class SignatureUpdateView(SignatureIndexMixin, SignatureBaseView, UpdateView):
     def get_template_names(self):
         return [f'signatures/{self.kwargs["scanner_type"]}/signature_form.html']
 
@@ -56,8 +97,16 @@ class SignatureDeleteView(SignatureBaseView, DeleteView):
         success_url = self.get_success_url()
         signature_name = self.object.name
         self.object.delete()
+        bump_signatures_version()
         messages.warning(self.request, mark_safe(f"Signature <strong>{signature_name}</strong> has been deleted successfully."), extra_tags='alert-warning')
         return HttpResponseRedirect(success_url)
     
     def post(self, request, *args, **kwargs):
-        return self.delete(request, *args, **kwargs)
\ No newline at end of file
+        return self.delete(request, *args, **kwargs)
+
+class SignatureCacheStatsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Hit/miss counters of this process's signature cache, to size SIGNATURE_CACHE_SIZE"""
+    permission_required = 'signatures.view_nessussignature'
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(signature_cache.stats())
@@ -1,6 +1,6 @@
-from django.db.models import Q
 from .base import SignatureListView, SignatureDetailView, SignatureCreateView, SignatureUpdateView, SignatureDeleteView
 from signatures.models import BurpSuiteSignature
+from signatures.search import search_signatures
 from signatures.forms import BurpSuiteSignatureForm
 
 class BurpSuiteSignatureListView(SignatureListView):
@@ -17,10 +17,7 @@ class BurpSuiteSignatureListView(SignatureListView):
         if signature_id:
             queryset = queryset.filter(id=signature_id)
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
+            queryset = search_signatures(queryset, search_query)
 
         return queryset
 
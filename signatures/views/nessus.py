@@ -1,7 +1,8 @@
-from django.db.models import Q
 from .base import SignatureListView, SignatureDetailView, SignatureCreateView, SignatureUpdateView, SignatureDeleteView
 from signatures.models import NessusSignature
+from signatures.search import search_signatures
 from signatures.forms import NessusSignatureForm
+from signatures.bulk import index_signature_links
 
 class NessusSignatureListView(SignatureListView):
     model = NessusSignature
@@ -13,17 +14,17 @@ class NessusSignatureListView(SignatureListView):
         # Apply filters
         severity = self.request.GET.get('severity')
         signature_id = self.request.GET.get('id')
+        cve = self.request.GET.get('cve')
         search_query = self.request.GET.get('search')
 
         if severity:
             queryset = queryset.filter(risk_factor=severity)
         if signature_id:
             queryset = queryset.filter(id=signature_id)
+        if cve:
+            queryset = queryset.filter(cves__cve_id=cve.strip().upper())
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
+            queryset = search_signatures(queryset, search_query)
 
         return queryset
 
@@ -41,11 +42,19 @@ class NessusSignatureCreateView(SignatureCreateView):
     form_class = NessusSignatureForm
     permission_required = 'signatures.add_nessussignature'
 
+    def index_signature(self):
+        super().index_signature()
+        index_signature_links([self.object.pk])
+
 class NessusSignatureUpdateView(SignatureUpdateView):
     model = NessusSignature
     form_class = NessusSignatureForm
     permission_required = 'signatures.change_nessussignature'
 
+    def index_signature(self):
+        super().index_signature()
+        index_signature_links([self.object.pk])
+
 class NessusSignatureDeleteView(SignatureDeleteView):
     model = NessusSignature
     permission_required = 'signatures.delete_nessussignature'
\ No newline at end of file
@@ -0,0 +1,55 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Issue detail and request/response data are fetched the first time an instance is expanded
+    function decodeRequest(encodedData) {
+        try {
+            return atob(encodedData.trim());
+        } catch (e) {
+            console.error("Error decoding base64:", e);
+            return encodedData;
+        }
+    }
+
+    function loadEvidence(container) {
+        container.dataset.loaded = 'true';
+
+        fetch(container.dataset.evidenceUrl, {
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => {
+            if (!response.ok) throw new Error('Network response was not ok');
+            return response.json();
+        })
+        .then(data => {
+            container.querySelector('.evidence-loading').remove();
+
+            if (data.issueDetail) {
+                container.querySelector('.issue-detail').innerHTML = data.issueDetail;
+                container.querySelector('.issue-detail-section').classList.remove('d-none');
+            }
+
+            const requestData = container.querySelector('.request-data');
+            data.requests.forEach(function(request) {
+                const pre = document.createElement('pre');
+                pre.textContent = decodeRequest(request);
+                requestData.appendChild(pre);
+            });
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            container.dataset.loaded = '';
+            container.querySelector('.evidence-loading').textContent = 'Could not load evidence, collapse and expand the instance to retry.';
+        });
+    }
+
+    document.querySelectorAll('.instance-evidence').forEach(function(container) {
+        const collapse = container.closest('.accordion-collapse');
+        collapse.addEventListener('show.bs.collapse', function(event) {
+            // Nested accordions bubble their events, only react to this instance's panel
+            if (event.target === collapse && !container.dataset.loaded) {
+                loadEvidence(container);
+            }
+        });
+    });
+});
@@ -1,17 +1,4 @@
 document.addEventListener('DOMContentLoaded', function() {
-    // Decode base64 request data
-    document.querySelectorAll('.request-data pre').forEach(function(pre) {
-        var encodedData = pre.textContent.trim();
-        if (encodedData) {
-            try {
-                var decodedData = atob(encodedData);
-                pre.textContent = decodedData;
-            } catch (e) {
-                console.error("Error decoding base64:", e);
-            }
-        }
-    });
-    
     const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
 
     function addStatusChangeListener(selector, bulkType) {
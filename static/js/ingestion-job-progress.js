@@ -0,0 +1,77 @@
+class IngestionJobProgress {
+    constructor(container) {
+        this.container = container;
+        this.url = container.dataset.progressUrl;
+        this.interval = 1000;
+        this.poll();
+    }
+
+    async poll() {
+        try {
+            const response = await fetch(this.url, {
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+
+            if (!response.ok) throw new Error('Network response was not ok');
+
+            const data = await response.json();
+            this.render(data);
+
+            if (data.status === 'completed' && data.report_url) {
+                // Keep warnings on screen, otherwise go straight to the report
+                if (data.warnings.length === 0) {
+                    window.location.href = data.report_url;
+                }
+                return;
+            }
+            if (data.status === 'failed') return;
+        } catch (error) {
+            console.error('Error refreshing ingestion progress:', error);
+        }
+        setTimeout(() => this.poll(), this.interval);
+    }
+
+    render(data) {
+        const bar = this.container.querySelector('.progress-bar');
+        bar.style.width = `${data.progress}%`;
+        bar.textContent = `${data.progress}%`;
+        if (data.status === 'failed') bar.classList.add('bg-danger');
+
+        this.container.querySelector('.job-status').textContent = data.status_label;
+        this.container.querySelector('.job-rows').textContent = data.rows_processed;
+        this.container.querySelector('.job-eta').textContent = this.formatEta(data.eta_seconds);
+        this.renderList('.job-warnings', data.warnings);
+        this.renderList('.job-errors', data.errors);
+
+        const link = this.container.querySelector('.job-report-link');
+        if (data.report_url) {
+            link.href = data.report_url;
+            link.classList.remove('d-none');
+        }
+    }
+
+    renderList(selector, items) {
+        const list = this.container.querySelector(selector);
+        list.innerHTML = '';
+        items.forEach(item => {
+            const li = document.createElement('li');
+            li.textContent = item;
+            list.appendChild(li);
+        });
+    }
+
+    formatEta(seconds) {
+        if (seconds === null || seconds === undefined) return 'N/A';
+        if (seconds < 60) return `${seconds}s`;
+        return `${Math.floor(seconds / 60)}m ${seconds % 60}s`;
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('ingestion-job');
+    if (container) {
+        new IngestionJobProgress(container);
+    }
+});
@@ -0,0 +1,65 @@
+class NessusReportDiff {
+    constructor(container) {
+        this.url = container.dataset.url;
+        this.base = container.dataset.base;
+        this.cursors = {};
+
+        container.querySelectorAll('.diff-findings').forEach(body => this.loadPage(body.dataset.category, 0));
+        container.querySelectorAll('.diff-load-more').forEach(button => {
+            button.addEventListener('click', () => this.loadPage(button.dataset.category, this.cursors[button.dataset.category]));
+        });
+    }
+
+    async loadPage(category, after) {
+        const url = new URL(this.url, window.location.origin);
+        url.searchParams.set('base', this.base);
+        url.searchParams.set('category', category);
+        if (after) url.searchParams.set('after', after);
+
+        try {
+            const response = await fetch(url.toString(), {
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+
+            if (!response.ok) throw new Error('Network response was not ok');
+
+            const data = await response.json();
+            const body = document.querySelector(`.diff-findings[data-category="${category}"]`);
+            data.findings.forEach(finding => body.appendChild(this.buildRow(finding, category)));
+
+            this.cursors[category] = data.next_after;
+            document.querySelector(`.diff-load-more[data-category="${category}"]`).classList.toggle('d-none', !data.next_after);
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }
+
+    buildRow(finding, category) {
+        const row = document.createElement('tr');
+        const cells = [finding.signature__risk_factor, finding.signature__name, finding.target_affected];
+        cells.forEach(value => {
+            const cell = document.createElement('td');
+            cell.textContent = value ?? '';
+            row.appendChild(cell);
+        });
+        if (category === 'persisting') row.appendChild(this.statusCell(finding.base_status));
+        row.appendChild(this.statusCell(finding.status));
+        return row;
+    }
+
+    statusCell(status) {
+        const cell = document.createElement('td');
+        const badge = document.createElement('span');
+        badge.className = `status-badge status-${status}`;
+        badge.textContent = window.STATUS_LABELS[status] || status;
+        cell.appendChild(badge);
+        return cell;
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('report-diff');
+    if (container) new NessusReportDiff(container);
+});
@@ -0,0 +1,133 @@
+class NessusReportGroups {
+    constructor(container) {
+        this.container = container;
+        this.url = container.dataset.groupsUrl;
+        this.groupTemplate = document.getElementById('signature-group-template');
+        this.targetTemplate = document.getElementById('target-row-template');
+        this.loadPage(null);
+    }
+
+    async loadPage(cursor) {
+        const url = new URL(this.url, window.location.origin);
+        if (cursor) url.searchParams.set('cursor', cursor);
+
+        try {
+            const response = await fetch(url.toString(), {
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+
+            if (!response.ok) throw new Error('Network response was not ok');
+
+            const data = await response.json();
+            data.groups.forEach(group => this.renderGroup(group));
+
+            if (data.next_cursor) {
+                this.loadPage(data.next_cursor);
+            } else {
+                this.container.querySelectorAll('.groups-loading').forEach(element => element.remove());
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            this.container.querySelectorAll('.groups-loading').forEach(element => {
+                element.textContent = 'Could not load all vulnerabilities, reload the page to retry.';
+            });
+        }
+    }
+
+    renderGroup(group) {
+        const groupId = `${group.risk_factor}-${group.signature.id}`;
+        let item = document.getElementById(`innerItem-${groupId}`);
+
+        // A signature with more targets than a page continues in the next one, carrying only its id
+        if (!item) {
+            item = this.buildGroup(group, groupId);
+            this.container.querySelector(`.risk-factor-groups[data-risk-factor="${group.risk_factor}"]`).appendChild(item);
+        }
+
+        const targets = item.querySelector('.signature-targets');
+        group.targets.forEach(target => targets.appendChild(this.buildTarget(target)));
+    }
+
+    buildGroup(group, groupId) {
+        const signature = group.signature;
+        const item = this.groupTemplate.content.firstElementChild.cloneNode(true);
+        item.id = `innerItem-${groupId}`;
+
+        const button = item.querySelector('.signature-name');
+        button.textContent = signature.name;
+        button.dataset.bsTarget = `#innerCollapse-${groupId}`;
+        const collapse = item.querySelector('.accordion-collapse');
+        collapse.id = `innerCollapse-${groupId}`;
+        collapse.dataset.bsParent = `#innerAccordion-${group.risk_factor}`;
+
+        item.querySelector('.signature-id').textContent = signature.id;
+        item.querySelector('.signature-risk-factor').textContent = signature.risk_factor;
+        item.querySelector('.signature-cvss').textContent = signature.cvss_base_score ?? 'None';
+        item.querySelector('.signature-description').textContent = signature.description ?? '';
+
+        if (signature.solution) {
+            item.querySelector('.signature-solution').textContent = signature.solution;
+            item.querySelector('.signature-solution-section').classList.remove('d-none');
+        }
+        if (signature.cve.length) {
+            this.fillLinks(item.querySelector('.signature-cve'), signature.cve, cve => `https://nvd.nist.gov/vuln/detail/${encodeURIComponent(cve)}`);
+            item.querySelector('.signature-cve-section').classList.remove('d-none');
+        }
+        if (signature.references.length) {
+            this.fillLinks(item.querySelector('.signature-references'), signature.references, reference => reference);
+            item.querySelector('.signature-references-section').classList.remove('d-none');
+        }
+
+        const bulkSelect = item.querySelector('.bulk-action-vuln-select');
+        if (bulkSelect) {
+            bulkSelect.id = `bulk-action-vuln-${signature.id}`;
+            bulkSelect.dataset.vulnerabilityId = group.targets[0].id;
+        }
+        return item;
+    }
+
+    fillLinks(list, values, href) {
+        values.forEach(value => {
+            const link = document.createElement('a');
+            link.href = href(value);
+            link.target = '_blank';
+            link.rel = 'noopener noreferrer';
+            link.textContent = value;
+            const listItem = document.createElement('li');
+            listItem.className = 'list-inline-item';
+            listItem.appendChild(link);
+            list.appendChild(listItem);
+        });
+    }
+
+    buildTarget(target) {
+        const row = this.targetTemplate.content.firstElementChild.cloneNode(true);
+        row.querySelector('.target-affected').textContent = target.target_affected;
+
+        const statusSelect = row.querySelector('.status-select');
+        if (statusSelect) {
+            statusSelect.value = target.status;
+            statusSelect.classList.add(`status-${target.status}`);
+            statusSelect.dataset.vulnerabilityId = target.id;
+            row.querySelector('.target-changed-by').textContent = target.changed_by;
+            row.querySelector('.target-changed-at').textContent = target.changed_at;
+        } else {
+            const badge = row.querySelector('.status-badge');
+            badge.classList.add(`status-${target.status}`);
+            badge.dataset.targetStatus = target.id;
+            badge.textContent = target.status.split('_').map(word =>
+                word.charAt(0).toUpperCase() + word.slice(1)
+            ).join(' ');
+        }
+        return row;
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const container = document.getElementById('vulnerabilitiesAccordion');
+    if (container && container.dataset.groupsUrl) {
+        new NessusReportGroups(container);
+    }
+});
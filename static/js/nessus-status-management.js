@@ -2,19 +2,21 @@ document.addEventListener('DOMContentLoaded', function() {
     const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
 
     function addStatusChangeListener(selector, bulkType) {
-        document.querySelectorAll(selector).forEach(function(select) {
-            select.addEventListener('change', function() {
-                var data = {
-                    status: this.value,
-                    bulk_type: bulkType
-                };
-                if (bulkType === 'risk_factor') {
-                    data.risk_factor = this.closest('.accordion-item').querySelector('.accordion-button').textContent.split('(')[0].trim();
-                } else {
-                    data.vulnerability_id = this.dataset.vulnerabilityId;
-                }
-                updateStatus(data);
-            });
+        // Delegated, the target rows are added by nessus-report-groups.js as the groups load
+        document.addEventListener('change', function(event) {
+            const select = event.target.closest(selector);
+            if (!select) return;
+
+            var data = {
+                status: select.value,
+                bulk_type: bulkType
+            };
+            if (bulkType === 'risk_factor') {
+                data.risk_factor = select.dataset.riskFactor;
+            } else {
+                data.vulnerability_id = select.dataset.vulnerabilityId;
+            }
+            updateStatus(data);
         });
     }
 
@@ -55,6 +57,7 @@ document.addEventListener('DOMContentLoaded', function() {
     function updateUI(updatedVulnerabilities) {
         updatedVulnerabilities.forEach(vuln => {
             const statusSelect = document.querySelector(`.status-select[data-vulnerability-id="${vuln.id}"]`);
+            const statusBadge = document.querySelector(`[data-target-status="${vuln.id}"]`);
             if (statusSelect) {
                 statusSelect.value = vuln.status;
                 statusSelect.classList.remove('status-not_started', 'status-in_review', 'status-monitoring', 'status-mitigated', 'status-fixed', 'status-risk_accepted');